@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Whitelisted methods and doc_events handlers of devp_custom, split by concern:
+
+    item_code        item-code prefixes and tabSeries reservation (Item hooks)
+    pricing          last selling prices
+    batch            batch-size checks, available_batch_qty, FEFO allocation
+    batch_alerts     low-availability / near-expiry batch queries (Batch Alerts page)
+    item_customer    customer-specific item names / descriptions
+    item_lookup      customer item name -> item code reverse lookup (trigram index)
+    mapping_history  point-in-time Item Customer Mapping resolution (version intervals)
+
+The old flat paths (devp_custom.api.get_last_item_prices, ...) keep working: names are
+resolved here on first access (PEP 562) and only that submodule is imported, so a
+worker resolving one hook or API call does not pay for the others.
+"""
+from __future__ import annotations
+
+import importlib
+
+_EXPORTS = {
+    # item_code
+    "reserve_item_code": "item_code",
+    "get_next_item_code_preview": "item_code",
+    "reserve_and_set_item_code_for_item": "item_code",
+    "reserve_item_code_for_item": "item_code",
+    "auto_set_item_code_on_submit": "item_code",
+    "assign_item_code_before_insert": "item_code",
+    "clear_item_group_prefixes": "item_code",
+    # pricing
+    "get_last_item_prices": "pricing",
+    # batch
+    "get_batch_size_violations": "batch",
+    "validate_work_order_batch_size": "batch",
+    "validate_sales_invoice_batch_size": "batch",
+    "clear_allow_override_after_submit": "batch",
+    "validate_available_qty": "batch",
+    "consume_available_qty": "batch",
+    "revert_available_qty": "batch",
+    "allocate_batches_fefo": "batch",
+    # batch_alerts
+    "get_batch_alerts": "batch_alerts",
+    "get_batch_alert_summary": "batch_alerts",
+    "set_availability_ratio": "batch_alerts",
+    # item_customer
+    "get_item_name_description_for_customer": "item_customer",
+    "get_item_names_for_customer_batch": "item_customer",
+    "get_all_mappings_for_item": "item_customer",
+    "apply_customer_item_names": "item_customer",
+    # item_lookup
+    "lookup_item_codes": "item_lookup",
+    # mapping_history
+    "get_customer_item_names_at": "mapping_history",
+    "record_mapping_version": "mapping_history",
+    "close_mapping_version": "mapping_history",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    submodule = _EXPORTS.get(name)
+    if submodule is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{submodule}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,570 @@
+# -*- coding: utf-8 -*-
+"""Batch rules: batch-size checks, available_batch_qty accounting and FEFO allocation."""
+from __future__ import annotations
+
+import datetime
+import heapq
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, getdate, nowdate
+
+from devp_custom.devp_custom.doctype.devp_custom_settings.devp_custom_settings import get_setting
+from devp_custom.instrumentation import instrument
+from devp_custom.outbox import record_batch_events, record_batch_events_for
+
+# ---------------------------------------------------------------------
+# Batch-size validation (server-side, one query per document)
+# ---------------------------------------------------------------------
+BATCH_SIZE_BLOCK = "Block"
+BATCH_SIZE_WARN = "Warn"
+BATCH_SIZE_OFF = "Off"
+
+# sent by "Save Anyway" in the Sales Invoice batch-size dialog with that one save;
+# not a column, so it is never stored (allow_batch_exceed belongs to the availability guard).
+# Server-side callers (API imports, scripts) set doc.flags.batch_size_override = True
+# instead; either one downgrades Block to Warn for that save only.
+BATCH_SIZE_OVERRIDE = "__batch_size_override"
+
+
+def _get_batch_size_check_mode():
+    # Warn by default: the check used to be a no-op, upgrades should not start blocking saves
+    mode = get_setting("batch_size_check", BATCH_SIZE_WARN)
+    if mode not in (BATCH_SIZE_BLOCK, BATCH_SIZE_WARN, BATCH_SIZE_OFF):
+        return BATCH_SIZE_WARN
+    return mode
+
+
+def _get_batch_sizes(batch_nos):
+    """
+    Returns { batch_no: float batch_size or None } for all given batches in one query.
+    Batches that do not exist are left out of the result.
+    """
+    batch_nos = sorted({b for b in batch_nos if b})
+    if not batch_nos:
+        return {}
+    rows = frappe.get_all(
+        "Batch",
+        filters={"name": ["in", batch_nos]},
+        fields=["name", "batch_size"],
+    )
+    sizes = {}
+    for r in rows:
+        try:
+            sizes[r.name] = float(r.batch_size) if r.batch_size is not None else None
+        except (ValueError, TypeError):
+            sizes[r.name] = None
+    return sizes
+
+
+def _collect_batch_size_violations(rows):
+    """
+    Checks every row's qty against its batch's batch_size.
+    Returns a list of dicts shaped for the client dialog:
+      { idx, item_code, batch_no, qty, limit, reason }
+    Batches with an empty/zero batch_size carry no limit and are skipped.
+    """
+    rows = [r for r in rows or [] if _get_row_batch_no(r)]
+    if not rows:
+        return []
+
+    sizes = _get_batch_sizes([_get_row_batch_no(r) for r in rows])
+
+    violations = []
+    for row in rows:
+        batch_no = _get_row_batch_no(row)
+        qty = _get_row_qty(row)
+        limit = sizes.get(batch_no)
+        if limit and qty > limit:
+            violations.append({
+                "idx": _get_row_value(row, "idx"),
+                "item_code": _get_row_value(row, "item_code") or "",
+                "batch_no": batch_no,
+                "qty": qty,
+                "limit": limit,
+                "reason": _("Qty exceeds batch size"),
+            })
+    return violations
+
+
+def _report_batch_size_violations(doc, violations):
+    """Throw, warn or do nothing depending on settings and the one-save override."""
+    if not violations:
+        return
+    mode = _get_batch_size_check_mode()
+    if mode == BATCH_SIZE_OFF:
+        return
+    if cint(doc.get(BATCH_SIZE_OVERRIDE)) or doc.flags.batch_size_override:
+        mode = BATCH_SIZE_WARN
+
+    lines = "<br>".join(
+        _("Row {0}: {1} qty {2} exceeds Batch {3} size {4}").format(
+            v["idx"] or "-", v["item_code"], v["qty"], v["batch_no"], v["limit"]
+        )
+        for v in violations
+    )
+    if mode == BATCH_SIZE_BLOCK:
+        frappe.throw(lines, title=_("Batch Size Exceeded"))
+    frappe.msgprint(lines, title=_("Batch Size Exceeded"), indicator="orange")
+
+
+@frappe.whitelist()
+@instrument
+def get_batch_size_violations(items):
+    """
+    Client entry point: items is a JSON list of rows ({idx, item_code, batch_no, qty}).
+    Returns {mode, violations} for the Sales Invoice form: the dialog blocks the save in
+    Block mode only, Warn shows an alert, Off returns no violations.
+    """
+    mode = _get_batch_size_check_mode()
+    if mode == BATCH_SIZE_OFF:
+        return {"mode": mode, "violations": []}
+    if isinstance(items, str):
+        items = json.loads(items or "[]")
+    return {"mode": mode, "violations": _collect_batch_size_violations(items or [])}
+
+
+@instrument
+def validate_work_order_batch_size(doc, method=None):
+    batch = doc.get("production_batch") or doc.get("batch_no") or doc.get("batch")
+    if not batch:
+        return
+    row = {
+        "idx": None,
+        "item_code": doc.get("production_item") or "",
+        "batch_no": batch,
+        "qty": doc.get("production_qty") or doc.get("qty") or 0,
+    }
+    _report_batch_size_violations(doc, _collect_batch_size_violations([row]))
+
+
+@instrument
+def validate_sales_invoice_batch_size(doc, method=None):
+    _report_batch_size_violations(doc, _collect_batch_size_violations(doc.get("items")))
+
+@instrument
+def clear_allow_override_after_submit(doc, method=None):
+    """allow_batch_exceed (negative available_batch_qty) applies to one submit only."""
+    if cint(doc.allow_batch_exceed) == 1:
+        # direct DB write avoids triggering recursive events
+        frappe.db.set_value('Sales Invoice', doc.name, 'allow_batch_exceed', 0)
+        doc.allow_batch_exceed = 0
+
+# ---------------------------------------------------------------------
+# Batch availability control (your new requirement)
+# ---------------------------------------------------------------------
+def _is_stock_affecting(doc):
+    """Delivery Note always affects stock. Sales Invoice only when update_stock=1."""
+    return (doc.doctype == "Delivery Note") or (doc.doctype == "Sales Invoice" and getattr(doc, "update_stock", 0))
+
+def _row_stock_qty(it):
+    """Use stock_qty if present; fallback to qty * conversion_factor (Stock UOM)."""
+    if getattr(it, "stock_qty", None) is not None:
+        return float(it.stock_qty or 0)
+    cf = float(getattr(it, "conversion_factor", 1) or 1)
+    return float(it.qty or 0) * cf
+
+def _collect_requested_by_batch(doc):
+    by_batch = defaultdict(float)
+    for it in (doc.items or []):
+        bno = getattr(it, "batch_no", None)
+        if not bno:
+            continue
+        q = _row_stock_qty(it)
+        if q > 0:
+            by_batch[bno] += q
+    return by_batch
+
+@instrument
+def validate_available_qty(doc, method=None):
+    """Hard validation before submit: cumulative per-batch request must not exceed available_batch_qty."""
+    if not _is_stock_affecting(doc):
+        return
+    if _pending_batch_updates():
+        # bulk run: _apply_available_qty checks against the chunk's projected quantities
+        return
+
+    req = _collect_requested_by_batch(doc)
+    if not req:
+        return
+
+    batch_nos = list(req.keys())
+    placeholders = ", ".join(["%s"] * len(batch_nos))
+    rows = frappe.db.sql(
+        f"""
+        SELECT name, COALESCE(available_batch_qty, 0) AS avail
+        FROM `tabBatch`
+        WHERE name IN ({placeholders})
+        """,
+        tuple(batch_nos),
+        as_dict=True,
+    )
+    avail_map = {r.name: float(r.avail or 0) for r in rows}
+
+    violations = []
+    for bno, needed in req.items():
+        avail = avail_map.get(bno, 0.0)
+        if needed > avail + 1e-9:
+            violations.append((bno, needed, avail))
+
+    if violations:
+        lines = "\n".join([f"- {b} needs {needed} but only {avail} available" for b, needed, avail in violations])
+        # frappe.throw(
+        #     _("Batch availability check failed. Please adjust quantities:\n{0}").format(lines),
+        #     title=_("Insufficient Available Batch Quantity"),
+        # )
+
+def _get_row_batch_no(row):
+    # Works for dict-like rows and object-like rows
+    if not row:
+        return None
+    return (row.get("batch_no") if isinstance(row, dict) else getattr(row, "batch_no", None)) \
+        or (row.get("batch") if isinstance(row, dict) else getattr(row, "batch", None))
+
+def _get_row_value(row, fieldname):
+    if not row:
+        return None
+    return row.get(fieldname) if isinstance(row, dict) else getattr(row, fieldname, None)
+
+def _get_row_qty(row):
+    # Adjust if you have conversions (uom, stock_qty) — here we fall back to qty
+    if not row:
+        return 0.0
+    qty = row.get("qty") if isinstance(row, dict) else getattr(row, "qty", None)
+    try:
+        return float(qty or 0.0)
+    except (ValueError, TypeError):
+        return 0.0
+
+def _aggregate_batch_quantities(items):
+    agg = {}
+    for row in items or []:
+        bno = _get_row_batch_no(row)
+        if not bno:
+            continue
+        qty = _get_row_qty(row)
+        if qty <= 0:
+            continue
+        agg[bno] = agg.get(bno, 0.0) + qty
+    return agg
+
+def _fetch_batch_avails(batch_names, for_update=False):
+    """
+    Returns dict { batch_name: available_batch_qty_as_float }.
+    Raises if batch not found. for_update=True locks the rows until the transaction ends,
+    in name order, so two documents sharing batches cannot deadlock.
+    """
+    if not batch_names:
+        return {}
+    rows = frappe.get_all(
+        "Batch",
+        filters={"name": ["in", list(batch_names)]},
+        fields=["name", "available_batch_qty"],
+        order_by="name",
+        for_update=for_update,
+    )
+    avails = {}
+    for r in rows:
+        try:
+            avails[r.name] = float(r.available_batch_qty or 0.0)
+        except (ValueError, TypeError):
+            # treat invalid stored value as 0 but log a warning
+            frappe.log_error(
+                message=f"Batch {r.name} has invalid available_batch_qty: {r.available_batch_qty}. Treating as 0.",
+                title="Invalid available_batch_qty"
+            )
+            avails[r.name] = 0.0
+
+    # detect missing batches
+    missing = set(batch_names) - set(avails.keys())
+    if missing:
+        frappe.throw(_("Batch(es) not found: {0}").format(", ".join(sorted(missing))))
+
+    return avails
+
+def _apply_available_qty(doc, sign):
+    """
+    sign = -1 on submit (consume), +1 on cancel (revert).
+    Aggregates per-batch, checks for negative availability and updates atomically.
+    """
+    # Optional: if you have a function _is_stock_affecting(doc), use it; otherwise assume True
+    try:
+        is_stock = _is_stock_affecting(doc)
+        if not is_stock:
+            return
+    except NameError:
+        # fallback if helper not present
+        pass
+
+    # support doc as dict-like or object-like
+    items = doc.get("items") if isinstance(doc, dict) else getattr(doc, "items", None)
+    batch_qty_map = _aggregate_batch_quantities(items)
+
+    if not batch_qty_map:
+        return
+
+    # allow override flag on the document (optional)
+    allow_exceed = False
+    if isinstance(doc, dict):
+        allow_exceed = bool(doc.get("allow_batch_exceed"))
+    else:
+        allow_exceed = bool(getattr(doc, "allow_batch_exceed", False))
+
+    # fetch current avails (projected ones during a bulk submit / cancel), locked until
+    # commit so a concurrent submit or bulk chunk cannot write over this one's result
+    batch_names = list(batch_qty_map.keys())
+    pending = _pending_batch_updates()
+    avails = pending.load(batch_names) if pending else _fetch_batch_avails(batch_names, for_update=True)
+
+    # compute new values and validate
+    new_values = {}
+    for bno, qty in batch_qty_map.items():
+        current = avails.get(bno, 0.0)
+        new_val = float(current) + float(sign) * float(qty)
+        if new_val < 0 and not allow_exceed:
+            frappe.throw(_(
+                "Insufficient available_batch_qty for Batch '{0}'. Available: {1}, Required change: {2}."
+            ).format(bno, current, -sign * qty))
+        # if you prefer to clamp at 0 instead of allowing negative, uncomment:
+        # new_val = max(0.0, new_val)
+        new_values[bno] = new_val
+
+    if pending:
+        # written with the rest of the chunk by deferred_batch_updates()
+        pending.stage(doc, sign, batch_qty_map, new_values)
+        return
+
+    # persist updates: one set-based UPDATE for all batches of the document
+    _set_batch_avails(new_values)
+    # change events for the warehouse system, committed (or rolled back) with the update
+    record_batch_events(doc, sign, batch_qty_map, new_values)
+
+def _set_batch_avails(new_values):
+    """
+    Write final available_batch_qty values (and availability_ratio, which the batch
+    alerts index) for many batches in a single UPDATE.
+    """
+    if not new_values:
+        return
+    names = list(new_values.keys())
+    cases = " ".join(["WHEN %s THEN %s"] * len(names))
+    placeholders = ", ".join(["%s"] * len(names))
+    params = []
+    for bno in names:
+        params.extend([bno, new_values[bno]])
+    frappe.db.sql(
+        f"""
+        UPDATE `tabBatch`
+        SET available_batch_qty = CASE name {cases} END,
+            availability_ratio = (CASE name {cases} END) / NULLIF(batch_size, 0)
+        WHERE name IN ({placeholders})
+        """,
+        tuple(params + params + names),
+    )
+    # cached Batch docs (get_cached_value / get_cached_doc) must not serve the old qty
+    for bno in names:
+        frappe.clear_document_cache("Batch", bno)
+
+# ---------------------------------------------------------------------
+# Deferred availability updates (devp_custom.bulk_stock)
+# ---------------------------------------------------------------------
+class PendingBatchUpdates:
+    """
+    Projected available_batch_qty of the batches touched by a chunk of documents.
+    Batches are read once (locked FOR UPDATE), every document is checked against the
+    projection, and flush() writes all of them with one UPDATE and one event insert.
+    lock() takes the chunk's batches up front in name order, so two chunks (or a chunk
+    and an interactive submit) wait for each other instead of deadlocking.
+    """
+
+    def __init__(self):
+        self.avails = {}
+        self.changes = []
+
+    def load(self, batch_names):
+        missing = [b for b in batch_names if b not in self.avails]
+        if missing:
+            self.avails.update(_fetch_batch_avails(missing, for_update=True))
+        return {b: self.avails[b] for b in batch_names}
+
+    def lock(self, batch_names):
+        """Lock and load every batch the chunk can touch, in one name-ordered read."""
+        self.load(sorted(set(batch_names)))
+
+    def stage(self, doc, sign, qty_changes, new_values):
+        self.avails.update(new_values)
+        self.changes.append(
+            (frappe._dict(doctype=doc.get("doctype"), name=doc.get("name")), sign, qty_changes, new_values)
+        )
+
+    def snapshot(self):
+        return dict(self.avails), len(self.changes)
+
+    def restore(self, snapshot):
+        """Forget what a failed document staged (its savepoint was rolled back)."""
+        avails, count = snapshot
+        self.avails = avails
+        del self.changes[count:]
+
+    def flush(self):
+        touched = {bno: self.avails[bno] for _doc, _sign, qty_changes, _new in self.changes for bno in qty_changes}
+        _set_batch_avails(touched)
+        record_batch_events_for(self.changes)
+        self.changes = []
+
+
+def _pending_batch_updates():
+    return getattr(frappe.local, "devp_pending_batch_updates", None)
+
+
+@contextmanager
+def deferred_batch_updates():
+    """Stage availability changes of the documents submitted / cancelled inside the block."""
+    pending = frappe.local.devp_pending_batch_updates = PendingBatchUpdates()
+    try:
+        yield pending
+    finally:
+        del frappe.local.devp_pending_batch_updates
+
+
+@instrument
+def consume_available_qty(doc, method=None):
+    _apply_available_qty(doc, sign=-1)
+
+@instrument
+def revert_available_qty(doc, method=None):
+    _apply_available_qty(doc, sign=+1)
+
+# ---------------------------------------------------------------------
+# Batch auto-allocation (FEFO: first-expiry-first-out)
+# ---------------------------------------------------------------------
+def _parse_allocation_lines(lines):
+    if isinstance(lines, str):
+        lines = json.loads(lines or "[]")
+    parsed = []
+    for pos, line in enumerate(lines or [], start=1):
+        item_code = (line.get("item_code") or "").strip()
+        qty = flt(line.get("qty"))
+        if not item_code or qty <= 0:
+            continue
+        parsed.append({
+            "idx": line.get("idx") or pos,
+            "item_code": item_code,
+            "warehouse": line.get("warehouse") or "",
+            "qty": qty,
+        })
+    return parsed
+
+
+def _load_fefo_candidates(item_codes, as_of):
+    """
+    One query for every item of the document. Returns { item_code: heap } where each
+    heap entry is (expiry, manufacturing, batch_no) and the batch details live in `info`.
+    Expired, disabled and exhausted batches are left out.
+    """
+    placeholders = ", ".join(["%s"] * len(item_codes))
+    rows = frappe.db.sql(
+        f"""
+        SELECT name, item, expiry_date, manufacturing_date,
+               COALESCE(available_batch_qty, 0) AS avail,
+               COALESCE(batch_size, 0) AS batch_size
+        FROM `tabBatch`
+        WHERE item IN ({placeholders})
+          AND disabled = 0
+          AND COALESCE(available_batch_qty, 0) > 0
+          AND (expiry_date IS NULL OR expiry_date >= %s)
+        """,
+        (*item_codes, as_of),
+        as_dict=True,
+    )
+
+    heaps, info = defaultdict(list), {}
+    for r in rows:
+        # batches without expiry go last; ties break on manufacturing date, then name
+        expiry = getdate(r.expiry_date) if r.expiry_date else datetime.date.max
+        mfg = getdate(r.manufacturing_date) if r.manufacturing_date else datetime.date.max
+        heaps[r.item].append((expiry, mfg, r.name))
+        info[r.name] = {
+            "avail": flt(r.avail),
+            "batch_size": flt(r.batch_size),
+            "expiry_date": r.expiry_date,
+            "manufacturing_date": r.manufacturing_date,
+        }
+    for heap in heaps.values():
+        heapq.heapify(heap)
+    return heaps, info
+
+
+@frappe.whitelist()
+@instrument
+def allocate_batches_fefo(lines, posting_date=None):
+    """
+    Split document lines across batches in first-expiry-first-out order.
+
+    lines: JSON list of { idx, item_code, warehouse, qty } with qty in stock UOM.
+    Availability comes from Batch.available_batch_qty (tracked per batch, not per
+    warehouse); a single split row never exceeds the batch's batch_size. Lines are
+    served in the given order, so earlier lines get the earlier-expiring batches.
+
+    Returns:
+      { "rows": [ { idx, item_code, warehouse, batch_no, qty, expiry_date, manufacturing_date } ],
+        "shortfalls": [ { idx, item_code, warehouse, qty } ],
+        "skipped": [ idx of lines whose item is not batch-tracked ] }
+    """
+    parsed = _parse_allocation_lines(lines)
+    result = {"rows": [], "shortfalls": [], "skipped": []}
+    if not parsed:
+        return result
+
+    item_codes = sorted({l["item_code"] for l in parsed})
+    batched_items = set(frappe.get_all(
+        "Item",
+        filters={"name": ["in", item_codes], "has_batch_no": 1},
+        pluck="name",
+    ))
+    if not batched_items:
+        result["skipped"] = [l["idx"] for l in parsed]
+        return result
+
+    heaps, info = _load_fefo_candidates(sorted(batched_items), getdate(posting_date or nowdate()))
+
+    for line in parsed:
+        if line["item_code"] not in batched_items:
+            result["skipped"].append(line["idx"])
+            continue
+
+        heap = heaps.get(line["item_code"]) or []
+        remaining = line["qty"]
+        while remaining > 1e-9 and heap:
+            entry = heapq.heappop(heap)
+            batch = info[entry[2]]
+            take = min(remaining, batch["avail"])
+            if batch["batch_size"] > 0:
+                take = min(take, batch["batch_size"])
+
+            result["rows"].append({
+                "idx": line["idx"],
+                "item_code": line["item_code"],
+                "warehouse": line["warehouse"],
+                "batch_no": entry[2],
+                "qty": take,
+                "expiry_date": batch["expiry_date"],
+                "manufacturing_date": batch["manufacturing_date"],
+            })
+            remaining -= take
+            batch["avail"] -= take
+            if batch["avail"] > 1e-9:
+                heapq.heappush(heap, entry)
+
+        if remaining > 1e-9:
+            result["shortfalls"].append({
+                "idx": line["idx"],
+                "item_code": line["item_code"],
+                "warehouse": line["warehouse"],
+                "qty": remaining,
+            })
+
+    return result
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Batch alerts: low-availability and near-expiry batches (Batch Alerts page).
+
+Low availability is available_batch_qty < threshold * batch_size. That comparison cannot
+use an index, so Batch carries availability_ratio (available_batch_qty / batch_size),
+kept by _set_batch_avails and the Batch validate hook. Both lists page with keysets on
+(availability_ratio, name) / (expiry_date, name) over the composite indexes in INDEXES,
+so a page costs the same on the first and the thousandth screen. Per-item counts are
+cached for SUMMARY_TTL seconds.
+"""
+from __future__ import annotations
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, flt, nowdate
+
+from devp_custom.devp_custom.doctype.devp_custom_settings.devp_custom_settings import get_setting
+from devp_custom.instrumentation import instrument
+
+LOW, EXPIRY = "low", "expiry"
+SUMMARY_KEY = "devp_batch_alert_summary"
+SUMMARY_TTL = 300
+SUMMARY_TOP_ITEMS = 50
+MAX_PAGE = 500
+
+# index name -> columns on tabBatch (name, the primary key, is implicitly appended)
+INDEXES = {
+    "devp_batch_low_avail": ["disabled", "availability_ratio"],
+    "devp_batch_item_low_avail": ["item", "disabled", "availability_ratio"],
+    "devp_batch_expiry": ["disabled", "expiry_date"],
+    "devp_batch_item_expiry": ["item", "disabled", "expiry_date"],
+}
+
+_ORDER_COLUMN = {LOW: "availability_ratio", EXPIRY: "expiry_date"}
+
+
+def ensure_indexes():
+    for index_name, columns in INDEXES.items():
+        frappe.db.add_index("Batch", columns, index_name)
+
+
+@instrument
+def set_availability_ratio(doc, method=None):
+    """Batch validate: keep availability_ratio in step with manual edits."""
+    size = flt(doc.get("batch_size"))
+    doc.availability_ratio = flt(doc.get("available_batch_qty")) / size if size else None
+
+
+# ---------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------
+def _params(threshold=None, expiry_days=None):
+    threshold = flt(threshold) if threshold not in (None, "") else flt(get_setting("batch_alert_threshold", 0.2))
+    expiry_days = cint(expiry_days) if expiry_days not in (None, "") else cint(get_setting("batch_alert_expiry_days", 30))
+    today = nowdate()
+    return frappe._dict(threshold=threshold, expiry_days=expiry_days, today=today, horizon=add_days(today, expiry_days))
+
+
+def _conditions(kind, params):
+    if kind == LOW:
+        return "b.disabled = 0 AND b.availability_ratio < %(threshold)s"
+    if kind == EXPIRY:
+        return (
+            "b.disabled = 0 AND b.expiry_date BETWEEN %(today)s AND %(horizon)s"
+            " AND IFNULL(b.available_batch_qty, 0) > 0"
+        )
+    frappe.throw(_("Unknown batch alert {0}").format(kind))
+
+
+@frappe.whitelist()
+@instrument
+def get_batch_alerts(kind=LOW, threshold=None, expiry_days=None, item_code=None, after=None, limit=50):
+    """
+    One page of low-availability (kind="low", lowest ratio first) or near-expiry
+    (kind="expiry", soonest first) batches. Pass the returned cursor as `after` for the
+    next page; cursor is None on the last page.
+    """
+    frappe.has_permission("Batch", "read", throw=True)
+    params = _params(threshold, expiry_days)
+    limit = min(max(cint(limit), 1), MAX_PAGE)
+    where = [_conditions(kind, params)]
+    column = _ORDER_COLUMN[kind]
+    if item_code:
+        where.append("b.item = %(item_code)s")
+        params.item_code = item_code
+    if after:
+        after_value, after_name = json.loads(after) if isinstance(after, str) else after
+        where.append(
+            f"(b.{column} > %(after_value)s OR (b.{column} = %(after_value)s AND b.name > %(after_name)s))"
+        )
+        params.update(after_value=after_value, after_name=after_name)
+    params.limit = limit + 1
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT b.name, b.item, b.item_name, b.batch_size, b.available_batch_qty,
+               b.availability_ratio, b.manufacturing_date, b.expiry_date
+        FROM `tabBatch` b
+        WHERE {" AND ".join(where)}
+        ORDER BY b.{column}, b.name
+        LIMIT %(limit)s
+        """,
+        params,
+        as_dict=True,
+    )
+
+    cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        cursor = json.dumps([rows[-1][column], rows[-1].name], default=str)
+    return {"rows": rows, "cursor": cursor, "threshold": params.threshold, "expiry_days": params.expiry_days}
+
+
+@frappe.whitelist()
+@instrument
+def get_batch_alert_summary(threshold=None, expiry_days=None):
+    """Totals and the items with most alerting batches, per alert kind (cached)."""
+    frappe.has_permission("Batch", "read", throw=True)
+    params = _params(threshold, expiry_days)
+    key = f"{SUMMARY_KEY}:{params.threshold}:{params.expiry_days}:{params.today}"
+    summary = frappe.cache().get_value(key)
+    if summary is not None:
+        return summary
+
+    summary = {"threshold": params.threshold, "expiry_days": params.expiry_days}
+    for kind in (LOW, EXPIRY):
+        counts = frappe.db.sql(
+            f"""
+            SELECT b.item, COUNT(*) AS batches
+            FROM `tabBatch` b
+            WHERE {_conditions(kind, params)}
+            GROUP BY b.item
+            ORDER BY batches DESC
+            """,
+            params,
+            as_dict=True,
+        )
+        summary[kind] = {
+            "total": sum(c.batches for c in counts),
+            "items": len(counts),
+            "top_items": counts[:SUMMARY_TOP_ITEMS],
+        }
+    frappe.cache().set_value(key, summary, expires_in_sec=SUMMARY_TTL)
+    return summary
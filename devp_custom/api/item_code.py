@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Item-code generation: prefixes from the Item Group tree and atomic tabSeries numbers."""
+from __future__ import annotations
+
+import re
+
+import frappe
+from frappe import _
+
+from devp_custom.instrumentation import instrument
+
+PREFIX_CACHE_KEY = "devp_item_group_prefix"
+
+# ---------------------------------------------------------------------
+# Helpers: item-code generation
+# ---------------------------------------------------------------------
+def _abbr_from_name(name, max_len=4):
+    if not name:
+        return "ITEM"
+    s = re.sub(r"[^A-Za-z0-9\s]", "", name).strip().upper()
+    parts = s.split()
+    if not parts:
+        return "ITEM"
+    if len(parts) == 1:
+        return parts[0][:max_len]
+    token = parts[0][:3]
+    i = 1
+    while len(token) < max_len and i < len(parts):
+        add = parts[i][: (max_len - len(token))]
+        token += add
+        i += 1
+    return token
+
+def _sanitize_part(part):
+    if not part:
+        return ""
+    p = str(part).upper().strip()
+    p = re.sub(r"\s+", "-", p)
+    p = re.sub(r"[^A-Z0-9\-]", "", p)
+    p = re.sub(r"-{2,}", "-", p).strip("-")
+    return p
+
+def _get_item_group_ancestors(item_group_name):
+    """
+    The group and all its ancestors (nearest first) in one nested-set query.
+    Returns [] when the group does not exist.
+    """
+    if not item_group_name:
+        return []
+    return frappe.db.sql(
+        """
+        SELECT parent.name, parent.item_code_prefix, parent.parent_item_group
+        FROM `tabItem Group` child
+        JOIN `tabItem Group` parent ON parent.lft <= child.lft AND parent.rgt >= child.rgt
+        WHERE child.name = %s
+        ORDER BY parent.lft DESC
+        """,
+        (item_group_name,),
+        as_dict=True,
+    )
+
+def _collect_prefix_parts_from_item_group(item_group_name, max_levels=3):
+    parts, seen = [], set()
+    for ig in _get_item_group_ancestors(item_group_name):
+        if len(parts) >= max_levels:
+            break
+
+        prefix_field = (ig.get("item_code_prefix") or "").strip()
+        if prefix_field:
+            part = _sanitize_part(prefix_field)
+        else:
+            part = _sanitize_part(_abbr_from_name(ig.get("name"), max_len=4))
+
+        if part and part not in seen:
+            parts.append(part)
+            seen.add(part)
+
+        parent_name = ig.get("parent_item_group")
+        if not parent_name or parent_name == "All Item Groups":
+            break
+
+    return list(reversed(parts))
+
+def _compose_prefix_from_item_group(item_group_name, max_levels=3):
+    """Cached per group and depth; any Item Group change clears the cache (clear_item_group_prefixes)."""
+    cache_field = f"{item_group_name}:{max_levels}"
+    cached = frappe.cache().hget(PREFIX_CACHE_KEY, cache_field)
+    if cached:
+        return cached
+
+    parts = _collect_prefix_parts_from_item_group(item_group_name, max_levels=max_levels)
+    if not parts:
+        return "ITEM"
+    comp = "-".join([_sanitize_part(p) for p in parts if p]).strip("-")
+    comp = re.sub(r"-{2,}", "-", comp)
+    comp = comp or "ITEM"
+    frappe.cache().hset(PREFIX_CACHE_KEY, cache_field, comp)
+    return comp
+
+@instrument
+def clear_item_group_prefixes(doc=None, method=None, *args, **kwargs):
+    """Item Group on_update / on_trash / after_rename: prefixes of descendants change too."""
+    frappe.cache().delete_key(PREFIX_CACHE_KEY)
+
+# ---------------------------------------------------------------------
+# Series reservation (atomic via tabSeries)
+# ---------------------------------------------------------------------
+def _reserve_series_number(prefix):
+    """
+    Atomically selects/locks and increments a tabSeries row for this prefix.
+    Returns the reserved integer.
+    """
+    row = frappe.db.sql(
+        "SELECT `current` FROM `tabSeries` WHERE name=%s FOR UPDATE",
+        (prefix,),
+    )
+    if not row:
+        frappe.db.sql(
+            "INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)",
+            (prefix, 1),
+        )
+        frappe.db.commit()
+        return 1
+    current = int(row[0][0] or 0)
+    next_no = current + 1
+    frappe.db.sql(
+        "UPDATE `tabSeries` SET `current`=%s WHERE name=%s",
+        (next_no, prefix),
+    )
+    frappe.db.commit()
+    return next_no
+
+@frappe.whitelist()
+@instrument
+def reserve_item_code(item_group=None, digits=3, max_prefix_levels=3):
+    prefix = _compose_prefix_from_item_group(item_group, max_levels=int(max_prefix_levels))
+    try:
+        next_no = _reserve_series_number(prefix)
+    except Exception as e:
+        frappe.throw(_("Could not reserve item code for prefix {0}: {1}").format(prefix, e))
+
+    fmt = "{:0" + str(int(digits)) + "d}"
+    suffix = fmt.format(next_no)
+    return f"{prefix}-{suffix}"
+
+@frappe.whitelist()
+@instrument
+def get_next_item_code_preview(item_group=None, digits=3, max_prefix_levels=3):
+    prefix = _compose_prefix_from_item_group(item_group, max_levels=int(max_prefix_levels))
+    like_expr = prefix + "-%"
+
+    rows = frappe.db.sql(
+        """
+        SELECT item_code, name
+        FROM `tabItem`
+        WHERE item_group=%s AND (item_code LIKE %s OR name LIKE %s)
+        """,
+        (item_group, like_expr, like_expr),
+    ) or []
+
+    max_no = 0
+    for item_code, name in rows:
+        candidate = item_code or name
+        if not candidate:
+            continue
+        last_seg = candidate.rsplit("-", 1)[-1]
+        if last_seg.isdigit():
+            n = int(last_seg)
+            if n > max_no:
+                max_no = n
+
+    next_no = max_no + 1
+    fmt = "{:0" + str(int(digits)) + "d}"
+    suffix = fmt.format(next_no)
+    return f"{prefix}-{suffix}"
+
+@frappe.whitelist()
+@instrument
+def reserve_and_set_item_code_for_item(docname, item_group=None, digits=3, max_prefix_levels=3):
+    if not docname:
+        frappe.throw(_("docname required"))
+
+    item = frappe.get_doc("Item", docname)
+    existing = item.get("item_code")
+    if existing:
+        return existing
+
+    ig = item_group or item.get("item_group")
+    if not ig:
+        frappe.throw(_("Cannot determine Item Group to compose item code prefix."))
+
+    prefix = _compose_prefix_from_item_group(ig, max_levels=int(max_prefix_levels))
+    try:
+        next_no = _reserve_series_number(prefix)
+    except Exception as e:
+        frappe.throw(_("Could not reserve item code for prefix {0}: {1}").format(prefix, e))
+
+    fmt = "{:0" + str(int(digits)) + "d}"
+    suffix = fmt.format(next_no)
+    new_code = f"{prefix}-{suffix}"
+
+    frappe.db.sql("UPDATE `tabItem` SET item_code=%s WHERE name=%s", (new_code, docname))
+    frappe.db.commit()
+    return new_code
+
+@frappe.whitelist()
+@instrument
+def reserve_item_code_for_item(item_group=None, digits=3, max_prefix_levels=3):
+    return reserve_item_code(item_group=item_group, digits=digits, max_prefix_levels=max_prefix_levels)
+
+@instrument
+def auto_set_item_code_on_submit(doc, method=None):
+    if not doc or getattr(doc, "doctype", None) != "Item":
+        return
+    if getattr(doc, "item_code", None):
+        return
+    if not getattr(doc, "item_group", None):
+        frappe.throw(_("Cannot auto-generate item code on submit: Item Group is missing."))
+    reserve_and_set_item_code_for_item(doc.name, item_group=doc.item_group, digits=3, max_prefix_levels=3)
+
+@instrument
+def assign_item_code_before_insert(doc, method=None):
+    if (doc.item_code or "").strip():
+        return
+    if not getattr(doc, "item_group", None):
+        frappe.throw(_("Item Group is required to generate Item Code"))
+
+    code = reserve_item_code(item_group=doc.item_group, digits=3, max_prefix_levels=3)
+    doc.item_code = code
+    # If autoname != field:item_code and you want name to follow, uncomment:
+    # doc.name = code
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Reverse lookup: customer item names (as written on customer POs) -> our item codes.
+
+customer_item_name of Item Customer Mapping and Item Customer Info is normalized
+(lower case, accents and punctuation stripped) and indexed as word trigrams in
+Customer Item Name Index / Customer Item Name Gram. lookup_item_codes() resolves many
+names in one query and ranks candidates by trigram similarity, then scope
+(customer > customer group > default), then priority.
+
+The index is kept current by doc_events on Item Customer Mapping and Item (including
+renames and merges);
+rebuild_index() recreates it from scratch.
+"""
+from __future__ import annotations
+
+import json
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+import frappe
+from frappe.utils import cint, cstr, flt, now_datetime
+
+from devp_custom.instrumentation import instrument
+
+INDEX_DOCTYPE = "Customer Item Name Index"
+GRAM_DOCTYPE = "Customer Item Name Gram"
+MAPPING = "Item Customer Mapping"
+INFO = "Item Customer Info"
+
+SCOPE_RANK = {"customer": 0, "group": 1, "default": 2}
+KEY_PREFIX = {MAPPING: "ICM-", INFO: "ICI-"}
+
+_SOURCE_QUERIES = {
+    MAPPING: """
+        SELECT name, item AS item_code, customer, customer_group, customer_item_name, priority
+        FROM `tabItem Customer Mapping`
+        WHERE {where} AND is_active = 1 AND IFNULL(customer_item_name, '') != ''
+    """,
+    INFO: """
+        SELECT name, parent AS item_code, customer, customer_group, customer_item_name, priority
+        FROM `tabItem Customer Info`
+        WHERE {where} AND parenttype = 'Item' AND IFNULL(customer_item_name, '') != ''
+            AND (IFNULL(customer, '') != '' OR IFNULL(customer_group, '') != '' OR is_default = 1)
+    """,
+}
+
+
+# ---------------------------------------------------------------------
+# Normalization
+# ---------------------------------------------------------------------
+def normalize_name(value):
+    text = unicodedata.normalize("NFKD", cstr(value))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.sub(r"[\W_]+", " ", text).strip()
+
+
+def trigrams(normalized):
+    grams = set()
+    for token in normalized.split():
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+# ---------------------------------------------------------------------
+# Index maintenance
+# ---------------------------------------------------------------------
+def _delete_entries(keys):
+    if not keys:
+        return
+    frappe.db.delete(GRAM_DOCTYPE, {"parent": ["in", keys]})
+    frappe.db.delete(INDEX_DOCTYPE, {"name": ["in", keys]})
+
+
+def _insert_entries(source_doctype, rows):
+    now, user = now_datetime(), frappe.session.user
+    std = [now, now, user, user]
+    entries, grams = [], []
+    for r in rows:
+        normalized = normalize_name(r.customer_item_name)
+        entry_grams = trigrams(normalized)
+        if not entry_grams:
+            continue
+        key = KEY_PREFIX[source_doctype] + r.name
+        entries.append([
+            key, source_doctype, r.name, r.item_code, r.customer_item_name, normalized[:140],
+            r.customer or None, r.customer_group or None, cint(r.priority), len(entry_grams),
+            *std,
+        ])
+        grams.extend(
+            [f"{key}-{i}", key, INDEX_DOCTYPE, "grams", i + 1, gram, *std]
+            for i, gram in enumerate(sorted(entry_grams))
+        )
+
+    std_fields = ["creation", "modified", "owner", "modified_by"]
+    if entries:
+        frappe.db.bulk_insert(INDEX_DOCTYPE, [
+            "name", "source_doctype", "source_name", "item_code", "customer_item_name", "normalized_name",
+            "customer", "customer_group", "priority", "gram_count", *std_fields,
+        ], entries)
+    if grams:
+        frappe.db.bulk_insert(
+            GRAM_DOCTYPE, ["name", "parent", "parenttype", "parentfield", "idx", "gram", *std_fields], grams
+        )
+
+
+def index_sources(source_doctype, names):
+    """(Re)index the given Item Customer Mapping / Item Customer Info rows."""
+    names = list(names or [])
+    if not names:
+        return
+    _delete_entries([KEY_PREFIX[source_doctype] + n for n in names])
+    placeholders = ", ".join(["%s"] * len(names))
+    rows = frappe.db.sql(
+        _SOURCE_QUERIES[source_doctype].format(where=f"name IN ({placeholders})"), tuple(names), as_dict=True
+    )
+    _insert_entries(source_doctype, rows)
+
+
+@instrument
+def update_mapping_index(doc, method=None):
+    """Item Customer Mapping on_update."""
+    index_sources(MAPPING, [doc.name])
+
+
+@instrument
+def remove_mapping_index(doc, method=None):
+    """Item Customer Mapping on_trash."""
+    _delete_entries([KEY_PREFIX[MAPPING] + doc.name])
+
+
+@instrument
+def update_item_info_index(doc, method=None):
+    """Item on_update: child rows may have been replaced, so reindex the item's rows."""
+    remove_item_info_index(doc)
+    rows = frappe.db.sql(
+        _SOURCE_QUERIES[INFO].format(where="parent = %s"), (doc.name,), as_dict=True
+    )
+    _insert_entries(INFO, rows)
+
+
+@instrument
+def remove_item_info_index(doc, method=None):
+    """Item on_trash (and first step of update_item_info_index)."""
+    frappe.db.sql(
+        f"""
+        DELETE g FROM `tab{GRAM_DOCTYPE}` g
+        JOIN `tab{INDEX_DOCTYPE}` e ON e.name = g.parent
+        WHERE e.source_doctype = %s AND e.item_code = %s
+        """,
+        (INFO, doc.name),
+    )
+    frappe.db.delete(INDEX_DOCTYPE, {"source_doctype": INFO, "item_code": doc.name})
+
+
+@instrument
+def reindex_renamed_item(doc, method=None, old=None, new=None, merge=False):
+    """Item after_rename: reindex the item's rows under the new code (a merge brings the
+    old item's Item Customer Info rows and mappings along)."""
+    update_item_info_index(doc)
+    index_sources(MAPPING, frappe.get_all(MAPPING, filters={"item": doc.name}, pluck="name"))
+
+
+def rebuild_index(chunk_size=2000):
+    """Recreate the whole index in name-ordered chunks, committing after each chunk."""
+    frappe.db.delete(GRAM_DOCTYPE)
+    frappe.db.delete(INDEX_DOCTYPE)
+    frappe.db.commit()
+
+    chunk_size = cint(chunk_size) or 2000
+    for source_doctype in (MAPPING, INFO):
+        last = ""
+        while True:
+            rows = frappe.db.sql(
+                _SOURCE_QUERIES[source_doctype].format(where="name > %s") + " ORDER BY name LIMIT %s",
+                (last, chunk_size),
+                as_dict=True,
+            )
+            if not rows:
+                break
+            _insert_entries(source_doctype, rows)
+            frappe.db.commit()
+            last = rows[-1].name
+
+
+# ---------------------------------------------------------------------
+# Lookup
+# ---------------------------------------------------------------------
+def _parse_names(names):
+    if isinstance(names, str):
+        try:
+            names = json.loads(names)
+        except ValueError:
+            names = [n for n in names.splitlines()]
+        if isinstance(names, str):
+            names = [names]
+    return [cstr(n).strip() for n in names or [] if cstr(n).strip()]
+
+
+def _scope(entry):
+    if entry.customer:
+        return "customer"
+    if entry.customer_group:
+        return "group"
+    return "default"
+
+
+@frappe.whitelist()
+@instrument
+def lookup_item_codes(names, customer=None, limit=3, min_score=0.3):
+    """
+    Resolve customer item names to our item codes.
+
+    names: JSON list (or newline separated) of customer item names.
+    Returns { name: [ { item_code, score, scope, customer_item_name, source_doctype,
+    source_name } ] } with up to `limit` candidates per name, best first. Only entries for
+    this customer, its customer group, or defaults are considered.
+    """
+    names = _parse_names(names)
+    limit, min_score = max(cint(limit), 1), flt(min_score)
+    result = {name: [] for name in names}
+    if not names:
+        return result
+
+    normalized = {name: normalize_name(name) for name in names}
+    query_grams = {name: trigrams(norm) for name, norm in normalized.items()}
+    all_grams = sorted(set().union(*query_grams.values()))
+    if not all_grams:
+        return result
+
+    customer = (customer or "").strip() or None
+    customer_group = frappe.get_cached_value("Customer", customer, "customer_group") if customer else None
+
+    placeholders = ", ".join(["%s"] * len(all_grams))
+    rows = frappe.db.sql(
+        f"""
+        SELECT g.gram, e.name, e.item_code, e.customer, e.customer_group, e.priority,
+               e.gram_count, e.customer_item_name, e.normalized_name, e.source_doctype, e.source_name
+        FROM `tab{GRAM_DOCTYPE}` g
+        JOIN `tab{INDEX_DOCTYPE}` e ON e.name = g.parent
+        WHERE g.gram IN ({placeholders})
+          AND (
+                (IFNULL(e.customer, '') = '' AND IFNULL(e.customer_group, '') = '')
+                OR e.customer = %s
+                OR (IFNULL(e.customer, '') = '' AND e.customer_group = %s)
+          )
+        """,
+        (*all_grams, customer or "", customer_group or ""),
+        as_dict=True,
+    )
+
+    postings, entries = defaultdict(list), {}
+    for r in rows:
+        postings[r.gram].append(r.name)
+        entries[r.name] = r
+
+    for name in names:
+        grams = query_grams[name]
+        if not grams:
+            continue
+        matches = Counter(e for gram in grams for e in postings.get(gram, ()))
+
+        best = {}
+        for entry_name, shared in matches.items():
+            entry = entries[entry_name]
+            if entry.normalized_name == normalized[name]:
+                score = 1.0
+            else:
+                score = 2.0 * shared / (len(grams) + cint(entry.gram_count))
+            if score < min_score:
+                continue
+            scope = _scope(entry)
+            rank = (-score, SCOPE_RANK[scope], cint(entry.priority) or 999)
+            if entry.item_code not in best or rank < best[entry.item_code][0]:
+                best[entry.item_code] = (rank, {
+                    "item_code": entry.item_code,
+                    "score": round(score, 3),
+                    "scope": scope,
+                    "customer_item_name": entry.customer_item_name,
+                    "source_doctype": entry.source_doctype,
+                    "source_name": entry.source_name,
+                })
+
+        result[name] = [c for _rank, c in sorted(best.values(), key=lambda x: x[0])[:limit]]
+    return result
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Point-in-time Item Customer Mapping resolution.
+
+Every saved state of a mapping is kept in Item Customer Mapping Version with a
+[valid_from, valid_to) interval (valid_to empty for the current state). Per item the
+versions are cut into elementary segments (between consecutive interval bounds) with the
+versions active in each; that list is cached in Redis, so resolving a batch of
+(item, customer, moment) requests is one Customer query, at most one version query for
+uncached items, and a bisect per request -- the same cost as a current lookup.
+
+Among the versions active at the moment the usual precedence applies
+(item_customer.choose_customer_mapping). Customer groups are taken as they are now.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import pickle
+from bisect import bisect_right
+
+import frappe
+from frappe.utils import get_datetime, now_datetime
+
+from devp_custom.api.item_customer import choose_customer_mapping
+from devp_custom.instrumentation import instrument
+
+VERSION_DOCTYPE = "Item Customer Mapping Version"
+INTERVALS_KEY = "devp_mapping_intervals"
+TRACKED_FIELDS = (
+    "item", "customer", "customer_group", "customer_item_name", "customer_description", "is_active", "priority",
+)
+
+# ---------------------------------------------------------------------
+# Version history (Item Customer Mapping hooks)
+# ---------------------------------------------------------------------
+def _invalidate(*items):
+    items = [i for i in items if i]
+    if not items:
+        return
+    cache = frappe.cache()
+    try:
+        # raw pipeline: RedisWrapper's hash helpers pickle values and add their own prefix
+        pipe = cache.pipeline()
+        pipe.hdel(cache.make_key(INTERVALS_KEY), *items)
+        pipe.execute()
+    except Exception:
+        frappe.logger("devp_custom.mapping_history").warning("Could not invalidate mapping intervals", exc_info=True)
+
+
+def _close_open_version(mapping, at):
+    frappe.db.sql(
+        f"UPDATE `tab{VERSION_DOCTYPE}` SET valid_to = %s, modified = %s WHERE mapping = %s AND valid_to IS NULL",
+        (at, at, mapping),
+    )
+
+
+@instrument
+def record_mapping_version(doc, method=None):
+    """Item Customer Mapping on_update: close the current version and open a new one."""
+    before = doc.get_doc_before_save()
+    if before and all(before.get(f) == doc.get(f) for f in TRACKED_FIELDS):
+        return
+
+    now, user = now_datetime(), frappe.session.user
+    _close_open_version(doc.name, now)
+    frappe.db.bulk_insert(
+        VERSION_DOCTYPE,
+        ["name", "mapping", *TRACKED_FIELDS, "valid_from", "creation", "modified", "owner", "modified_by"],
+        [[frappe.generate_hash(length=10), doc.name, *(doc.get(f) for f in TRACKED_FIELDS), now, now, now, user, user]],
+    )
+    _invalidate(doc.item, before.item if before else None)
+
+
+@instrument
+def close_mapping_version(doc, method=None):
+    """Item Customer Mapping on_trash: the mapping stops applying now; its history stays."""
+    _close_open_version(doc.name, now_datetime())
+    _invalidate(doc.item)
+
+
+def backfill_versions():
+    """Open a first version (valid from creation) for every mapping that has none. Mappings
+    with any version are skipped, so a re-run never reopens history closed since."""
+    from devp_custom.backfill import run_backfill
+
+    return run_backfill(
+        "item_customer_mapping_versions",
+        "Item Customer Mapping",
+        f"""
+        INSERT IGNORE INTO `tab{VERSION_DOCTYPE}`
+            (name, mapping, item, customer, customer_group, customer_item_name, customer_description,
+             is_active, priority, valid_from, owner, modified_by, creation, modified, docstatus, idx)
+        SELECT CONCAT('v0-', m.name), m.name, m.item, m.customer, m.customer_group, m.customer_item_name,
+               m.customer_description, m.is_active, m.priority, m.creation, m.owner, m.owner, m.creation,
+               m.modified, 0, 0
+        FROM `tabItem Customer Mapping` m
+        WHERE {{chunk}}
+          AND NOT EXISTS (SELECT 1 FROM `tab{VERSION_DOCTYPE}` v WHERE v.mapping = m.name)
+        """,
+    )
+
+
+# ---------------------------------------------------------------------
+# Interval lists
+# ---------------------------------------------------------------------
+def _build_intervals(versions):
+    """(bounds, segments): segments[i] = versions active in [bounds[i], bounds[i + 1])."""
+    spans = [
+        (v.valid_from.timestamp(), v.valid_to.timestamp() if v.valid_to else float("inf"), v)
+        for v in versions
+    ]
+    bounds = sorted({start for start, _end, _v in spans} | {end for _start, end, _v in spans if end != float("inf")})
+    segments = []
+    for b in bounds:
+        segments.append([
+            {
+                "name": v.mapping,
+                "customer": v.customer,
+                "customer_group": v.customer_group,
+                "customer_item_name": v.customer_item_name,
+                "customer_description": v.customer_description,
+                "priority": v.priority,
+                # newest version wins ties, like `modified` for live mappings
+                "modified": v.valid_from,
+            }
+            for start, end, v in spans
+            if start <= b < end
+        ])
+    return bounds, segments
+
+
+def _load_intervals(items):
+    cache = frappe.cache()
+    key = cache.make_key(INTERVALS_KEY)
+    items = sorted(items)
+    intervals = {}
+    try:
+        for item, value in zip(items, cache.hmget(key, items) if items else [], strict=True):
+            if value:
+                intervals[item] = pickle.loads(value)
+    except Exception:
+        pass
+
+    missing = [i for i in items if i not in intervals]
+    if not missing:
+        return intervals
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT mapping, item, customer, customer_group, customer_item_name, customer_description,
+               priority, valid_from, valid_to
+        FROM `tab{VERSION_DOCTYPE}`
+        WHERE item IN ({", ".join(["%s"] * len(missing))}) AND is_active = 1
+        """,
+        tuple(missing),
+        as_dict=True,
+    )
+    by_item = {item: [] for item in missing}
+    for r in rows:
+        by_item[r.item].append(r)
+
+    try:
+        pipe = cache.pipeline()
+        for item, versions in by_item.items():
+            intervals[item] = _build_intervals(versions)
+            pipe.hset(key, item, pickle.dumps(intervals[item]))
+        pipe.execute()
+    except Exception:
+        for item, versions in by_item.items():
+            intervals.setdefault(item, _build_intervals(versions))
+    return intervals
+
+
+def _as_timestamp(at):
+    """Datetimes as given; plain dates resolve at the end of that day."""
+    if not at:
+        return now_datetime().timestamp()
+    if isinstance(at, datetime.date) and not isinstance(at, datetime.datetime):
+        at = str(at)
+    if isinstance(at, str) and len(at.strip()) == 10:
+        at = f"{at.strip()} 23:59:59.999999"
+    return get_datetime(at).timestamp()
+
+
+def resolve_mappings_at(requests):
+    """
+    requests: iterable of (item_code, customer, moment).
+    Returns the winning version dict (or None) per request, in the same order.
+    """
+    requests = list(requests)
+    customers = sorted({c for _item, c, _at in requests if c})
+    groups = dict(frappe.get_all(
+        "Customer", filters={"name": ["in", customers]}, fields=["name", "customer_group"], as_list=True
+    )) if customers else {}
+    intervals = _load_intervals({item for item, _c, _at in requests if item})
+
+    result = []
+    for item, customer, at in requests:
+        bounds, segments = intervals.get(item) or ([], [])
+        i = bisect_right(bounds, _as_timestamp(at)) - 1
+        result.append(choose_customer_mapping(segments[i] if i >= 0 else [], customer, groups.get(customer)))
+    return result
+
+
+def _as_mapping_result(chosen):
+    if not chosen:
+        return {}
+    return {
+        "mapping_name": chosen.get("name"),
+        "customer_item_name": chosen.get("customer_item_name") or "",
+        "customer_description": chosen.get("customer_description") or "",
+        "source": "customer" if chosen.get("customer") else ("group" if chosen.get("customer_group") else "default"),
+    }
+
+
+def get_item_names_for_customer_at(item_codes, customer, at):
+    """Point-in-time counterpart of item_customer.get_item_names_for_customer_batch."""
+    item_codes = list(dict.fromkeys(item_codes))
+    chosen = resolve_mappings_at((item, customer, at) for item in item_codes)
+    return {item: _as_mapping_result(c) for item, c in zip(item_codes, chosen, strict=True)}
+
+
+@frappe.whitelist()
+@instrument
+def get_customer_item_names_at(rows):
+    """
+    rows: JSON list of {item_code, customer, date} (date or datetime; dates resolve at the
+    end of the day). Returns the rows with mapping_name, customer_item_name,
+    customer_description and source as they were at that moment.
+    """
+    if isinstance(rows, str):
+        rows = json.loads(rows or "[]")
+    rows = [frappe._dict(r) for r in rows or []]
+    chosen = resolve_mappings_at((r.item_code, r.customer, r.get("date")) for r in rows)
+    return [dict(r, **_as_mapping_result(c)) for r, c in zip(rows, chosen, strict=True)]
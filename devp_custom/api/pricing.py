@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""Last selling prices of an item from submitted SI / DN / SO."""
+from __future__ import annotations
+
+import frappe
+
+from devp_custom.db_routing import read_replica
+from devp_custom.instrumentation import instrument
+from devp_custom.singleflight import singleflight
+
+
+# ---------------------------------------------------------------------
+# Pricing helpers
+# ---------------------------------------------------------------------
+@frappe.whitelist()
+@instrument
+def get_last_item_prices(item_code, customer=None, limit=5, include_other_customers=False):
+    """
+    Fetch last selling prices for item_code from submitted documents only (docstatus=1).
+    Priority: Sales Invoice → Delivery Note → Sales Order.
+    include_other_customers=False → filter by customer (customer-specific).
+    include_other_customers=True  → no customer filter at all (all-customers fallback).
+    """
+    if not item_code:
+        return []
+
+    limit = int(limit or 5)
+    customer = (customer or "").strip() or None
+    include_other = str(include_other_customers).lower() in ("1", "true", "yes")
+
+    try:
+        if not frappe.has_permission("Sales Invoice", ptype="read"):
+            return []
+    except Exception:
+        pass
+
+    return _load_last_item_prices(item_code, customer, limit, include_other)
+
+
+@singleflight("price_history")
+def _load_last_item_prices(item_code, customer, limit, include_other):
+    """Identical concurrent requests (same item / customer / limit) share one computation."""
+    results = []
+
+    # read-only history: served by the read replica when routing is enabled
+    with read_replica("price_history"):
+        # Priority 1: Sales Invoice
+        results.extend(_price_history_from_si(item_code, customer, include_other, limit))
+
+        # Priority 2: Delivery Note
+        remaining = limit - len(results)
+        if remaining > 0:
+            results.extend(_price_history_from_dn(item_code, customer, include_other, remaining))
+
+        # Priority 3: Sales Order
+        remaining = limit - len(results)
+        if remaining > 0:
+            results.extend(_price_history_from_so(item_code, customer, include_other, remaining))
+
+    return results
+
+
+def get_last_rates_for_items(item_codes, customer=None):
+    """
+    Latest submitted rate per item for many items in one query (bulk counterpart of
+    get_last_item_prices, same SI -> DN -> SO priority). Customer-specific when customer
+    is given. Returns { item_code: price row } for items that have any history.
+    """
+    item_codes = sorted({c for c in item_codes or [] if c})
+    if not item_codes:
+        return {}
+
+    placeholders = ", ".join(["%s"] * len(item_codes))
+    parts, params = [], []
+    for rank, (doctype, child, date_field) in enumerate((
+        ("Sales Invoice", "Sales Invoice Item", "posting_date"),
+        ("Delivery Note", "Delivery Note Item", "posting_date"),
+        ("Sales Order", "Sales Order Item", "transaction_date"),
+    )):
+        cust_clause, cust_params = _build_customer_clause(customer, False, "p")
+        parts.append(f"""
+            SELECT c.item_code, p.name AS document, '{doctype}' AS doc_type, {rank} AS src_rank,
+                   p.`{date_field}` AS posting_date, p.creation, p.customer,
+                   c.qty, c.rate, c.amount, COALESCE(p.currency, '') AS currency
+            FROM `tab{child}` c
+            JOIN `tab{doctype}` p ON p.name = c.parent
+            WHERE c.item_code IN ({placeholders}) AND p.docstatus = 1
+                {"AND " + cust_clause if cust_clause else ""}
+        """)
+        params.extend(item_codes + cust_params)
+
+    with read_replica("price_history"):
+        rows = frappe.db.sql(
+            f"""
+            SELECT * FROM (
+                SELECT h.*, ROW_NUMBER() OVER (
+                    PARTITION BY h.item_code ORDER BY h.src_rank, h.posting_date DESC, h.creation DESC
+                ) AS rn
+                FROM ({" UNION ALL ".join(parts)}) h
+            ) ranked
+            WHERE rn = 1
+            """,
+            tuple(params),
+            as_dict=1,
+        )
+    return {r.item_code: _normalize_price_rows([r])[0] for r in rows}
+
+
+def _build_customer_clause(customer, include_other, alias):
+    """
+    customer-specific (include_other=False): WHERE alias.customer = %s
+    all-customers fallback (include_other=True): no clause
+    """
+    if customer and not include_other:
+        return f"{alias}.customer = %s", [customer]
+    return None, []
+
+
+def _price_history_from_si(item_code, customer, include_other, limit):
+    cust_clause, cust_params = _build_customer_clause(customer, include_other, "si")
+    where = "sii.item_code = %s AND si.docstatus = 1"
+    params = [item_code]
+    if cust_clause:
+        where += f" AND {cust_clause}"
+        params.extend(cust_params)
+    rows = frappe.db.sql(
+        f"""
+        SELECT si.name AS document, 'Sales Invoice' AS doc_type,
+               si.posting_date, si.customer,
+               sii.qty, sii.rate, sii.amount,
+               COALESCE(si.currency, '') AS currency
+        FROM `tabSales Invoice Item` sii
+        JOIN `tabSales Invoice` si ON si.name = sii.parent
+        WHERE {where}
+        ORDER BY si.posting_date DESC, si.creation DESC
+        LIMIT %s
+        """,
+        (*params, limit),
+        as_dict=1,
+    )
+    return _normalize_price_rows(rows)
+
+
+def _price_history_from_dn(item_code, customer, include_other, limit):
+    cust_clause, cust_params = _build_customer_clause(customer, include_other, "dn")
+    where = "dni.item_code = %s AND dn.docstatus = 1"
+    params = [item_code]
+    if cust_clause:
+        where += f" AND {cust_clause}"
+        params.extend(cust_params)
+    rows = frappe.db.sql(
+        f"""
+        SELECT dn.name AS document, 'Delivery Note' AS doc_type,
+               dn.posting_date, dn.customer,
+               dni.qty, dni.rate, dni.amount,
+               COALESCE(dn.currency, '') AS currency
+        FROM `tabDelivery Note Item` dni
+        JOIN `tabDelivery Note` dn ON dn.name = dni.parent
+        WHERE {where}
+        ORDER BY dn.posting_date DESC, dn.creation DESC
+        LIMIT %s
+        """,
+        (*params, limit),
+        as_dict=1,
+    )
+    return _normalize_price_rows(rows)
+
+
+def _price_history_from_so(item_code, customer, include_other, limit):
+    cust_clause, cust_params = _build_customer_clause(customer, include_other, "so")
+    where = "soi.item_code = %s AND so.docstatus = 1"
+    params = [item_code]
+    if cust_clause:
+        where += f" AND {cust_clause}"
+        params.extend(cust_params)
+    rows = frappe.db.sql(
+        f"""
+        SELECT so.name AS document, 'Sales Order' AS doc_type,
+               so.transaction_date AS posting_date, so.customer,
+               soi.qty, soi.rate, soi.amount,
+               COALESCE(so.currency, '') AS currency
+        FROM `tabSales Order Item` soi
+        JOIN `tabSales Order` so ON so.name = soi.parent
+        WHERE {where}
+        ORDER BY so.transaction_date DESC, so.creation DESC
+        LIMIT %s
+        """,
+        (*params, limit),
+        as_dict=1,
+    )
+    return _normalize_price_rows(rows)
+
+
+def _normalize_price_rows(rows):
+    result = []
+    for r in rows:
+        pd = r.get("posting_date")
+        result.append({
+            "document":     r.get("document") or "",
+            "doc_type":     r.get("doc_type") or "",
+            "posting_date": pd.strftime("%Y-%m-%d") if pd else "",
+            "customer":     r.get("customer") or "",
+            "qty":          float(r.get("qty") or 0),
+            "rate":         float(r.get("rate") or 0),
+            "amount":       float(r.get("amount") or 0),
+            "currency":     r.get("currency") or "",
+            # backward-compat keys (older frontend reads r.invoice / r.order)
+            "invoice":      r.get("document") or "",
+            "order":        r.get("document") or "",
+        })
+    return result
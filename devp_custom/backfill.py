@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Chunked, resumable backfills for devp_custom data patches.
+
+A backfill is one set-based SQL statement (UPDATE / INSERT ... SELECT) with a {chunk}
+placeholder. The runner walks the table's primary key in chunks, runs the statement for
+each key range, commits, and stores the last processed name as a checkpoint, so a patch
+that fails half-way resumes where it stopped on the next migrate:
+
+    from devp_custom.backfill import run_backfill
+
+    def execute():
+        run_backfill(
+            "init_available_batch_qty",
+            "Batch",
+            "UPDATE `tabBatch` SET available_batch_qty = batch_size WHERE {chunk} AND ...",
+        )
+
+With dry_run=True every chunk is executed and rolled back, reporting the rows it would
+change without touching the checkpoint.
+"""
+from __future__ import annotations
+
+from time import perf_counter
+
+import frappe
+from frappe.utils import cint
+
+CHECKPOINT_PREFIX = "devp_backfill:"
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def get_checkpoint(key):
+    return frappe.db.get_global(CHECKPOINT_PREFIX + key) or ""
+
+
+def set_checkpoint(key, last_name):
+    frappe.db.set_global(CHECKPOINT_PREFIX + key, last_name or "")
+
+
+def _chunk_end(doctype, after, chunk_size):
+    """Primary key of the chunk_size-th row after `after` (or the last row of the table)."""
+    table = f"`tab{doctype}`"
+    row = frappe.db.sql(
+        f"SELECT name FROM {table} WHERE name > %s ORDER BY name LIMIT 1 OFFSET %s",
+        (after, chunk_size - 1),
+    )
+    if row:
+        return row[0][0]
+    row = frappe.db.sql(f"SELECT MAX(name) FROM {table} WHERE name > %s", (after,))
+    return row[0][0] if row else None
+
+
+def run_backfill(key, doctype, statement, values=None, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """
+    Run `statement` over `doctype` in primary-key chunks, committing after each chunk.
+
+    key: unique name of the backfill, used for the checkpoint.
+    statement: SQL with a {chunk} placeholder for the key-range condition on `name`;
+        `values` (dict) are passed as named parameters alongside chunk_start / chunk_end.
+    Returns {"chunks", "rows", "last", "dry_run", "seconds"}.
+    """
+    chunk_size, dry_run = max(cint(chunk_size), 1), cint(dry_run)
+    sql = statement.format(chunk="`name` > %(chunk_start)s AND `name` <= %(chunk_end)s")
+    logger = frappe.logger("devp_custom.backfill")
+
+    start = perf_counter()
+    last = "" if dry_run else get_checkpoint(key)
+    if last:
+        print(f"{key}: resuming after {last}")
+
+    chunks = rows = 0
+    while True:
+        end = _chunk_end(doctype, last, chunk_size)
+        if end is None:
+            break
+
+        frappe.db.sql(sql, dict(values or {}, chunk_start=last, chunk_end=end))
+        rows += max(frappe.db._cursor.rowcount or 0, 0)
+        chunks += 1
+
+        if dry_run:
+            frappe.db.rollback()
+        else:
+            set_checkpoint(key, end)
+            frappe.db.commit()
+        last = end
+
+        if chunks % 20 == 0:
+            logger.info(f"{key}: {chunks} chunks, {rows} rows, at {last}")
+
+    if not dry_run:
+        # finished: a deliberate re-run starts from the beginning again
+        set_checkpoint(key, None)
+        frappe.db.commit()
+
+    result = {
+        "chunks": chunks, "rows": rows, "last": last, "dry_run": bool(dry_run),
+        "seconds": round(perf_counter() - start, 2),
+    }
+    print(f"{key}: {'would change' if dry_run else 'changed'} {rows} row(s) in {chunks} chunk(s), {result['seconds']}s")
+    logger.info(f"{key}: {result}")
+    return result
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk submit / cancel of Delivery Notes and stock-updating Sales Invoices.
+
+Submitting documents one by one (list view bulk actions) reads and writes the same
+batches once per document in separate transactions. run_bulk_action works in chunks of
+"Bulk Submit Chunk Size" documents, inside devp_custom.api.batch.deferred_batch_updates:
+
+    per chunk: lock the batches of all its documents in one name-ordered FOR UPDATE read
+    per document: savepoint, submit() / cancel(); the availability hooks check the
+        document against the chunk's projected available_batch_qty and stage the change
+        instead of writing it
+    per chunk: one UPDATE of tabBatch and one outbox insert, then commit
+
+A document that fails is rolled back to its savepoint and reported with its error; the
+rest of the chunk carries on. A deadlock rolls back the whole chunk transaction (and its
+savepoints), so the chunk is retried from scratch up to DEADLOCK_RETRIES times and then
+reported as failed; later chunks still run. The result is sent to the user over realtime
+and kept for RESULT_TTL seconds (get_bulk_action_result).
+"""
+from __future__ import annotations
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint, cstr, strip_html
+
+from devp_custom.api.batch import deferred_batch_updates
+from devp_custom.devp_custom.doctype.devp_custom_settings.devp_custom_settings import get_setting
+
+DOCTYPES = ("Delivery Note", "Sales Invoice")
+ITEM_DOCTYPES = {"Delivery Note": "Delivery Note Item", "Sales Invoice": "Sales Invoice Item"}
+ACTIONS = ("submit", "cancel")
+RESULT_KEY = "devp_bulk_stock_action"
+RESULT_TTL = 24 * 3600
+REALTIME_EVENT = "devp_bulk_stock_action"
+SAVEPOINT = "devp_bulk_stock_doc"
+DEADLOCK_RETRIES = 2
+
+
+def _error_message(exc):
+    """Last message the document raised, as plain text."""
+    messages = [(json.loads(m) if isinstance(m, str) else m).get("message") for m in frappe.message_log or []]
+    message = next((m for m in reversed(messages) if m), None) or cstr(exc) or exc.__class__.__name__
+    return strip_html(cstr(message)).strip()
+
+
+def _is_deadlock(exc):
+    """True when exc (or an exception it wraps) is a deadlock, which ends the transaction."""
+    seen = exc
+    while seen is not None:
+        if isinstance(seen, frappe.QueryDeadlockError) or frappe.db.is_deadlocked(seen):
+            return True
+        seen = seen.__cause__ or seen.__context__
+    return False
+
+
+def _chunk_batches(doctype, names):
+    """Existing batches on the item rows of `names`."""
+    return frappe.db.sql_list(
+        f"""
+        SELECT DISTINCT b.name
+        FROM `tab{ITEM_DOCTYPES[doctype]}` c
+        JOIN `tabBatch` b ON b.name = c.batch_no
+        WHERE c.parenttype = %s AND c.parent IN ({", ".join(["%s"] * len(names))})
+        """,
+        (doctype, *names),
+    )
+
+
+def _run_document(doctype, name, action):
+    doc = frappe.get_doc(doctype, name)
+    if action == "submit":
+        if doc.docstatus != 0:
+            frappe.throw(_("{0} {1} is not a draft").format(_(doctype), name))
+        doc.submit()
+    else:
+        if doc.docstatus != 1:
+            frappe.throw(_("{0} {1} is not submitted").format(_(doctype), name))
+        doc.cancel()
+
+
+def _attempt_chunk(doctype, names, action):
+    """One transaction over the chunk; returns (done, failed). Deadlocks propagate."""
+    done, failed = [], []
+    with deferred_batch_updates() as pending:
+        pending.lock(_chunk_batches(doctype, names))
+        for name in names:
+            snapshot = pending.snapshot()
+            frappe.db.savepoint(SAVEPOINT)
+            try:
+                _run_document(doctype, name, action)
+                done.append(name)
+            except Exception as e:
+                if _is_deadlock(e):
+                    raise  # the transaction and its savepoint are gone
+                frappe.db.rollback(save_point=SAVEPOINT)
+                pending.restore(snapshot)
+                frappe.clear_document_cache(doctype, name)
+                failed.append({"name": name, "error": _error_message(e)})
+            finally:
+                frappe.clear_messages()
+
+        try:
+            pending.flush()
+            frappe.db.commit()
+        except Exception as e:
+            if _is_deadlock(e):
+                raise
+            frappe.db.rollback()
+            frappe.log_error(title=_("Bulk {0} of {1} failed").format(action, doctype))
+            for name in done:
+                frappe.clear_document_cache(doctype, name)
+            return [], failed + [{"name": name, "error": _error_message(e)} for name in done]
+    return done, failed
+
+
+def _run_chunk(doctype, names, action, result):
+    for attempt in range(DEADLOCK_RETRIES + 1):
+        try:
+            done, failed = _attempt_chunk(doctype, names, action)
+        except Exception as e:
+            # deadlock, or anything else that left the transaction unusable
+            error = _error_message(e)
+            frappe.db.rollback()
+            frappe.clear_messages()
+            for name in names:
+                frappe.clear_document_cache(doctype, name)
+            if _is_deadlock(e) and attempt < DEADLOCK_RETRIES:
+                continue
+            frappe.log_error(title=_("Bulk {0} of {1} failed").format(action, doctype))
+            result["failed"].extend({"name": name, "error": error} for name in names)
+            return
+        result["done"].extend(done)
+        result["failed"].extend(failed)
+        return
+
+
+def run_bulk_action(doctype, names, action, bulk_id):
+    """Background job: submit or cancel `names` chunk by chunk."""
+    chunk_size = cint(get_setting("bulk_submit_chunk_size", 50)) or 50
+    result = {"bulk_id": bulk_id, "doctype": doctype, "action": action, "total": len(names),
+              "done": [], "failed": []}
+    title = _("Bulk {0}: {1}").format(_(action.title()), _(doctype))
+
+    for start in range(0, len(names), chunk_size):
+        _run_chunk(doctype, names[start:start + chunk_size], action, result)
+        processed = len(result["done"]) + len(result["failed"])
+        frappe.publish_progress(
+            processed * 100 / (len(names) or 1), title=title,
+            description=_("{0} of {1} documents").format(processed, len(names)),
+        )
+
+    frappe.cache().set_value(f"{RESULT_KEY}:{bulk_id}", result, expires_in_sec=RESULT_TTL)
+    frappe.publish_realtime(REALTIME_EVENT, result, user=frappe.session.user)
+    return result
+
+
+@frappe.whitelist()
+def enqueue_bulk_action(doctype, names, action):
+    """List view action: queue run_bulk_action for the selected documents."""
+    if doctype not in DOCTYPES:
+        frappe.throw(_("Bulk submit / cancel is not available for {0}").format(_(doctype)))
+    if action not in ACTIONS:
+        frappe.throw(_("Unknown bulk action {0}").format(action))
+    if isinstance(names, str):
+        names = json.loads(names or "[]")
+    names = list(dict.fromkeys(n for n in names or [] if n))
+    if not names:
+        frappe.throw(_("Select at least one document"))
+    frappe.has_permission(doctype, action, throw=True)
+
+    bulk_id = frappe.generate_hash(length=10)
+    frappe.enqueue(
+        "devp_custom.bulk_stock.run_bulk_action",
+        queue="long",
+        timeout=6 * 3600,
+        job_id=f"{RESULT_KEY}::{bulk_id}",
+        enqueue_after_commit=True,
+        doctype=doctype,
+        names=names,
+        action=action,
+        bulk_id=bulk_id,
+    )
+    return {"bulk_id": bulk_id, "total": len(names)}
+
+
+@frappe.whitelist()
+def get_bulk_action_result(bulk_id):
+    """Result of a finished bulk run ({done, failed: [{name, error}]}), or None while it runs."""
+    result = frappe.cache().get_value(f"{RESULT_KEY}:{bulk_id}")
+    if result and not frappe.has_permission(result["doctype"], "read"):
+        frappe.throw(_("Not permitted"), frappe.PermissionError)
+    return result
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""bench commands of devp_custom."""
+from __future__ import annotations
+
+import json
+
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("devp-prewarm-caches")
+@click.option("--time-budget", type=int, help="Seconds to spend (default: Devp Custom Settings).")
+@click.option("--background", is_flag=True, default=False, help="Queue the job instead of running it now.")
+@pass_context
+def prewarm_caches(context, time_budget=None, background=False):
+    """Warm devp_custom caches for the busiest recent customers and items."""
+    import frappe
+
+    from devp_custom.prewarm import enqueue_prewarm
+    from devp_custom.prewarm import prewarm_caches as run_prewarm
+
+    frappe.init(site=get_site(context))
+    frappe.connect()
+    try:
+        if background:
+            enqueue_prewarm(force=True, time_budget=time_budget)
+            frappe.db.commit()
+            click.echo("Cache prewarm queued")
+        else:
+            click.echo(json.dumps(run_prewarm(time_budget), indent=1))
+    finally:
+        frappe.destroy()
+
+
+commands = [prewarm_caches]
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Per-customer item catalog for the /customer_catalog portal page.
+
+The catalog (every enabled sales item under the customer's own name and description,
+resolved with the Item Customer Mapping precedence of
+devp_custom.api.item_customer.choose_customer_mapping) is built once per customer and
+kept in Redis. Pages are served from the cached, sorted list: search filters it in
+memory and pagination is keyset based (`after` = sort key of the last row shown), so a
+request costs one Customer lookup plus one cache read.
+
+Cache keys carry three version counters (customer, customer group, global) stored in one
+Redis hash. Changing a mapping bumps only the versions it can affect, which orphans the
+affected catalogs; orphaned entries expire with CATALOG_TTL.
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from itertools import islice
+
+import frappe
+from frappe.utils import cint, cstr
+
+from devp_custom.api.item_customer import choose_customer_mapping
+from devp_custom.instrumentation import instrument
+
+CATALOG_KEY = "devp_customer_catalog"
+VERSIONS_KEY = "devp_customer_catalog_versions"
+CATALOG_TTL = 6 * 3600
+# Item fields build_catalog reads or filters on
+CATALOG_ITEM_FIELDS = ("item_name", "description", "disabled", "is_sales_item", "has_variants", "stock_uom", "image")
+PAGE_LENGTH = 50
+KEY_SEPARATOR = "\x1f"
+
+
+# ---------------------------------------------------------------------
+# Cache versions
+# ---------------------------------------------------------------------
+def _versions(customer, customer_group):
+    cache = frappe.cache()
+    try:
+        # raw hmget: RedisWrapper's hash helpers pickle values
+        values = cache.hmget(cache.make_key(VERSIONS_KEY), [f"c:{customer}", f"g:{customer_group}", "all"])
+    except Exception:
+        return None
+    return ".".join(cstr(cint(v)) for v in values)
+
+
+def _bump(*fields):
+    fields = [f for f in fields if f]
+    if not fields:
+        return
+    cache = frappe.cache()
+    try:
+        pipe = cache.pipeline()
+        for field in fields:
+            pipe.hincrby(cache.make_key(VERSIONS_KEY), field, 1)
+        pipe.execute()
+    except Exception:
+        frappe.logger("devp_custom.customer_catalog").warning("Could not invalidate catalogs", exc_info=True)
+
+
+@instrument
+def invalidate_for_mapping(doc, method=None):
+    """Item Customer Mapping on_update / on_trash."""
+    fields = set()
+    before = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    for d in filter(None, (doc, before)):
+        if d.get("customer"):
+            fields.add(f"c:{d.customer}")
+        elif d.get("customer_group"):
+            fields.add(f"g:{d.customer_group}")
+        else:
+            fields.add("all")
+    _bump(*fields)
+
+
+@instrument
+def invalidate_all(doc=None, method=None, *args, **kwargs):
+    """Item on_update / on_trash / after_rename. On update only a change to a
+    CATALOG_ITEM_FIELDS value (or a new item) invalidates the catalogs."""
+    if method == "on_update" and doc is not None and not any(doc.has_value_changed(f) for f in CATALOG_ITEM_FIELDS):
+        return
+    _bump("all")
+
+
+# ---------------------------------------------------------------------
+# Catalog
+# ---------------------------------------------------------------------
+def build_catalog(customer, customer_group=None):
+    """Sorted [(sort_key, row)] for one customer; two queries."""
+    items = frappe.get_all(
+        "Item",
+        filters={"disabled": 0, "is_sales_item": 1, "has_variants": 0},
+        fields=["name", "item_name", "description", "stock_uom", "image"],
+        limit_page_length=0,
+    )
+    mappings = frappe.db.sql(
+        """
+        SELECT name, item, customer, customer_group, customer_item_name, customer_description,
+               priority, modified
+        FROM `tabItem Customer Mapping`
+        WHERE is_active = 1
+          AND (customer = %s
+               OR (IFNULL(customer, '') = '' AND customer_group = %s)
+               OR (IFNULL(customer, '') = '' AND IFNULL(customer_group, '') = ''))
+        """,
+        (customer, customer_group or ""),
+        as_dict=True,
+    )
+    by_item = {}
+    for m in mappings:
+        by_item.setdefault(m.item, []).append(m)
+
+    catalog = []
+    for item in items:
+        chosen = choose_customer_mapping(by_item.get(item.name, []), customer, customer_group) or {}
+        name = chosen.get("customer_item_name") or item.item_name or item.name
+        description = chosen.get("customer_description") or item.description or ""
+        row = {
+            "item_code": item.name,
+            "name": name,
+            "description": description,
+            "uom": item.stock_uom,
+            "image": item.image,
+            "search": f"{name} {item.name} {frappe.utils.strip_html(description)}".lower(),
+        }
+        catalog.append((f"{name.lower()}{KEY_SEPARATOR}{item.name}", row))
+    catalog.sort(key=lambda entry: entry[0])
+    return catalog
+
+
+def get_catalog(customer, customer_group=None):
+    versions = _versions(customer, customer_group)
+    if versions is None:
+        return build_catalog(customer, customer_group)
+
+    key = f"{CATALOG_KEY}:{customer}:{versions}"
+    catalog = frappe.cache().get_value(key)
+    if catalog is None:
+        catalog = build_catalog(customer, customer_group)
+        frappe.cache().set_value(key, catalog, expires_in_sec=CATALOG_TTL)
+    return catalog
+
+
+def get_page(customer, customer_group=None, search=None, after=None, page_length=PAGE_LENGTH):
+    """Rows after the `after` sort key that match every search word, plus the next cursor."""
+    catalog = get_catalog(customer, customer_group)
+    words = cstr(search).lower().split()
+    page_length = cint(page_length) or PAGE_LENGTH
+
+    start = bisect_right(catalog, cstr(after), key=lambda entry: entry[0]) if after else 0
+    rows, next_after = [], None
+    for sort_key, row in islice(catalog, start, None):
+        if words and not all(w in row["search"] for w in words):
+            continue
+        if len(rows) == page_length:
+            next_after = rows[-1][0]
+            break
+        rows.append((sort_key, row))
+    return [row for _key, row in rows], next_after, len(catalog)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Read-replica routing for devp_custom's read-only queries.
+
+    with read_replica("price_history"):
+        rows = frappe.db.sql(...)
+
+The block runs on Frappe's read-only replica (site_config: read_from_replica, replica_host,
+replica_db_port) when "Route Read-Only Queries to Replica" is enabled in Devp Custom
+Settings and the key is not listed under "Keep on Primary". When no replica is configured
+or it cannot be reached, the block runs on the primary. Nested blocks reuse the outer
+connection, like frappe.read_only().
+
+Point replica_host / replica_db_port at a second local MariaDB instance and run
+    bench --site <site> execute devp_custom.db_routing.check
+to see which server each key is routed to.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint
+
+from devp_custom.devp_custom.doctype.devp_custom_settings.devp_custom_settings import get_setting
+
+# keys used by devp_custom read paths
+QUERY_KEYS = ("price_history", "item_customer_lookup")
+
+
+def replica_enabled(key):
+    if not frappe.conf.get("read_from_replica"):
+        return False
+    if not cint(get_setting("enable_replica_reads", 0)):
+        return False
+    excluded = {k.strip() for k in (get_setting("replica_excluded_queries") or "").splitlines()}
+    return key not in excluded
+
+
+def _restore_primary():
+    if hasattr(frappe.local, "primary_db"):
+        frappe.local.db = frappe.local.primary_db
+        del frappe.local.primary_db
+
+
+@contextmanager
+def read_replica(key):
+    """Run the block on the replica if routing is enabled for `key`; yields True when it does."""
+    if hasattr(frappe.local, "primary_db"):
+        # already inside a replica block (ours or frappe.read_only)
+        yield True
+        return
+    if not replica_enabled(key):
+        yield False
+        return
+
+    switched = False
+    try:
+        frappe.connect_replica()
+        switched = hasattr(frappe.local, "primary_db")
+        if switched:
+            # connections are opened lazily; fail here rather than on the first query
+            frappe.local.db.connect()
+    except Exception:
+        frappe.logger("devp_custom.db_routing").warning(
+            f"Read replica unavailable for {key}; using the primary", exc_info=True
+        )
+        _restore_primary()
+        switched = False
+
+    try:
+        yield switched
+    finally:
+        if switched:
+            try:
+                frappe.local.db.close()
+            finally:
+                _restore_primary()
+
+
+def check():
+    """Server each query key is routed to (for verifying a replica setup)."""
+    probe = "SELECT @@hostname, @@port, @@read_only"
+    result = {"primary": frappe.db.sql(probe)[0]}
+    for key in QUERY_KEYS:
+        with read_replica(key) as on_replica:
+            result[key] = {"on_replica": on_replica, "server": frappe.db.sql(probe)[0]}
+    return result
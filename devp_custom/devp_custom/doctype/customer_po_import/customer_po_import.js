@@ -0,0 +1,16 @@
+// Customer PO Import: queue the background import, then link to the draft Sales Order
+
+frappe.ui.form.on('Customer PO Import', {
+  refresh: function (frm) {
+    if (!frm.is_new() && !frm.doc.sales_order && !['Queued', 'Processing'].includes(frm.doc.status)) {
+      frm.add_custom_button(__('Start Import'), function () {
+        frm.call('start_import').then(() => frm.reload_doc());
+      }).addClass('btn-primary');
+    }
+    if (frm.doc.sales_order) {
+      frm.add_custom_button(__('Open Sales Order'), function () {
+        frappe.set_route('Form', 'Sales Order', frm.doc.sales_order);
+      });
+    }
+  }
+});
@@ -0,0 +1,23 @@
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+from devp_custom.po_ingestion import enqueue_import
+
+
+class CustomerPOImport(Document):
+    def validate(self):
+        if not 0 < (self.match_threshold or 0) <= 1:
+            frappe.throw(_("Match Threshold must be between 0 and 1"))
+
+    @frappe.whitelist()
+    def start_import(self):
+        """Queue devp_custom.po_ingestion.run_import for this PO."""
+        if self.sales_order:
+            frappe.throw(_("Sales Order {0} was already created from this PO").format(self.sales_order))
+        if self.status in ("Queued", "Processing"):
+            frappe.throw(_("This PO is already being imported"))
+
+        self.db_set("status", "Queued", notify=True)
+        enqueue_import(self.name)
+        frappe.msgprint(_("Import queued. The Sales Order link appears here when it is done."), alert=True)
@@ -0,0 +1,20 @@
+import frappe
+from frappe.model.document import Document
+
+
+class DevpCustomSettings(Document):
+    pass
+
+
+def get_setting(fieldname, default=None):
+    """
+    Read one field from Devp Custom Settings (cached single value).
+    Returns `default` when the field is empty or the doctype is not migrated yet.
+    """
+    try:
+        value = frappe.db.get_single_value("Devp Custom Settings", fieldname)
+    except Exception:
+        return default
+    if value in (None, ""):
+        return default
+    return value
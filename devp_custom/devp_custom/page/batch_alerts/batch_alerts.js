@@ -0,0 +1,131 @@
+// devp_custom/devp_custom/page/batch_alerts/batch_alerts.js
+// Low-availability and near-expiry batches, with per-item counts and keyset paging.
+
+frappe.pages['batch-alerts'].on_page_load = function (wrapper) {
+    const page = frappe.ui.make_app_page({
+        parent: wrapper,
+        title: __('Batch Alerts'),
+        single_column: true
+    });
+
+    const kind = page.add_field({
+        fieldname: 'kind', label: __('Alert'), fieldtype: 'Select',
+        options: [
+            { value: 'low', label: __('Low Availability') },
+            { value: 'expiry', label: __('Near Expiry') }
+        ],
+        default: 'low',
+        change: () => load()
+    });
+    const threshold = page.add_field({
+        fieldname: 'threshold', label: __('Threshold (ratio)'), fieldtype: 'Float',
+        change: () => load()
+    });
+    const expiry_days = page.add_field({
+        fieldname: 'expiry_days', label: __('Expiry Days'), fieldtype: 'Int',
+        change: () => load()
+    });
+    const item_code = page.add_field({
+        fieldname: 'item_code', label: __('Item'), fieldtype: 'Link', options: 'Item',
+        change: () => load_rows()
+    });
+
+    const $summary = $('<div class="batch-alerts-summary"></div>').appendTo(page.main);
+    const $rows = $('<div class="batch-alerts-rows"></div>').appendTo(page.main);
+    const $more = $(`<button class="btn btn-default btn-sm">${__('Load More')}</button>`)
+        .appendTo(page.main).hide();
+
+    let cursor = null;
+
+    page.set_primary_action(__('Refresh'), () => load(), 'refresh');
+    $more.on('click', () => load_rows(true));
+
+    function args() {
+        return {
+            threshold: threshold.get_value() || null,
+            expiry_days: expiry_days.get_value() || null
+        };
+    }
+
+    function render_summary(data) {
+        const current = data[kind.get_value()] || {};
+        const tops = (current.top_items || []).map(r =>
+            `<a class="batch-alerts-item" data-item="${frappe.utils.escape_html(r.item)}">`
+            + `${frappe.utils.escape_html(r.item)} (${r.batches})</a>`
+        ).join(', ');
+
+        $summary.html(
+            `<p class="text-muted">
+                ${__('Low availability')}: <b>${(data.low || {}).total || 0}</b>
+                ${__('batches below {0} of batch size', [format_number(data.threshold, null, 2)])},
+                ${__('near expiry')}: <b>${(data.expiry || {}).total || 0}</b>
+                ${__('batches within {0} days', [data.expiry_days])}.
+            </p>
+            ${tops ? `<p>${__('Items with most alerts')}: ${tops}</p>` : ''}`
+        );
+        $summary.find('.batch-alerts-item').on('click', function () {
+            item_code.set_value($(this).attr('data-item'));
+        });
+    }
+
+    function row_html(r) {
+        return `<tr>
+            <td><a href="/app/batch/${encodeURIComponent(r.name)}">${frappe.utils.escape_html(r.name)}</a></td>
+            <td>${frappe.utils.escape_html(r.item)}</td>
+            <td>${frappe.utils.escape_html(r.item_name || '')}</td>
+            <td class="text-right">${format_number(r.available_batch_qty)}</td>
+            <td class="text-right">${format_number(r.batch_size)}</td>
+            <td class="text-right">${r.availability_ratio == null ? '' : format_number(r.availability_ratio * 100, null, 1) + '%'}</td>
+            <td>${r.expiry_date ? frappe.datetime.str_to_user(r.expiry_date) : ''}</td>
+        </tr>`;
+    }
+
+    function load_rows(append) {
+        if (!append) {
+            cursor = null;
+        }
+        frappe.call({
+            method: 'devp_custom.api.batch_alerts.get_batch_alerts',
+            args: Object.assign(args(), {
+                kind: kind.get_value(),
+                item_code: item_code.get_value() || null,
+                after: append ? cursor : null,
+                limit: 100
+            })
+        }).then(r => {
+            const data = (r && r.message) || {};
+            const rows = (data.rows || []).map(row_html).join('');
+            cursor = data.cursor;
+            $more.toggle(!!cursor);
+
+            if (append) {
+                $rows.find('tbody').append(rows);
+                return;
+            }
+            $rows.html(
+                `<table class="table table-bordered table-sm">
+                    <thead>
+                        <tr>
+                            <th>${__('Batch')}</th>
+                            <th>${__('Item')}</th>
+                            <th>${__('Item Name')}</th>
+                            <th class="text-right">${__('Available')}</th>
+                            <th class="text-right">${__('Batch Size')}</th>
+                            <th class="text-right">${__('Available')} %</th>
+                            <th>${__('Expiry Date')}</th>
+                        </tr>
+                    </thead>
+                    <tbody>${rows || `<tr><td colspan="7" class="text-muted">${__('No batches.')}</td></tr>`}</tbody>
+                </table>`
+            );
+        });
+    }
+
+    function load() {
+        frappe.call({ method: 'devp_custom.api.batch_alerts.get_batch_alert_summary', args: args() })
+            .then(r => render_summary((r && r.message) || {}));
+        load_rows();
+    }
+
+    load();
+};
@@ -0,0 +1,75 @@
+// devp_custom/devp_custom/page/hook_timings/hook_timings.js
+// p50/p95/p99 wall time, query count and DB time per devp_custom hook.
+
+frappe.pages['hook-timings'].on_page_load = function (wrapper) {
+    const page = frappe.ui.make_app_page({
+        parent: wrapper,
+        title: __('Hook Timings'),
+        single_column: true
+    });
+
+    const $body = $('<div class="hook-timings"></div>').appendTo(page.main);
+
+    page.set_primary_action(__('Refresh'), () => load(), 'refresh');
+    page.set_secondary_action(__('Reset Samples'), () => {
+        frappe.confirm(__('Clear all recorded samples?'), () => {
+            frappe.call({ method: 'devp_custom.instrumentation.reset_hook_stats' }).then(() => load());
+        });
+    });
+
+    function fmt(v) {
+        return (Math.round(flt(v) * 10) / 10).toLocaleString();
+    }
+
+    function render(data) {
+        const rows = (data.rows || []).map(r =>
+            `<tr>
+                <td><code>${frappe.utils.escape_html(r.hook)}</code></td>
+                <td class="text-right">${r.calls}</td>
+                <td class="text-right">${fmt(r.p50_ms)}</td>
+                <td class="text-right">${fmt(r.p95_ms)}</td>
+                <td class="text-right">${fmt(r.p99_ms)}</td>
+                <td class="text-right">${fmt(r.max_ms)}</td>
+                <td class="text-right">${r.p95_queries}</td>
+                <td class="text-right">${r.max_queries}</td>
+                <td class="text-right">${fmt(r.p95_db_ms)}</td>
+            </tr>`
+        ).join('');
+
+        const status = data.enabled
+            ? __('Recording. Calls slower than {0} ms are logged.', [data.threshold_ms])
+            : __('Instrumentation is disabled in Devp Custom Settings.');
+
+        const missing = (data.uninstrumented || []).length
+            ? `<div class="alert alert-warning">${__('Not instrumented')}: ${data.uninstrumented.map(frappe.utils.escape_html).join(', ')}</div>`
+            : '';
+
+        $body.html(
+            `<p class="text-muted">${status}</p>
+            ${missing}
+            <table class="table table-bordered table-sm">
+                <thead>
+                    <tr>
+                        <th>${__('Hook')}</th>
+                        <th class="text-right">${__('Calls')}</th>
+                        <th class="text-right">p50 ms</th>
+                        <th class="text-right">p95 ms</th>
+                        <th class="text-right">p99 ms</th>
+                        <th class="text-right">${__('Max')} ms</th>
+                        <th class="text-right">p95 ${__('Queries')}</th>
+                        <th class="text-right">${__('Max')} ${__('Queries')}</th>
+                        <th class="text-right">p95 DB ms</th>
+                    </tr>
+                </thead>
+                <tbody>${rows || `<tr><td colspan="9" class="text-muted">${__('No samples yet.')}</td></tr>`}</tbody>
+            </table>`
+        );
+    }
+
+    function load() {
+        frappe.call({ method: 'devp_custom.instrumentation.get_hook_stats' })
+            .then(r => render((r && r.message) || {}));
+    }
+
+    load();
+};
@@ -0,0 +1,54 @@
+// Item Selling Price History: SI / DN / SO line rates per item and customer.
+// The grid shows the latest rows; "Export CSV" streams the full history to a .csv.gz file
+// in a background job.
+
+frappe.query_reports["Item Selling Price History"] = {
+    filters: [
+        {
+            fieldname: "company",
+            label: __("Company"),
+            fieldtype: "Link",
+            options: "Company",
+            default: frappe.defaults.get_user_default("Company"),
+        },
+        {
+            fieldname: "from_date",
+            label: __("From Date"),
+            fieldtype: "Date",
+            default: frappe.datetime.add_months(frappe.datetime.get_today(), -12),
+        },
+        {
+            fieldname: "to_date",
+            label: __("To Date"),
+            fieldtype: "Date",
+            default: frappe.datetime.get_today(),
+        },
+        {
+            fieldname: "item_code",
+            label: __("Item"),
+            fieldtype: "Link",
+            options: "Item",
+        },
+        {
+            fieldname: "customer",
+            label: __("Customer"),
+            fieldtype: "Link",
+            options: "Customer",
+        },
+        {
+            fieldname: "doc_type",
+            label: __("Document Type"),
+            fieldtype: "Select",
+            options: ["", "Sales Invoice", "Delivery Note", "Sales Order"],
+        },
+    ],
+
+    onload(report) {
+        report.page.add_inner_button(__("Export CSV (gzip)"), () => {
+            frappe.call({
+                method: "devp_custom.devp_custom.report.item_selling_price_history.item_selling_price_history.export_price_history",
+                args: { filters: report.get_values() },
+            });
+        });
+    },
+};
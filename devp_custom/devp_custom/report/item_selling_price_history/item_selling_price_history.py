@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Item Selling Price History: every submitted SI / DN / SO line rate per item and customer
+(the full history behind devp_custom.api.get_last_item_prices).
+
+The report view is capped at REPORT_ROW_LIMIT rows. export_price_history() writes the
+complete result in a background job: rows are streamed from an unbuffered (server-side)
+cursor straight into a gzip CSV File, so memory stays flat however many rows match. The
+compressed bytes are hashed as they are written, so the File gets its content_hash and
+file_size without reading the export back.
+"""
+from __future__ import annotations
+
+import csv
+import gzip
+import hashlib
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+
+from devp_custom.db_routing import read_replica
+
+REPORT_ROW_LIMIT = 5000
+EXPORT_CHUNK_SIZE = 10000
+
+SOURCES = (
+    # parent doctype, child doctype, date field
+    ("Sales Invoice", "Sales Invoice Item", "posting_date"),
+    ("Delivery Note", "Delivery Note Item", "posting_date"),
+    ("Sales Order", "Sales Order Item", "transaction_date"),
+)
+
+EXPORT_FIELDS = (
+    "doc_type", "document", "posting_date", "customer", "item_code", "item_name",
+    "qty", "uom", "rate", "amount", "currency",
+)
+
+
+def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    query, params = get_query(filters)
+    with read_replica("price_history"):
+        data = frappe.db.sql(
+            f"{query} ORDER BY posting_date DESC, document DESC LIMIT {REPORT_ROW_LIMIT + 1}",
+            params,
+            as_dict=True,
+        )
+
+    message = None
+    if len(data) > REPORT_ROW_LIMIT:
+        data = data[:REPORT_ROW_LIMIT]
+        message = _("Showing the latest {0} rows. Use Export CSV for the full history.").format(REPORT_ROW_LIMIT)
+    return get_columns(), data, message
+
+
+def get_columns():
+    return [
+        {"label": _("Type"), "fieldname": "doc_type", "fieldtype": "Data", "width": 110},
+        {"label": _("Document"), "fieldname": "document", "fieldtype": "Dynamic Link", "options": "doc_type", "width": 160},
+        {"label": _("Date"), "fieldname": "posting_date", "fieldtype": "Date", "width": 100},
+        {"label": _("Customer"), "fieldname": "customer", "fieldtype": "Link", "options": "Customer", "width": 180},
+        {"label": _("Item"), "fieldname": "item_code", "fieldtype": "Link", "options": "Item", "width": 150},
+        {"label": _("Item Name"), "fieldname": "item_name", "fieldtype": "Data", "width": 180},
+        {"label": _("Qty"), "fieldname": "qty", "fieldtype": "Float", "width": 80},
+        {"label": _("UOM"), "fieldname": "uom", "fieldtype": "Link", "options": "UOM", "width": 70},
+        {"label": _("Rate"), "fieldname": "rate", "fieldtype": "Currency", "options": "currency", "width": 110},
+        {"label": _("Amount"), "fieldname": "amount", "fieldtype": "Currency", "options": "currency", "width": 120},
+        {"label": _("Currency"), "fieldname": "currency", "fieldtype": "Link", "options": "Currency", "width": 70, "hidden": 1},
+    ]
+
+
+def get_sources(filters):
+    """SOURCES rows selected by the doc_type filter."""
+    sources = [s for s in SOURCES if not filters.get("doc_type") or filters.doc_type == s[0]]
+    if not sources:
+        frappe.throw(_("Unknown document type {0}").format(filters.doc_type))
+    return sources
+
+
+def get_query(filters):
+    """UNION ALL over the selected sources; returns (sql, params) without ORDER BY / LIMIT."""
+    parts, params = [], []
+    for doctype, child, date_field in get_sources(filters):
+        conditions = ["p.docstatus = 1"]
+        for fieldname, column in (("company", "p.company"), ("customer", "p.customer"), ("item_code", "c.item_code")):
+            if filters.get(fieldname):
+                conditions.append(f"{column} = %s")
+                params.append(filters.get(fieldname))
+        if filters.get("from_date"):
+            conditions.append(f"p.`{date_field}` >= %s")
+            params.append(filters.from_date)
+        if filters.get("to_date"):
+            conditions.append(f"p.`{date_field}` <= %s")
+            params.append(filters.to_date)
+
+        parts.append(f"""
+            SELECT '{doctype}' AS doc_type, p.name AS document, p.`{date_field}` AS posting_date,
+                   p.customer, c.item_code, c.item_name, c.qty, c.uom, c.rate, c.amount,
+                   p.currency
+            FROM `tab{child}` c
+            JOIN `tab{doctype}` p ON p.name = c.parent
+            WHERE {" AND ".join(conditions)}
+        """)
+
+    return "SELECT * FROM ({}) history".format(" UNION ALL ".join(parts)), params
+
+
+# ---------------------------------------------------------------------
+# Background CSV export
+# ---------------------------------------------------------------------
+class _HashingWriter:
+    """File wrapper for gzip: md5 and byte count of everything written to the file."""
+
+    def __init__(self, f):
+        self.f = f
+        self.md5 = hashlib.md5(usedforsecurity=False)
+        self.size = 0
+
+    def write(self, data):
+        self.md5.update(data)
+        self.size += len(data)
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+
+@frappe.whitelist()
+def export_price_history(filters=None):
+    """Queue the full export; the user gets a link to the .csv.gz File when it is done."""
+    if isinstance(filters, str):
+        filters = json.loads(filters or "{}")
+    for doctype, _child, _date_field in get_sources(frappe._dict(filters or {})):
+        frappe.has_permission(doctype, "read", throw=True)
+
+    frappe.enqueue(
+        "devp_custom.devp_custom.report.item_selling_price_history.item_selling_price_history.write_export",
+        queue="long",
+        timeout=4 * 3600,
+        filters=filters or {},
+        user=frappe.session.user,
+    )
+    frappe.msgprint(_("Export queued. You will get a link when the file is ready."), alert=True)
+
+
+def write_export(filters, user):
+    filters = frappe._dict(filters or {})
+    query, params = get_query(filters)
+    title = _("Item Selling Price History export")
+
+    file_name = "item_selling_price_history_{}_{}.csv.gz".format(
+        now_datetime().strftime("%Y%m%d_%H%M%S"), frappe.generate_hash(length=6)
+    )
+    path = frappe.get_site_path("private", "files", file_name)
+
+    written = 0
+    with read_replica("price_history"):
+        total = cint(frappe.db.sql(f"SELECT COUNT(*) FROM ({query}) counted", params)[0][0])
+
+        with open(path, "wb") as raw:
+            hashed = _HashingWriter(raw)
+            with gzip.open(hashed, "wt", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(EXPORT_FIELDS)
+                chunk = []
+                # server-side cursor: rows arrive as they are read, never all at once
+                with frappe.db.unbuffered_cursor():
+                    for row in frappe.db.sql(query, params, as_iterator=True):
+                        chunk.append(row)
+                        if len(chunk) >= EXPORT_CHUNK_SIZE:
+                            writer.writerows(chunk)
+                            written += len(chunk)
+                            chunk = []
+                            frappe.publish_progress(
+                                written * 100 / (total or 1), title=title,
+                                description=_("{0} of {1} rows").format(written, total),
+                            )
+                writer.writerows(chunk)
+                written += len(chunk)
+
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "file_url": f"/private/files/{file_name}",
+        "is_private": 1,
+        "content_hash": hashed.md5.hexdigest(),
+        "file_size": hashed.size,
+        "attached_to_doctype": "Report",
+        "attached_to_name": "Item Selling Price History",
+    })
+    file_doc.flags.ignore_permissions = True
+    file_doc.insert()
+    frappe.db.commit()
+
+    frappe.publish_progress(100, title=title, description=_("{0} rows").format(written))
+    frappe.publish_realtime(
+        "msgprint",
+        _("Item Selling Price History export is ready ({0} rows): {1}").format(
+            written, f'<a href="{file_doc.file_url}">{file_name}</a>'
+        ),
+        user=user,
+    )
+    return file_doc.name
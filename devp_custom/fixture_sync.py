@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental sync of the Custom Fields devp_custom owns.
+
+The fields live in devp_custom/custom_fields/custom_field.json (outside fixtures/, so
+frappe's own fixture sync does not re-import them on every migrate). On migrate we hash
+every record and apply only those whose hash differs from the one stored in
+"Fixture Sync Hash" (or whose Custom Field is missing on the site).
+
+    bench --site <site> execute devp_custom.fixture_sync.sync_custom_fields --kwargs "{'force': 1}"
+    bench --site <site> execute devp_custom.fixture_sync.export_custom_fields
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import defaultdict
+from time import perf_counter
+
+import frappe
+from frappe.utils import cint, flt, now_datetime
+
+HASH_DOCTYPE = "Fixture Sync Hash"
+CUSTOM_FIELD = "Custom Field"
+# average apply time per record, used to estimate the time saved by skipping
+APPLY_MS_GLOBAL = "devp_fixture_sync_ms_per_record"
+
+# export metadata, not part of the field definition
+IGNORED_KEYS = ("modified", "creation", "owner", "modified_by", "docstatus", "idx")
+NON_FIELD_KEYS = ("doctype", "name", "dt", *IGNORED_KEYS)
+
+
+def get_custom_fields_path():
+    return frappe.get_app_path("devp_custom", "custom_fields", "custom_field.json")
+
+
+def _load_records():
+    path = get_custom_fields_path()
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def _content_hash(record):
+    content = {k: v for k, v in record.items() if k not in IGNORED_KEYS}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _stored_hashes(doctype):
+    return dict(frappe.get_all(
+        HASH_DOCTYPE,
+        filters={"reference_doctype": doctype},
+        fields=["reference_name", "content_hash"],
+        as_list=True,
+    ))
+
+
+def _store_hashes(doctype, hashes):
+    keys = [f"{doctype}::{name}" for name in hashes]
+    frappe.db.delete(HASH_DOCTYPE, {"name": ["in", keys]})
+    now, user = now_datetime(), frappe.session.user
+    frappe.db.bulk_insert(
+        HASH_DOCTYPE,
+        ["name", "reference_doctype", "reference_name", "content_hash", "creation", "modified", "owner", "modified_by"],
+        [[f"{doctype}::{name}", doctype, name, h, now, now, user, user] for name, h in hashes.items()],
+    )
+
+
+def sync_custom_fields(force=False):
+    """after_install / after_migrate: apply owned Custom Fields whose content changed."""
+    from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+    start = perf_counter()
+    records = _load_records()
+    stored = {} if cint(force) else _stored_hashes(CUSTOM_FIELD)
+    existing = set(frappe.get_all(
+        CUSTOM_FIELD, filters={"name": ["in", [r["name"] for r in records]]}, pluck="name"
+    )) if records else set()
+
+    changed, new_hashes = defaultdict(list), {}
+    for record in records:
+        h = _content_hash(record)
+        if stored.get(record["name"]) == h and record["name"] in existing:
+            continue
+        changed[record["dt"]].append({k: v for k, v in record.items() if k not in NON_FIELD_KEYS})
+        new_hashes[record["name"]] = h
+
+    applied = len(new_hashes)
+    apply_start = perf_counter()
+    if changed:
+        create_custom_fields(dict(changed), ignore_validate=True, update=True)
+        _store_hashes(CUSTOM_FIELD, new_hashes)
+        frappe.db.commit()
+    apply_ms = (perf_counter() - apply_start) * 1000
+
+    ms_per_record = flt(frappe.db.get_global(APPLY_MS_GLOBAL))
+    if applied:
+        ms_per_record = apply_ms / applied
+        frappe.db.set_global(APPLY_MS_GLOBAL, round(ms_per_record, 3))
+
+    skipped = len(records) - applied
+    message = (
+        f"devp_custom: Custom Field sync applied {applied} of {len(records)} records "
+        f"in {perf_counter() - start:.2f}s, skipped {skipped} unchanged"
+    )
+    if skipped and ms_per_record:
+        message += f" (~{skipped * ms_per_record / 1000:.2f}s saved)"
+    print(message)
+    frappe.logger("devp_custom.fixture_sync").info(message)
+    return {"total": len(records), "applied": applied, "skipped": skipped}
+
+
+def export_custom_fields(add=None):
+    """
+    Re-export the owned Custom Fields from this site into custom_fields/custom_field.json.
+    Only names already in the file are exported; pass add=[...] to take ownership of more.
+    """
+    if isinstance(add, str):
+        add = json.loads(add) if add.startswith("[") else [add]
+    names = sorted({r["name"] for r in _load_records()} | set(add or []))
+    if not names:
+        frappe.throw("No owned Custom Fields to export")
+
+    records = []
+    for name in names:
+        if not frappe.db.exists(CUSTOM_FIELD, name):
+            print(f"Skipping {name}: not found on this site")
+            continue
+        doc = frappe.get_doc(CUSTOM_FIELD, name)
+        record = doc.as_dict(no_default_fields=True)
+        record.update({"doctype": CUSTOM_FIELD, "name": name, "docstatus": 0, "modified": str(doc.modified)})
+        records.append(record)
+
+    with open(get_custom_fields_path(), "w") as f:
+        f.write(frappe.as_json(records))
+    print(f"Exported {len(records)} Custom Fields to {get_custom_fields_path()}")
+    return len(records)
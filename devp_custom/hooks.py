@@ -13,8 +13,8 @@ fixtures = [
     {"dt": "DocType", "filters": [["name", "in", ["Item Customer Info", "Item Customer Mapping"]]]},
     # ship their permissions, if any
     {"dt": "Custom DocPerm", "filters": [["parent", "in", ["Item Customer Info", "Item Customer Mapping"]]]},
-    # ship their fields if they’re custom on standard doctypes
-    "Custom Field",
+    # Custom Fields are not fixtures: the ones we own live in custom_fields/custom_field.json
+    # and are applied incrementally by devp_custom.fixture_sync (see after_migrate)
     # ship your client scripts if you rely on them
     "Client Script",
 ]
@@ -25,71 +25,155 @@ fixtures = [
 doctype_js = {
     "Item": "public/js/item_client.js",
     "Sales Order": [
+        "public/js/last_price_cache.js",     # shared last-price cache, before its users
         "public/js/sales_invoice_item.js",   # unified last-price popup (handles SO Item)
         "public/js/mapping_on_rate_change.js",
     ],
     "Quotation": [
+        "public/js/last_price_cache.js",
         "public/js/quotation_item_last_prices.js",
         "public/js/mapping_on_rate_change.js",
     ],
     "Sales Invoice": [
+        "public/js/last_price_cache.js",
         "public/js/sales_invoice_item.js",
         "public/js/sales_invoice_batch_dates.js",
         "public/js/sales_invoice_batch_size.js",
         "public/js/mapping_on_rate_change.js",
+        "public/js/batch_fefo_allocation.js",
     ],
     "Delivery Note": [
+        "public/js/last_price_cache.js",
         "public/js/sales_invoice_item.js",   # unified last-price popup (handles DN Item)
+        "public/js/batch_fefo_allocation.js",
     ],
 }
 
+# batch-aware bulk submit / cancel (devp_custom.bulk_stock)
+doctype_list_js = {
+    "Delivery Note": "public/js/bulk_stock_action.js",
+    "Sales Invoice": "public/js/bulk_stock_action.js",
+}
+
 # ---------------------------------------------------------------------
 # Server Hooks
 # ---------------------------------------------------------------------
 doc_events = {
     # Item code auto-generation
     "Item": {
-        "before_insert": "devp_custom.api.assign_item_code_before_insert",
-        "on_submit": "devp_custom.api.auto_set_item_code_on_submit",
+        "before_insert": "devp_custom.api.item_code.assign_item_code_before_insert",
+        "on_submit": "devp_custom.api.item_code.auto_set_item_code_on_submit",
+        # customer item name index (Item Customer Info rows), customer catalogs
+        "on_update": [
+            "devp_custom.api.item_lookup.update_item_info_index",
+            "devp_custom.customer_catalog.invalidate_all",
+        ],
+        "on_trash": [
+            "devp_custom.api.item_lookup.remove_item_info_index",
+            "devp_custom.customer_catalog.invalidate_all",
+        ],
+        "after_rename": [
+            "devp_custom.api.item_lookup.reindex_renamed_item",
+            "devp_custom.customer_catalog.invalidate_all",
+        ],
+    },
+    "Item Group": {
+        "on_update": "devp_custom.api.item_code.clear_item_group_prefixes",
+        "on_trash": "devp_custom.api.item_code.clear_item_group_prefixes",
+        "after_rename": "devp_custom.api.item_code.clear_item_group_prefixes",
+    },
+    "Item Customer Mapping": {
+        "on_update": [
+            "devp_custom.api.item_lookup.update_mapping_index",
+            "devp_custom.customer_catalog.invalidate_for_mapping",
+            "devp_custom.api.mapping_history.record_mapping_version",
+        ],
+        "on_trash": [
+            "devp_custom.api.item_lookup.remove_mapping_index",
+            "devp_custom.customer_catalog.invalidate_for_mapping",
+            "devp_custom.api.mapping_history.close_mapping_version",
+        ],
     },
 
-    # Line-level overrides
-    "Sales Invoice Item": {
-        "validate": "devp_custom.overrides.sales_invoice_item.calculate_amount",
+    # availability_ratio behind the Batch Alerts page
+    "Batch": {
+        "validate": "devp_custom.api.batch_alerts.set_availability_ratio",
     },
 
-    # Batch-size warning (non-blocking) on SI validate
+    # Batch-size check (Block / Warn / Off from Devp Custom Settings)
     "Work Order": {
-        "validate": "devp_custom.api.validate_work_order_batch_size",
+        "validate": "devp_custom.api.batch.validate_work_order_batch_size",
     },
     "Sales Invoice": {
         "autoname": "devp_custom.sales_invoice.autoname",
+        # line amounts from manual_amount, before ERPNext's taxes and totals
+        "before_validate": "devp_custom.overrides.sales_invoice_item.calculate_line_amounts",
         # keep your existing validate and add the manual-name validator
         "validate": [
-            "devp_custom.api.validate_sales_invoice_batch_size"
+            "devp_custom.api.batch.validate_sales_invoice_batch_size"
         ],
-        "before_save": "devp_custom.api.apply_customer_item_names",
+        "before_save": "devp_custom.api.item_customer.apply_customer_item_names",
         # Availability control (affects stock only when update_stock=1)
-        "before_submit": "devp_custom.api.validate_available_qty",
-        "on_submit": "devp_custom.api.consume_available_qty",
-        "on_cancel": "devp_custom.api.revert_available_qty",
+        "before_submit": "devp_custom.api.batch.validate_available_qty",
+        "on_submit": [
+            "devp_custom.api.batch.consume_available_qty",
+            "devp_custom.api.batch.clear_allow_override_after_submit",
+        ],
+        "on_cancel": "devp_custom.api.batch.revert_available_qty",
+        # free a requested invoice number again when its invoice is deleted
+        "on_trash": "devp_custom.sales_invoice.release_requested_name",
     },
 
     # Apply customer item names
     "Sales Order": {
-        "before_save": "devp_custom.api.apply_customer_item_names",
+        "before_save": "devp_custom.api.item_customer.apply_customer_item_names",
     },
     "Quotation": {
-        "before_save": "devp_custom.api.apply_customer_item_names",
+        "before_save": "devp_custom.api.item_customer.apply_customer_item_names",
     },
 
     # Delivery Note moves stock, so always apply availability control
     "Delivery Note": {
-        "before_submit": "devp_custom.api.validate_available_qty",
-        "on_submit": "devp_custom.api.consume_available_qty",
-        "on_cancel": "devp_custom.api.revert_available_qty",
+        "before_submit": "devp_custom.api.batch.validate_available_qty",
+        "on_submit": "devp_custom.api.batch.consume_available_qty",
+        "on_cancel": "devp_custom.api.batch.revert_available_qty",
         
     },
 }
 
+# ---------------------------------------------------------------------
+# Portal
+# ---------------------------------------------------------------------
+portal_menu_items = [
+    {"title": "Catalog", "route": "/customer_catalog", "role": "Customer"},
+]
+
+# ---------------------------------------------------------------------
+# Install / Migrate
+# ---------------------------------------------------------------------
+after_install = "devp_custom.fixture_sync.sync_custom_fields"
+after_migrate = [
+    "devp_custom.fixture_sync.sync_custom_fields",
+    # warm caches in the background (Devp Custom Settings > Cache Prewarming)
+    "devp_custom.prewarm.enqueue_prewarm",
+]
+
+# ---------------------------------------------------------------------
+# Scheduled Tasks
+# ---------------------------------------------------------------------
+scheduler_events = {
+    "cron": {
+        # batch availability outbox: number and deliver new events
+        "* * * * *": [
+            "devp_custom.outbox.dispatch_batch_events",
+        ],
+    },
+    "hourly": [
+        "devp_custom.invoice_number_pool.release_idle_pools",
+    ],
+    "daily": [
+        "devp_custom.outbox.prune_batch_events",
+    ],
+}
+
 # (Leave the rest of the autogenerated hook placeholders commented)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Timing instrumentation for devp_custom doc_events handlers and whitelisted methods.
+
+Every call of an @instrument-ed function records wall time, DB query count and DB time.
+Samples are kept per hook in a capped Redis list (rolling window), with an in-process
+fallback when Redis is unavailable. Calls slower than the configured threshold are logged.
+The "Hook Timings" page shows p50/p95/p99 per hook.
+"""
+from __future__ import annotations
+
+import functools
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from time import perf_counter
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+from devp_custom.devp_custom.doctype.devp_custom_settings.devp_custom_settings import get_setting
+
+SAMPLES_KEY = "devp_hook_stats:"
+NAMES_KEY = "devp_hook_stats_names"
+MAX_SAMPLES = 1000
+
+# used when Redis is not reachable (per worker process)
+_local_samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+
+
+class QueryCounter:
+    __slots__ = ("count", "time")
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+
+def get_query_counter():
+    """
+    Returns the QueryCounter attached to the current DB connection, installing a counting
+    wrapper around frappe.db.sql on first use. All frappe.db helpers and query-builder
+    runs go through frappe.db.sql, so they are counted as well.
+    """
+    db = frappe.db
+    counter = getattr(db, "_devp_query_counter", None)
+    if counter is not None:
+        return counter
+
+    counter = QueryCounter()
+    original_sql = db.sql
+
+    def counted_sql(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return original_sql(*args, **kwargs)
+        finally:
+            counter.count += 1
+            counter.time += perf_counter() - start
+
+    db.sql = counted_sql
+    db._devp_query_counter = counter
+    return counter
+
+
+@contextmanager
+def count_queries():
+    """
+    Count SQL statements (and DB time) issued inside the block:
+
+        with count_queries() as q:
+            apply_customer_item_names(doc)
+        assert q.count <= 3
+    """
+    counter = get_query_counter()
+    result = QueryCounter()
+    count_before, time_before = counter.count, counter.time
+    try:
+        yield result
+    finally:
+        result.count = counter.count - count_before
+        result.time = counter.time - time_before
+
+
+def _settings():
+    """(enabled, slow threshold ms), read once per request / job: the wrapper runs on every hook."""
+    settings = frappe.flags.devp_hook_instrumentation
+    if settings is None:
+        settings = frappe.flags.devp_hook_instrumentation = (
+            cint(get_setting("enable_hook_instrumentation", 0)) == 1,
+            cint(get_setting("slow_hook_threshold_ms", 500)),
+        )
+    return settings
+
+
+def _is_enabled():
+    return _settings()[0]
+
+
+def instrument(fn):
+    """Decorator: record timing samples for every call of fn (when enabled in settings)."""
+    hook_name = f"{fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _is_enabled():
+            return fn(*args, **kwargs)
+
+        counter = get_query_counter()
+        queries_before, db_time_before = counter.count, counter.time
+        start = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _record(
+                hook_name,
+                wall=perf_counter() - start,
+                queries=counter.count - queries_before,
+                db_time=counter.time - db_time_before,
+            )
+
+    wrapper._devp_instrumented = True
+    return wrapper
+
+
+def _record(hook_name, wall, queries, db_time):
+    wall_ms, db_ms = round(wall * 1000, 3), round(db_time * 1000, 3)
+    sample = f"{wall_ms},{queries},{db_ms}"
+    try:
+        cache = frappe.cache()
+        pipe = cache.pipeline()
+        key = cache.make_key(SAMPLES_KEY + hook_name)
+        pipe.lpush(key, sample)
+        pipe.ltrim(key, 0, MAX_SAMPLES - 1)
+        pipe.sadd(cache.make_key(NAMES_KEY), hook_name)
+        pipe.execute()
+    except Exception:
+        _local_samples[hook_name].appendleft(sample)
+
+    threshold = _settings()[1]
+    if threshold and wall_ms >= threshold:
+        frappe.logger("devp_custom.hooks").warning(
+            f"Slow hook {hook_name}: {wall_ms} ms, {queries} queries, {db_ms} ms in DB"
+        )
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    k = max(round(pct / 100.0 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(k, len(sorted_values) - 1)]
+
+
+def _load_samples():
+    samples = {name: list(values) for name, values in _local_samples.items()}
+    try:
+        cache = frappe.cache()
+        # RedisWrapper.smembers / lrange prefix the keys themselves
+        for raw in cache.smembers(NAMES_KEY) or []:
+            name = frappe.safe_decode(raw)
+            values = cache.lrange(SAMPLES_KEY + name, 0, MAX_SAMPLES - 1) or []
+            samples.setdefault(name, []).extend(frappe.safe_decode(v) for v in values)
+    except Exception:
+        pass
+    return samples
+
+
+def _uninstrumented_hooks():
+    """devp_custom doc_events handlers that are not wrapped with @instrument."""
+    missing = set()
+    for events in (frappe.get_hooks("doc_events", app_name="devp_custom") or {}).values():
+        for handlers in events.values():
+            for path in handlers if isinstance(handlers, list) else [handlers]:
+                try:
+                    fn = frappe.get_attr(path)
+                except Exception:
+                    continue
+                if not getattr(fn, "_devp_instrumented", False):
+                    missing.add(path)
+    return sorted(missing)
+
+
+@frappe.whitelist()
+def get_hook_stats():
+    """p50/p95/p99 wall time, query counts and DB time per hook (System Manager only)."""
+    frappe.only_for("System Manager")
+
+    rows = []
+    for name, values in _load_samples().items():
+        parsed = []
+        for v in values:
+            try:
+                wall, queries, db_ms = v.split(",")
+                parsed.append((float(wall), int(queries), float(db_ms)))
+            except ValueError:
+                continue
+        if not parsed:
+            continue
+        walls = sorted(p[0] for p in parsed)
+        queries = sorted(p[1] for p in parsed)
+        db_times = sorted(p[2] for p in parsed)
+        rows.append({
+            "hook": name,
+            "calls": len(parsed),
+            "p50_ms": _percentile(walls, 50),
+            "p95_ms": _percentile(walls, 95),
+            "p99_ms": _percentile(walls, 99),
+            "max_ms": walls[-1],
+            "p95_queries": _percentile(queries, 95),
+            "max_queries": queries[-1],
+            "p95_db_ms": _percentile(db_times, 95),
+        })
+
+    rows.sort(key=lambda r: r["p95_ms"], reverse=True)
+    return {
+        "enabled": _is_enabled(),
+        "threshold_ms": cint(get_setting("slow_hook_threshold_ms", 500)),
+        "rows": rows,
+        "uninstrumented": _uninstrumented_hooks(),
+    }
+
+
+@frappe.whitelist(methods=["POST"])
+def reset_hook_stats():
+    frappe.only_for("System Manager")
+    _local_samples.clear()
+    cache = frappe.cache()
+    keys = [SAMPLES_KEY + frappe.safe_decode(raw) for raw in cache.smembers(NAMES_KEY) or []]
+    cache.delete_value([*keys, NAMES_KEY])
+    frappe.msgprint(_("Hook timing samples cleared."), alert=True)
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Pre-allocated Sales Invoice number pools.
+
+With pools enabled (Devp Custom Settings), each user or POS profile draws invoice numbers
+from its own block reserved out of the naming series. Only the refill job touches the
+shared tabSeries row, in a short transaction of its own, so parallel counter desks no
+longer queue on the series lock while creating invoices.
+
+Numbers inside a block are handed out in order and inside the invoice's transaction, so a
+failed insert gives its number back. Numbers left in a pool that goes idle are either
+dropped (gap in the series) or handed to the next pool that runs dry.
+"""
+from __future__ import annotations
+
+import frappe
+from frappe.model.naming import parse_naming_series
+from frappe.utils import add_to_date, cint, now_datetime
+
+from devp_custom.devp_custom.doctype.devp_custom_settings.devp_custom_settings import get_setting
+
+POOL_DOCTYPE = "Invoice Number Pool"
+RECLAIMED_POOL_KEY = "__reclaimed__"
+GAP_REUSE = "Reuse Unused Numbers"
+
+
+def is_enabled():
+    return cint(get_setting("enable_invoice_number_pools", 0)) == 1
+
+
+def _pool_key(doc):
+    if get_setting("invoice_pool_scope", "User") == "POS Profile" and doc.get("is_pos") and doc.get("pos_profile"):
+        return f"POS:{doc.pos_profile}"
+    return f"User:{frappe.session.user}"
+
+
+def _series_parts(naming, doc):
+    """
+    Resolve the naming series the same way make_autoname does.
+    Returns (prefix, digits, render) where render(number) gives the final name.
+    """
+    series = naming if "#" in naming else naming + ".#####"
+    captured = {}
+
+    def capture(partial_series, digits):
+        captured["prefix"], captured["digits"] = partial_series, digits
+        return "\0"
+
+    template = parse_naming_series(series.split("."), doc=doc, number_generator=capture)
+    if "prefix" not in captured:
+        return None, None, None
+
+    def render(number):
+        return template.replace("\0", str(number).zfill(captured["digits"]))
+
+    return captured["prefix"], captured["digits"], render
+
+
+def _take_from_pool(pool_key, prefix):
+    """Lock the caller's open block and take its next number. Returns the number or None."""
+    row = frappe.db.sql(
+        f"""
+        SELECT name, next_number
+        FROM `tab{POOL_DOCTYPE}`
+        WHERE pool_key = %s AND series_prefix = %s AND next_number <= range_end
+        ORDER BY range_start
+        LIMIT 1
+        FOR UPDATE
+        """,
+        (pool_key, prefix),
+    )
+    if not row:
+        return None
+    name, number = row[0]
+    frappe.db.sql(
+        f"UPDATE `tab{POOL_DOCTYPE}` SET next_number = next_number + 1, modified = %s WHERE name = %s",
+        (now_datetime(), name),
+    )
+    return int(number)
+
+
+def _remaining(pool_key, prefix):
+    res = frappe.db.sql(
+        f"""
+        SELECT COALESCE(SUM(range_end - next_number + 1), 0)
+        FROM `tab{POOL_DOCTYPE}`
+        WHERE pool_key = %s AND series_prefix = %s AND next_number <= range_end
+        """,
+        (pool_key, prefix),
+    )
+    return int(res[0][0] or 0)
+
+
+def next_name(doc, naming):
+    """
+    Called from Sales Invoice autoname when pools are enabled.
+    Returns the next name from the caller's pool, or None to fall back to the series.
+    """
+    prefix, digits, render = _series_parts(naming, doc)
+    if not prefix:
+        return None
+
+    pool_key = _pool_key(doc)
+    number = _take_from_pool(pool_key, prefix)
+    if number is None and get_setting("invoice_pool_gap_handling", "Leave Gaps") == GAP_REUSE:
+        number = _take_from_pool(RECLAIMED_POOL_KEY, prefix)
+
+    if number is None or _remaining(pool_key, prefix) < cint(get_setting("invoice_pool_refill_at", 10)):
+        _enqueue_refill(pool_key, prefix, digits)
+
+    return render(number) if number is not None else None
+
+
+def _enqueue_refill(pool_key, prefix, digits):
+    frappe.enqueue(
+        "devp_custom.invoice_number_pool.refill_pool",
+        queue="short",
+        job_id=f"devp_invoice_pool::{pool_key}::{prefix}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        pool_key=pool_key,
+        prefix=prefix,
+        digits=digits,
+    )
+
+
+def refill_pool(pool_key, prefix, digits):
+    """
+    Background job: reserve the next block from tabSeries for one pool.
+    The series row is locked only for this short transaction.
+    """
+    block = max(cint(get_setting("invoice_pool_block_size", 50)), 1)
+    if _remaining(pool_key, prefix) >= cint(get_setting("invoice_pool_refill_at", 10)):
+        return
+
+    row = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE name=%s FOR UPDATE", (prefix,))
+    if row:
+        start = int(row[0][0] or 0) + 1
+        frappe.db.sql("UPDATE `tabSeries` SET `current`=%s WHERE name=%s", (start + block - 1, prefix))
+    else:
+        start = 1
+        frappe.db.sql("INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)", (prefix, block))
+
+    frappe.get_doc({
+        "doctype": POOL_DOCTYPE,
+        "pool_key": pool_key,
+        "series_prefix": prefix,
+        "digits": digits,
+        "range_start": start,
+        "range_end": start + block - 1,
+        "next_number": start,
+    }).db_insert()
+    frappe.db.commit()
+
+
+def release_idle_pools():
+    """
+    Scheduler (hourly): drop exhausted blocks and release blocks idle for longer than
+    the configured hours, either to the shared reclaimed pool or as a logged gap.
+    """
+    frappe.db.sql(f"DELETE FROM `tab{POOL_DOCTYPE}` WHERE next_number > range_end")
+
+    cutoff = add_to_date(now_datetime(), hours=-max(cint(get_setting("invoice_pool_idle_hours", 24)), 1))
+    idle = frappe.db.sql(
+        f"""
+        SELECT name, pool_key, series_prefix, next_number, range_end
+        FROM `tab{POOL_DOCTYPE}`
+        WHERE modified < %s AND pool_key != %s
+        """,
+        (cutoff, RECLAIMED_POOL_KEY),
+        as_dict=True,
+    )
+    if not idle:
+        return
+
+    names = [r.name for r in idle]
+    if get_setting("invoice_pool_gap_handling", "Leave Gaps") == GAP_REUSE:
+        frappe.db.set_value(POOL_DOCTYPE, {"name": ["in", names]}, "pool_key", RECLAIMED_POOL_KEY, update_modified=False)
+    else:
+        logger = frappe.logger("devp_custom.invoice_number_pool")
+        for r in idle:
+            logger.info(f"Releasing idle pool {r.pool_key}: {r.series_prefix}{r.next_number}..{r.range_end} left unused")
+        frappe.db.delete(POOL_DOCTYPE, {"name": ["in", names]})
+    frappe.db.commit()
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Transactional outbox for available_batch_qty changes.
+
+consume_available_qty / revert_available_qty write one Batch Availability Event per
+changed batch in the same transaction as the UPDATE of tabBatch, so an event exists if
+and only if the change was committed. Consumers no longer need to poll tabBatch.
+
+dispatch_batch_events (scheduler, every minute, one runner at a time):
+    1. numbers new events (sequence) in the order the dispatcher sees them committed.
+       Autoincrement ids are allocated at insert, not at commit, so a cursor on the id
+       could skip a slow transaction; a cursor on the sequence cannot. Unnumbered events
+       are picked with a plain (non-locking) read, which sees committed rows only and
+       takes no gap locks, so inserting transactions are never blocked; the UPDATE then
+       touches exactly those rows by name.
+    2. delivers events after the sink cursor to the configured sink (File, Redis Stream,
+       HTTP) and advances the cursor only after the sink accepted them -- at least once;
+       consumers skip event ids they have already seen.
+
+get_batch_availability_changes(after=<sequence>) lets consumers pull the deltas directly.
+"""
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from time import monotonic
+
+import frappe
+from frappe.utils import add_days, cint, now_datetime
+
+from devp_custom.devp_custom.doctype.devp_custom_settings.devp_custom_settings import get_setting
+
+EVENT_DOCTYPE = "Batch Availability Event"
+SINK_CURSOR_KEY = "devp_outbox_sink_cursor"
+LOCK_KEY = "devp_outbox_dispatch_lock"
+DISPATCH_SECONDS = 50
+MAX_PAGE = 5000
+
+
+# ---------------------------------------------------------------------
+# Writing events (same transaction as the batch update)
+# ---------------------------------------------------------------------
+def record_batch_events(doc, sign, qty_changes, new_values):
+    """One bulk insert: { batch: qty } changes with the resulting available_batch_qty."""
+    record_batch_events_for([(doc, sign, qty_changes, new_values)])
+
+
+def record_batch_events_for(changes):
+    """Events of many documents in one bulk insert: [(doc, sign, qty_changes, new_values)]."""
+    now, user = now_datetime(), frappe.session.user
+    rows = [
+        [bno, sign * qty, new_values.get(bno), "consume" if sign < 0 else "revert",
+         doc.get("doctype"), doc.get("name"), 0, now, now, user, user]
+        for doc, sign, qty_changes, new_values in changes
+        for bno, qty in qty_changes.items()
+    ]
+    if not rows:
+        return
+    frappe.db.bulk_insert(
+        EVENT_DOCTYPE,
+        ["batch", "qty_change", "available_batch_qty", "event", "voucher_type", "voucher_no",
+         "sequence", "creation", "modified", "owner", "modified_by"],
+        rows,
+    )
+
+
+def _as_event(row):
+    return {
+        "id": row.name,
+        "sequence": row.sequence,
+        "batch": row.batch,
+        "qty_change": row.qty_change,
+        "available_batch_qty": row.available_batch_qty,
+        "event": row.event,
+        "voucher_type": row.voucher_type,
+        "voucher_no": row.voucher_no,
+        "created": row.creation.isoformat() if row.creation else None,
+    }
+
+
+def _events_after(sequence, limit):
+    rows = frappe.db.sql(
+        f"""
+        SELECT name, sequence, batch, qty_change, available_batch_qty, event,
+               voucher_type, voucher_no, creation
+        FROM `tab{EVENT_DOCTYPE}`
+        WHERE sequence > %s
+        ORDER BY sequence
+        LIMIT %s
+        """,
+        (cint(sequence), cint(limit)),
+        as_dict=True,
+    )
+    return [_as_event(r) for r in rows]
+
+
+# ---------------------------------------------------------------------
+# Sinks
+# ---------------------------------------------------------------------
+def _deliver_file(events):
+    path = get_setting("outbox_file_path")
+    if not path:
+        frappe.throw("Outbox file path is not set")
+    if not os.path.isabs(path):
+        path = frappe.get_site_path(path)
+    with open(path, "a", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _deliver_redis_stream(events):
+    cache = frappe.cache()
+    stream = cache.make_key(get_setting("outbox_redis_stream", "batch_availability"))
+    pipe = cache.pipeline()
+    for event in events:
+        pipe.xadd(stream, {"event": json.dumps(event, default=str)})
+    pipe.execute()
+
+
+def _deliver_http(events):
+    import requests
+
+    url = get_setting("outbox_http_url")
+    if not url:
+        frappe.throw("Outbox HTTP endpoint is not set")
+    response = requests.post(url, data=json.dumps({"events": events}, default=str),
+                             headers={"Content-Type": "application/json"}, timeout=30)
+    response.raise_for_status()
+
+
+SINKS = {
+    "File": _deliver_file,
+    "Redis Stream": _deliver_redis_stream,
+    "HTTP": _deliver_http,
+}
+
+
+# ---------------------------------------------------------------------
+# Dispatcher
+# ---------------------------------------------------------------------
+def _assign_sequences(limit):
+    """Number committed, unnumbered events in id order; returns how many were numbered."""
+    names = frappe.db.sql_list(
+        f"SELECT name FROM `tab{EVENT_DOCTYPE}` WHERE sequence = 0 ORDER BY name LIMIT %s",
+        (cint(limit),),
+    )
+    if not names:
+        return 0
+    frappe.db.sql(f"SELECT @devp_seq := COALESCE(MAX(sequence), 0) FROM `tab{EVENT_DOCTYPE}`")
+    frappe.db.sql(
+        f"""
+        UPDATE `tab{EVENT_DOCTYPE}`
+        SET sequence = (@devp_seq := @devp_seq + 1)
+        WHERE name IN ({", ".join(["%s"] * len(names))})
+        ORDER BY name
+        """,
+        tuple(names),
+    )
+    frappe.db.commit()
+    return len(names)
+
+
+def _deliver(sink, limit):
+    """Deliver one page after the sink cursor; returns how many were delivered."""
+    cursor = cint(frappe.db.get_global(SINK_CURSOR_KEY))
+    events = _events_after(cursor, limit)
+    if not events:
+        return 0
+    SINKS[sink](events)
+    frappe.db.set_global(SINK_CURSOR_KEY, events[-1]["sequence"])
+    frappe.db.commit()
+    return len(events)
+
+
+def dispatch_batch_events():
+    """Scheduler entry point: number new events, then deliver them, for up to DISPATCH_SECONDS."""
+    cache, token = frappe.cache(), uuid.uuid4().hex
+    if not cache.set(cache.make_key(LOCK_KEY), token, nx=True, ex=DISPATCH_SECONDS + 30):
+        return  # another dispatcher is running
+
+    limit = cint(get_setting("outbox_batch_size", 500)) or 500
+    sink = get_setting("outbox_sink", "None")
+    deadline = monotonic() + DISPATCH_SECONDS
+    try:
+        while monotonic() < deadline and _assign_sequences(limit) == limit:
+            pass
+        if sink in SINKS:
+            while monotonic() < deadline and _deliver(sink, limit) == limit:
+                pass
+    except Exception:
+        frappe.db.rollback()
+        # the cursor did not move: the same events are delivered on the next run
+        frappe.log_error(title="Batch availability outbox delivery failed")
+    finally:
+        if frappe.safe_decode(cache.get(cache.make_key(LOCK_KEY)) or b"") == token:
+            cache.delete(cache.make_key(LOCK_KEY))
+
+
+def prune_batch_events():
+    """Daily: drop events that are delivered (or have no sink) and older than the retention."""
+    days = cint(get_setting("outbox_retention_days", 30)) or 30
+    delivered = cint(frappe.db.get_global(SINK_CURSOR_KEY)) if get_setting("outbox_sink", "None") in SINKS else None
+    conditions = {"sequence": [">", 0], "creation": ["<", add_days(now_datetime(), -days)]}
+    if delivered is not None:
+        conditions["sequence"] = ["between", [1, delivered]]
+    frappe.db.delete(EVENT_DOCTYPE, conditions)
+
+
+# ---------------------------------------------------------------------
+# Cursor API
+# ---------------------------------------------------------------------
+@frappe.whitelist()
+def get_batch_availability_changes(after=0, limit=500):
+    """
+    Events with sequence > `after`, oldest first. Pass the returned cursor as `after` on the
+    next call; an unchanged cursor means there is nothing new yet.
+    """
+    frappe.has_permission("Batch", "read", throw=True)
+    events = _events_after(after, min(cint(limit) or 500, MAX_PAGE))
+    return {
+        "events": events,
+        "cursor": events[-1]["sequence"] if events else cint(after),
+    }
@@ -1,15 +1,43 @@
-def calculate_amount(doc, method=None):
+from frappe.utils import flt
+
+from devp_custom.instrumentation import instrument
+
+# fields that decide a line's rate / amount
+LINE_INPUTS = ("qty", "rate", "manual_amount")
+
+
+def _changed_rows(doc):
+    """Rows that are new or whose qty / rate / manual_amount changed since the last save."""
+    before = doc.get_doc_before_save()
+    if not before:
+        return list(doc.items)
+
+    previous = {row.name: row for row in before.get("items") or []}
+    changed = []
+    for row in doc.items:
+        old = previous.get(row.name)
+        if not old or any(flt(row.get(f)) != flt(old.get(f)) for f in LINE_INPUTS):
+            changed.append(row)
+    return changed
+
+
+@instrument
+def calculate_line_amounts(doc, method=None):
     """
+    Sales Invoice before_validate (runs before ERPNext's taxes and totals).
     If Manual Amount is entered, derive Rate from it.
     Otherwise keep ERPNext's default qty * rate = amount.
+    Only touched lines are recomputed; values are rounded to the fields' currency precision.
     """
-    if not doc.qty:
-        return
-
-    if doc.manual_amount and float(doc.manual_amount) > 0:
-        # user entered manual amount
-        doc.rate = float(doc.manual_amount) / float(doc.qty)
-        doc.amount = float(doc.manual_amount)
-    else:
-        # default calculation
-        doc.amount = float(doc.qty) * float(doc.rate or 0)
+    for row in _changed_rows(doc):
+        if not row.qty:
+            continue
+
+        amount_precision = row.precision("amount")
+        if flt(row.manual_amount) > 0:
+            # user entered manual amount
+            row.rate = flt(flt(row.manual_amount) / flt(row.qty), row.precision("rate"))
+            row.amount = flt(row.manual_amount, amount_precision)
+        else:
+            # default calculation
+            row.amount = flt(flt(row.qty) * flt(row.rate), amount_precision)
@@ -1,6 +1,7 @@
 # devp_custom/patches/add_batch_size_to_batch.py
 import frappe
-from frappe.utils import flt
+
+from devp_custom.backfill import run_backfill
 
 def execute():
     # --- 1. Ensure Batch.batch_size exists ---
@@ -64,18 +65,19 @@ def execute():
     frappe.reload_doc("custom", "doctype", "custom_field")
 
     if frappe.db.has_column("Batch", "batch_size") and frappe.db.has_column("Batch", "available_batch_qty"):
-        batches = frappe.get_all("Batch", fields=["name", "batch_size", "available_batch_qty"])
-        updated = 0
-
-        for b in batches:
-            if not b.batch_size:
-                continue
-            if b.available_batch_qty in (None, "", 0):
-                frappe.db.set_value("Batch", b.name, "available_batch_qty", flt(b.batch_size), update_modified=False)
-                updated += 1
-
-        frappe.db.commit()
-        frappe.msgprint(f"Initialized available_batch_qty for {updated} Batch record(s).")
+        # chunked + resumable: one set-based UPDATE and commit per primary-key range
+        result = run_backfill(
+            "add_batch_size_to_batch.available_batch_qty",
+            "Batch",
+            """
+            UPDATE `tabBatch`
+            SET available_batch_qty = batch_size
+            WHERE {chunk}
+                AND IFNULL(batch_size, 0) != 0
+                AND IFNULL(available_batch_qty, 0) = 0
+            """,
+        )
+        frappe.msgprint(f"Initialized available_batch_qty for {result['rows']} Batch record(s).")
     else:
         frappe.msgprint("Batch table missing one of the required columns (batch_size / available_batch_qty).")
 
@@ -0,0 +1,21 @@
+from devp_custom.api.batch_alerts import ensure_indexes
+from devp_custom.backfill import run_backfill
+from devp_custom.fixture_sync import sync_custom_fields
+
+
+def execute():
+    """
+    Batch.availability_ratio for existing batches, plus the composite indexes behind the
+    Batch Alerts page. Custom fields are synced after migrate, so create the column first.
+    """
+    sync_custom_fields()
+    run_backfill(
+        "batch_availability_ratio",
+        "Batch",
+        """
+        UPDATE `tabBatch`
+        SET availability_ratio = available_batch_qty / NULLIF(batch_size, 0)
+        WHERE {chunk}
+        """,
+    )
+    ensure_indexes()
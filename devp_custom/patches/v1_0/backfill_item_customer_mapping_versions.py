@@ -0,0 +1,9 @@
+from devp_custom.api.mapping_history import backfill_versions
+
+
+def execute():
+    """
+    Give every existing Item Customer Mapping an open version, valid from its creation
+    (earlier in-place edits are not recoverable). Idempotent, resumable chunks.
+    """
+    backfill_versions()
@@ -0,0 +1,26 @@
+import frappe
+
+from devp_custom.backfill import run_backfill
+
+def execute():
+    """
+    Reserve the numbers of existing Sales Invoices created from custom_requested_name,
+    so the reservation table is authoritative for requested names from now on.
+    Idempotent: INSERT IGNORE skips names that are already reserved; runs in resumable
+    primary-key chunks.
+    """
+    if not frappe.db.has_column("Sales Invoice", "custom_requested_name"):
+        return
+
+    run_backfill(
+        "backfill_sales_invoice_name_reservations",
+        "Sales Invoice",
+        """
+        INSERT IGNORE INTO `tabSales Invoice Name Reservation`
+            (name, reserved_by, owner, modified_by, creation, modified, docstatus, idx)
+        SELECT name, owner, owner, owner, creation, creation, 0, 0
+        FROM `tabSales Invoice`
+        WHERE {chunk}
+            AND IFNULL(custom_requested_name, '') != ''
+        """,
+    )
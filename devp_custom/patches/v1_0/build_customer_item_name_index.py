@@ -0,0 +1,9 @@
+from devp_custom.api.item_lookup import rebuild_index
+
+
+def execute():
+    """
+    Build Customer Item Name Index from existing Item Customer Mapping and
+    Item Customer Info rows; doc_events keep it current afterwards.
+    """
+    rebuild_index()
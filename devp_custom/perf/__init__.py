@@ -0,0 +1,2 @@
+# Benchmarks, query budgets and load harnesses for devp_custom hot paths.
+# Everything here runs against a local test site (allow_tests = true), never production.
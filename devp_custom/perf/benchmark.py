@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Reproducible benchmarks for devp_custom hot paths.
+
+Runs against the BENCH- data set from devp_custom.perf.seed on a local test site and writes
+one JSON document per run, so results can be compared across releases:
+
+    bench --site test.local execute devp_custom.perf.seed.seed --kwargs "{'volume': 'medium'}"
+    bench --site test.local execute devp_custom.perf.benchmark.run --kwargs "{'output': 'bench.json'}"
+    bench --site test.local execute devp_custom.perf.benchmark.compare --args "['old.json', 'new.json']"
+
+Submit/cancel is measured through the devp_custom submit-path hooks (validate_available_qty,
+consume_available_qty, revert_available_qty) on in-memory Delivery Notes; the batch updates
+are rolled back afterwards.
+"""
+from __future__ import annotations
+
+import json
+import platform
+import random
+from time import perf_counter
+
+import frappe
+from frappe.utils import now_datetime
+
+from devp_custom.instrumentation import get_query_counter
+from devp_custom.perf.seed import PREFIX, ensure_test_site
+
+
+def _stats(samples_ms, queries):
+    ordered = sorted(samples_ms)
+
+    def pick(pct):
+        if not ordered:
+            return 0
+        return ordered[min(max(round(pct / 100.0 * len(ordered)) - 1, 0), len(ordered) - 1)]
+
+    return {
+        "runs": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 3) if ordered else 0,
+        "p50_ms": round(pick(50), 3),
+        "p95_ms": round(pick(95), 3),
+        "min_ms": round(ordered[0], 3) if ordered else 0,
+        "max_ms": round(ordered[-1], 3) if ordered else 0,
+        "queries_per_run": round(sum(queries) / len(queries), 2) if queries else 0,
+    }
+
+
+def measure(fn, args_iter, warmup=3):
+    """Call fn(*args) for every args tuple; the first `warmup` calls are not recorded."""
+    counter = get_query_counter()
+    samples, queries = [], []
+    for i, args in enumerate(args_iter):
+        q0 = counter.count
+        start = perf_counter()
+        fn(*args)
+        elapsed = (perf_counter() - start) * 1000
+        if i >= warmup:
+            samples.append(elapsed)
+            queries.append(counter.count - q0)
+    return _stats(samples, queries)
+
+
+def _sample(rng, doctype, count, filters=None):
+    names = frappe.get_all(doctype, filters=filters or {"name": ["like", PREFIX + "%"]}, pluck="name", limit=count * 10)
+    if not names:
+        frappe.throw(f"No seeded {doctype} records found; run devp_custom.perf.seed.seed first")
+    return [rng.choice(names) for _ in range(count)]
+
+
+def _large_document(doctype, customer, item_codes, batches=None):
+    rows = []
+    for i, code in enumerate(item_codes):
+        row = {"item_code": code, "qty": 1, "stock_qty": 1, "conversion_factor": 1, "rate": 100}
+        if batches:
+            row["batch_no"] = batches[i % len(batches)]
+        rows.append(row)
+    return frappe.get_doc({"doctype": doctype, "customer": customer, "items": rows})
+
+
+def run(output=None, runs=50, doc_lines=500, seed_value=7):
+    """Run every benchmark and return (and optionally write) the JSON result."""
+    ensure_test_site()
+    from devp_custom import api
+
+    rng = random.Random(seed_value)
+    runs, doc_lines = int(runs), int(doc_lines)
+    items = _sample(rng, "Item", runs + doc_lines)
+    customers = _sample(rng, "Customer", runs)
+    groups = frappe.get_all("Item Group", filters={"name": ["like", PREFIX + "%"], "is_group": 0}, pluck="name")
+    batches = frappe.get_all(
+        "Batch", filters={"name": ["like", PREFIX + "%"]}, pluck="name", limit=doc_lines
+    )
+
+    results = {}
+    results["get_last_item_prices.customer"] = measure(
+        api.get_last_item_prices, [(items[i], customers[i], 5, False) for i in range(runs)]
+    )
+    results["get_last_item_prices.all_customers"] = measure(
+        api.get_last_item_prices, [(items[i], customers[i], 50, True) for i in range(runs)]
+    )
+    results[f"get_item_names_for_customer_batch.{doc_lines}_items"] = measure(
+        api.get_item_names_for_customer_batch,
+        [(items[:doc_lines], customers[i]) for i in range(min(runs, 20))],
+    )
+    results[f"apply_customer_item_names.{doc_lines}_lines"] = measure(
+        api.apply_customer_item_names,
+        [(_large_document("Sales Order", customers[i], items[:doc_lines]),) for i in range(min(runs, 20))],
+    )
+
+    # reserve_item_code commits tabSeries; it is the real production path
+    results["reserve_item_code"] = measure(
+        api.reserve_item_code, [(rng.choice(groups),) for _ in range(runs)]
+    )
+
+    def submit_cancel(doc):
+        api.validate_available_qty(doc)
+        api.consume_available_qty(doc)
+        api.revert_available_qty(doc)
+
+    results[f"submit_cancel_availability.{doc_lines}_lines"] = measure(
+        submit_cancel,
+        [(_large_document("Delivery Note", customers[i], items[:doc_lines], batches),) for i in range(min(runs, 20))],
+    )
+    frappe.db.rollback()
+
+    report = {
+        "meta": {
+            "timestamp": str(now_datetime()),
+            "site": frappe.local.site,
+            "devp_custom": frappe.get_attr("devp_custom.__version__"),
+            "frappe": frappe.__version__,
+            "db": frappe.db.sql("SELECT VERSION()")[0][0],
+            "python": platform.python_version(),
+            "runs": runs,
+            "doc_lines": doc_lines,
+        },
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+    return report
+
+
+def compare(old_path, new_path, metric="p50_ms"):
+    """Print metric per benchmark for two result files with the relative change."""
+    with open(old_path) as f:
+        old = json.load(f)["results"]
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+
+    lines = []
+    for name in sorted(set(old) | set(new)):
+        a, b = old.get(name, {}).get(metric), new.get(name, {}).get(metric)
+        change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else "n/a"
+        lines.append(f"{name:<55} {a!s:>12} {b!s:>12} {change:>9}")
+    print("\n".join(lines))
+    return lines
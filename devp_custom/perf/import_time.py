@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Cold-start import cost of devp_custom per gunicorn / RQ worker.
+
+Every measurement runs in a fresh interpreter (a new worker), imports frappe first and
+then times only the devp_custom import on top of it, so the numbers are what our app adds
+to a worker's boot. "all_doc_events" resolves every doc_events handler in hooks.py the
+way frappe does on the first document event.
+
+    bench --site test.local execute devp_custom.perf.import_time.run --kwargs "{'runs': 10}"
+"""
+from __future__ import annotations
+
+import json
+import statistics
+import subprocess
+import sys
+
+import frappe
+
+TARGETS = (
+    "devp_custom.hooks",
+    "devp_custom.api",
+    "devp_custom.api.item_code",
+    "devp_custom.api.pricing",
+    "devp_custom.api.batch",
+    "devp_custom.api.batch_alerts",
+    "devp_custom.api.item_customer",
+    "devp_custom.api.item_lookup",
+    "devp_custom.api.mapping_history",
+    "devp_custom.sales_invoice",
+    "all_doc_events",
+)
+
+_PROBE = """
+import importlib, json, sys, time
+import frappe, frappe.model.document
+target = sys.argv[1]
+before = set(sys.modules)
+start = time.perf_counter()
+if target == "all_doc_events":
+    from devp_custom import hooks
+    for events in hooks.doc_events.values():
+        for handlers in events.values():
+            for path in handlers if isinstance(handlers, list) else [handlers]:
+                module, attr = path.rsplit(".", 1)
+                getattr(importlib.import_module(module), attr)
+else:
+    importlib.import_module(target)
+elapsed = time.perf_counter() - start
+loaded = sorted(m for m in set(sys.modules) - before if m.startswith("devp_custom"))
+print(json.dumps({"ms": elapsed * 1000, "modules": loaded}))
+"""
+
+
+def measure(target, runs=10):
+    samples, modules = [], []
+    for _ in range(int(runs)):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE, target],
+            capture_output=True, text=True, check=True, cwd=frappe.utils.get_bench_path(),
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(result["ms"])
+        modules = result["modules"]
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+        "modules": modules,
+    }
+
+
+def run(runs=10, output=None):
+    """Measure every target; returns (and optionally writes) the JSON report."""
+    report = {target: measure(target, runs) for target in TARGETS}
+    for target, r in report.items():
+        print(f"{target:<35} {r['median_ms']:>9.3f} ms  ({len(r['modules'])} devp_custom modules)")
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+    return report
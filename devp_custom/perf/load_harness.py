@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrency load harness for submit contention on tabBatch and tabSeries.
+
+Starts N worker processes, each with its own site connection, that hammer the two paths
+behind our lock-wait incidents:
+
+- submit_cancel: Delivery Notes over a small set of shared ("hot") BENCH- batches run
+  through validate_available_qty / consume_available_qty (commit) and
+  revert_available_qty (commit), i.e. _apply_available_qty under contention.
+- item_code: reserve_item_code on one shared item group, i.e. _reserve_series_number
+  on the same tabSeries row (what the Item before_insert hook does during imports).
+- bulk_submit / bulk_cancel: `bulk_workers` extra processes push chunks of `bulk_chunk`
+  Delivery Notes over the same hot batches through deferred_batch_updates (the
+  devp_custom.bulk_stock path: up-front batch locks, per-document savepoints, deadlock
+  retries), so projected chunk writes race interactive submits.
+
+The report has throughput, client-side latency, InnoDB row-lock wait time and deadlock
+deltas, per-kind error counts, and final-state checks: every hot batch's
+available_batch_qty must equal its start value plus the committed deltas (and so must
+its outbox events), and every reserved item code must be unique with tabSeries advanced
+by exactly that many.
+
+    bench --site test.local execute devp_custom.perf.load_harness.run \
+        --kwargs "{'workers': 8, 'iterations': 200, 'output': 'load.json'}"
+"""
+from __future__ import annotations
+
+import json
+import multiprocessing
+import random
+from collections import Counter, defaultdict
+from time import perf_counter
+
+import frappe
+from frappe.utils import flt, now_datetime
+
+from devp_custom.perf.seed import PREFIX, ensure_test_site
+
+LOCK_STATUS_VARS = ("Innodb_row_lock_time", "Innodb_row_lock_waits", "Innodb_row_lock_time_max", "Innodb_deadlocks")
+
+
+def _lock_status():
+    rows = frappe.db.sql(
+        "SHOW GLOBAL STATUS WHERE Variable_name IN ({})".format(", ".join(["%s"] * len(LOCK_STATUS_VARS))),
+        LOCK_STATUS_VARS,
+    )
+    return {name: flt(value) for name, value in rows}
+
+
+def _classify(exc):
+    """deadlock / lock_timeout / duplicate / other, looking through wrapped exceptions."""
+    seen = exc
+    while seen is not None:
+        if isinstance(seen, frappe.QueryDeadlockError) or frappe.db.is_deadlocked(seen):
+            return "deadlock"
+        if isinstance(seen, frappe.QueryTimeoutError) or frappe.db.is_timedout(seen):
+            return "lock_timeout"
+        if frappe.db.is_duplicate_entry(seen):
+            return "duplicate"
+        seen = seen.__cause__ or seen.__context__
+
+    # reserve_item_code re-raises as ValidationError with the original message
+    message = str(exc).lower()
+    if "deadlock" in message:
+        return "deadlock"
+    if "lock wait timeout" in message:
+        return "lock_timeout"
+    if "duplicate entry" in message:
+        return "duplicate"
+    return "other"
+
+
+def _delivery_note(rng, hot_batches, lines):
+    picked = rng.sample(hot_batches, min(lines, len(hot_batches)))
+    return frappe.get_doc({
+        "doctype": "Delivery Note",
+        "items": [
+            {"item_code": b.item, "batch_no": b.name, "qty": 1, "stock_qty": 1, "conversion_factor": 1}
+            for b in picked
+        ],
+    })
+
+
+def _worker(site, sites_path, worker_no, plan):
+    """Runs in a child process; returns counters, latencies and committed deltas."""
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    frappe.set_user("Administrator")
+    from devp_custom import api
+    from devp_custom.api.batch import deferred_batch_updates
+    from devp_custom.bulk_stock import DEADLOCK_RETRIES, SAVEPOINT, _is_deadlock
+
+    rng = random.Random(plan["seed_value"] + worker_no)
+    hot_batches = [frappe._dict(b) for b in plan["hot_batches"]]
+    result = {
+        "ops": Counter(), "errors": defaultdict(Counter), "latencies": defaultdict(list),
+        "batch_deltas": Counter(), "codes": [],
+    }
+
+    def timed(op, fn):
+        start = perf_counter()
+        try:
+            value = fn()
+        except Exception as e:
+            frappe.db.rollback()
+            result["errors"][op][_classify(e)] += 1
+            return False, None
+        result["latencies"][op].append((perf_counter() - start) * 1000)
+        result["ops"][op] += 1
+        return True, value
+
+    def stage_consume(doc):
+        api.validate_available_qty(doc)
+        api.consume_available_qty(doc)
+
+    def consume(doc):
+        stage_consume(doc)
+        frappe.db.commit()
+
+    def revert(doc):
+        api.revert_available_qty(doc)
+        frappe.db.commit()
+
+    def attempt_chunk(docs, fn, errors):
+        """bulk_stock._attempt_chunk without the documents: lock, stage, flush once, commit."""
+        done = []
+        with deferred_batch_updates() as pending:
+            pending.lock([row.batch_no for doc in docs for row in doc.items])
+            for doc in docs:
+                snapshot = pending.snapshot()
+                frappe.db.savepoint(SAVEPOINT)
+                try:
+                    fn(doc)
+                    done.append(doc)
+                except Exception as e:
+                    if _is_deadlock(e):
+                        raise
+                    frappe.db.rollback(save_point=SAVEPOINT)
+                    pending.restore(snapshot)
+                    errors[_classify(e)] += 1
+            pending.flush()
+            frappe.db.commit()
+        return done
+
+    def run_chunk(op, docs, fn):
+        """bulk_stock._run_chunk: a deadlock rolls the chunk back and retries it."""
+        for attempt in range(DEADLOCK_RETRIES + 1):
+            errors = Counter()
+            try:
+                done = attempt_chunk(docs, fn, errors)
+            except Exception as e:
+                if not _is_deadlock(e) or attempt == DEADLOCK_RETRIES:
+                    raise  # timed() rolls back and counts it
+                frappe.db.rollback()
+                result["errors"][op]["deadlock_retried"] += 1
+                continue
+            result["errors"][op].update(errors)
+            return done
+
+    def add_deltas(docs, sign):
+        for doc in docs:
+            for row in doc.items:
+                result["batch_deltas"][row.batch_no] += sign * row.qty
+
+    def run_bulk():
+        for _ in range(max(plan["iterations"] // plan["bulk_chunk"], 1)):
+            docs = [_delivery_note(rng, hot_batches, plan["lines"]) for _ in range(plan["bulk_chunk"])]
+            ok, done = timed("bulk_submit", lambda: run_chunk("bulk_submit", docs, stage_consume))
+            if not ok:
+                continue
+            add_deltas(done, -1)
+            ok, reverted = timed("bulk_cancel", lambda: run_chunk("bulk_cancel", done, api.revert_available_qty))
+            if ok:
+                add_deltas(reverted, +1)
+
+    def run_interactive():
+        for _ in range(plan["iterations"]):
+            if rng.random() < plan["item_code_ratio"]:
+                ok, code = timed("item_code", lambda: api.reserve_item_code(plan["item_group"]))
+                if ok:
+                    result["codes"].append(code)
+                continue
+
+            doc = _delivery_note(rng, hot_batches, plan["lines"])
+            ok, _value = timed("submit", lambda: consume(doc))
+            if not ok:
+                continue
+            add_deltas([doc], -1)
+            ok, _value = timed("cancel", lambda: revert(doc))
+            if ok:
+                add_deltas([doc], +1)
+
+    try:
+        # workers past plan["workers"] are the bulk ones
+        if worker_no >= plan["workers"]:
+            run_bulk()
+        else:
+            run_interactive()
+    finally:
+        frappe.destroy()
+
+    result["errors"] = {op: dict(c) for op, c in result["errors"].items()}
+    result["latencies"] = dict(result["latencies"])
+    return result
+
+
+def _pct(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    return round(ordered[min(max(round(pct / 100.0 * len(ordered)) - 1, 0), len(ordered) - 1)], 3)
+
+
+def run(workers=8, iterations=200, hot_batches=5, lines=3, item_code_ratio=0.3, item_group=None,
+        seed_value=11, bulk_workers=1, bulk_chunk=20, output=None):
+    """Run the harness and return (and optionally write) the JSON report."""
+    ensure_test_site()
+    from devp_custom.api.item_code import _compose_prefix_from_item_group
+
+    workers, iterations, hot_batches, lines = int(workers), int(iterations), int(hot_batches), int(lines)
+    bulk_workers, bulk_chunk = int(bulk_workers), max(int(bulk_chunk), 1)
+    batches = frappe.get_all(
+        "Batch",
+        filters={"name": ["like", PREFIX + "%"]},
+        fields=["name", "item", "available_batch_qty"],
+        order_by="name",
+        limit=hot_batches,
+    )
+    item_group = item_group or frappe.db.get_value(
+        "Item Group", {"name": ["like", PREFIX + "%"], "is_group": 0}, "name"
+    )
+    if not batches or not item_group:
+        frappe.throw("No BENCH- data found; run devp_custom.perf.seed.seed first")
+
+    prefix = _compose_prefix_from_item_group(item_group)
+    series_before = frappe.db.get_value("Series", prefix, "current") or 0
+    batch_before = {b.name: flt(b.available_batch_qty) for b in batches}
+    last_event = frappe.db.sql("SELECT COALESCE(MAX(name), 0) FROM `tabBatch Availability Event`")[0][0]
+    plan = {
+        "workers": workers, "iterations": iterations, "lines": lines, "item_code_ratio": flt(item_code_ratio),
+        "item_group": item_group, "seed_value": int(seed_value), "bulk_chunk": bulk_chunk,
+        "hot_batches": [{"name": b.name, "item": b.item} for b in batches],
+    }
+    # workers need their own connections: spawn, never fork an open DB socket
+    frappe.db.commit()
+    status_before = _lock_status()
+
+    start = perf_counter()
+    with multiprocessing.get_context("spawn").Pool(workers + bulk_workers) as pool:
+        results = pool.starmap(
+            _worker,
+            [(frappe.local.site, frappe.local.sites_path, n, plan) for n in range(workers + bulk_workers)],
+        )
+    elapsed = perf_counter() - start
+
+    status_after = _lock_status()
+    ops, errors, latencies, batch_deltas, codes = Counter(), defaultdict(Counter), defaultdict(list), Counter(), []
+    for r in results:
+        ops.update(r["ops"])
+        for op, counts in r["errors"].items():
+            errors[op].update(counts)
+        for op, values in r["latencies"].items():
+            latencies[op].extend(values)
+        batch_deltas.update(r["batch_deltas"])
+        codes.extend(r["codes"])
+
+    batch_after = dict(frappe.get_all(
+        "Batch", filters={"name": ["in", list(batch_before)]}, fields=["name", "available_batch_qty"], as_list=True
+    ))
+    batch_checks = []
+    for name, before in batch_before.items():
+        expected = before + batch_deltas.get(name, 0)
+        actual = flt(batch_after.get(name))
+        batch_checks.append({"batch": name, "before": before, "expected": expected, "actual": actual,
+                             "ok": abs(expected - actual) < 1e-6})
+    series_after = frappe.db.get_value("Series", prefix, "current") or 0
+    # outbox: committed events must add up to the same deltas
+    event_deltas = dict(frappe.db.sql(
+        """
+        SELECT batch, SUM(qty_change) FROM `tabBatch Availability Event`
+        WHERE name > %s AND batch IN %s GROUP BY batch
+        """,
+        (last_event, list(batch_before)),
+    ))
+    outbox_ok = all(abs(flt(event_deltas.get(n)) - batch_deltas.get(n, 0)) < 1e-6 for n in batch_before)
+
+    report = {
+        "meta": {
+            "timestamp": str(now_datetime()), "site": frappe.local.site,
+            "db": frappe.db.sql("SELECT VERSION()")[0][0], "workers": workers,
+            "iterations": iterations, "hot_batches": len(batches), "lines": lines,
+            "item_code_ratio": plan["item_code_ratio"], "item_group": item_group,
+            "bulk_workers": bulk_workers, "bulk_chunk": bulk_chunk,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "throughput_ops_s": round(sum(ops.values()) / elapsed, 2) if elapsed else 0,
+        "ops": {
+            op: {"ok": ops[op], "errors": dict(errors.get(op, {})),
+                 "p50_ms": _pct(latencies[op], 50), "p95_ms": _pct(latencies[op], 95), "max_ms": _pct(latencies[op], 100)}
+            for op in ("submit", "cancel", "item_code", "bulk_submit", "bulk_cancel")
+        },
+        "innodb": {name: status_after.get(name, 0) - status_before.get(name, 0) for name in LOCK_STATUS_VARS},
+        "checks": {
+            "batches": batch_checks,
+            "batches_ok": all(c["ok"] for c in batch_checks),
+            "outbox_ok": outbox_ok,
+            "item_codes": {
+                "reserved": len(codes), "unique": len(set(codes)), "series_prefix": prefix,
+                "series_advance": int(series_after) - int(series_before),
+                "ok": len(codes) == len(set(codes)) == int(series_after) - int(series_before),
+            },
+        },
+    }
+    # Innodb_row_lock_time_max is a high-water mark, not a counter
+    report["innodb"]["Innodb_row_lock_time_max"] = status_after.get("Innodb_row_lock_time_max", 0)
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+    return report
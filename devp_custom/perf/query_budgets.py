@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Query-count budgets for devp_custom hooks and whitelisted methods.
+
+Every doc_events handler and whitelisted method declares how many SQL statements one call
+may issue. Budgets do not depend on document size: check() runs each case on 10-line and
+500-line documents built from the BENCH- data set (devp_custom.perf.seed) and raises
+AssertionError when a call exceeds its budget or a hook has no budget at all.
+
+    bench --site test.local run-tests --app devp_custom --module devp_custom.tests.test_query_budgets
+    bench --site test.local execute devp_custom.perf.query_budgets.check
+
+Each case is called once to warm caches (settings, customer group) before it is counted,
+so budgets describe steady-state cost. All writes are rolled back at the end;
+reserve_item_code commits its own tabSeries row, as it does in production.
+"""
+from __future__ import annotations
+
+import frappe
+
+from devp_custom.instrumentation import count_queries
+from devp_custom.perf.seed import PREFIX, ensure_test_site
+
+SIZES = (10, 500)
+
+# dotted path -> max SQL statements per call, for any document size
+BUDGETS = {
+    # doc_events
+    "devp_custom.api.item_code.assign_item_code_before_insert": 4,
+    "devp_custom.api.item_code.auto_set_item_code_on_submit": 0,
+    "devp_custom.api.item_code.clear_item_group_prefixes": 0,
+    "devp_custom.overrides.sales_invoice_item.calculate_line_amounts": 0,
+    "devp_custom.api.batch.validate_work_order_batch_size": 1,
+    "devp_custom.sales_invoice.autoname": 3,
+    "devp_custom.api.batch.validate_sales_invoice_batch_size": 1,
+    "devp_custom.api.item_customer.apply_customer_item_names": 2,
+    "devp_custom.api.batch.validate_available_qty": 1,
+    "devp_custom.api.batch.consume_available_qty": 3,
+    "devp_custom.api.batch.revert_available_qty": 3,
+    "devp_custom.api.batch.clear_allow_override_after_submit": 1,
+    "devp_custom.api.batch_alerts.set_availability_ratio": 0,
+    "devp_custom.sales_invoice.release_requested_name": 1,
+    "devp_custom.api.item_lookup.update_item_info_index": 5,
+    "devp_custom.api.item_lookup.remove_item_info_index": 2,
+    "devp_custom.api.item_lookup.reindex_renamed_item": 11,
+    "devp_custom.api.item_lookup.update_mapping_index": 5,
+    "devp_custom.api.item_lookup.remove_mapping_index": 2,
+    "devp_custom.customer_catalog.invalidate_for_mapping": 0,
+    "devp_custom.customer_catalog.invalidate_all": 0,
+    "devp_custom.api.mapping_history.record_mapping_version": 2,
+    "devp_custom.api.mapping_history.close_mapping_version": 1,
+    # whitelisted
+    "devp_custom.api.item_code.reserve_item_code": 4,
+    "devp_custom.api.item_code.reserve_item_code_for_item": 4,
+    "devp_custom.api.item_code.get_next_item_code_preview": 2,
+    "devp_custom.api.pricing.get_last_item_prices": 5,
+    "devp_custom.api.batch.get_batch_size_violations": 1,
+    "devp_custom.api.item_customer.get_item_name_description_for_customer": 2,
+    "devp_custom.api.item_customer.get_item_names_for_customer_batch": 2,
+    "devp_custom.api.item_customer.get_all_mappings_for_item": 1,
+    "devp_custom.api.batch.allocate_batches_fefo": 2,
+    "devp_custom.api.batch_alerts.get_batch_alerts": 2,
+    "devp_custom.api.batch_alerts.get_batch_alert_summary": 2,
+    "devp_custom.sales_invoice.validate_requested_names": 1,
+    "devp_custom.api.item_lookup.lookup_item_codes": 2,
+    "devp_custom.api.mapping_history.get_customer_item_names_at": 2,
+    # background PO ingestion: line resolution, independent of PO size
+    "devp_custom.po_ingestion.resolve_lines": 4,
+    "devp_custom.outbox.get_batch_availability_changes": 2,
+}
+
+# whitelisted methods that are admin / background entry points, not hot paths
+EXEMPT = {
+    "devp_custom.api.item_code.reserve_and_set_item_code_for_item",
+    "devp_custom.instrumentation.get_hook_stats",
+    "devp_custom.instrumentation.reset_hook_stats",
+    "devp_custom.singleflight.get_singleflight_stats",
+    "devp_custom.singleflight.reset_singleflight_stats",
+    "devp_custom.devp_custom.report.item_selling_price_history.item_selling_price_history.export_price_history",
+    "devp_custom.devp_custom.doctype.customer_po_import.customer_po_import.start_import",
+    "devp_custom.bulk_stock.enqueue_bulk_action",
+    "devp_custom.bulk_stock.get_bulk_action_result",
+}
+
+
+def _data(max_lines):
+    def names(doctype, filters=None):
+        return frappe.get_all(
+            doctype, filters=filters or {"name": ["like", PREFIX + "%"]}, pluck="name", limit=max_lines
+        )
+
+    data = frappe._dict(
+        items=names("Item"),
+        mappings=names("Item Customer Mapping"),
+        customers=names("Customer"),
+        batches=names("Batch"),
+        groups=names("Item Group", {"name": ["like", PREFIX + "%"], "is_group": 0}),
+    )
+    if len(data.items) < max_lines or not data.customers or not data.batches or not data.groups:
+        frappe.throw("Not enough BENCH- data; run devp_custom.perf.seed.seed first")
+    return data
+
+
+def _lines(data, n, batches=False):
+    rows = []
+    for i in range(n):
+        row = {"item_code": data.items[i], "qty": 1, "stock_qty": 1, "conversion_factor": 1, "rate": 10}
+        if batches:
+            row["batch_no"] = data.batches[i % len(data.batches)]
+        rows.append(row)
+    return rows
+
+
+def _doc(doctype, data, n, **fields):
+    batches = doctype in ("Sales Invoice", "Delivery Note", "Work Order")
+    return frappe.get_doc(dict(
+        {"doctype": doctype, "customer": data.customers[0], "items": _lines(data, n, batches)}, **fields
+    ))
+
+
+def _cases(data, n):
+    """dotted path -> zero-argument callable exercising it with an n-line document."""
+    from devp_custom import customer_catalog, outbox, po_ingestion, sales_invoice
+    from devp_custom.api import (
+        batch,
+        batch_alerts,
+        item_code,
+        item_customer,
+        item_lookup,
+        mapping_history,
+        pricing,
+    )
+    from devp_custom.overrides import sales_invoice_item
+
+    item_codes = data.items[:n]
+    si = _doc("Sales Invoice", data, n, update_stock=1)
+    dn = _doc("Delivery Note", data, n)
+    so = _doc("Sales Order", data, n)
+    wo = frappe.get_doc({"doctype": "Work Order", "production_item": data.items[0], "qty": 5, "batch_no": data.batches[0]})
+    item = frappe.get_doc({"doctype": "Item", "item_code": "", "item_group": data.groups[0]})
+    mapping = frappe.get_doc("Item Customer Mapping", data.mappings[0])
+    seeded_item = frappe.get_doc("Item", data.items[0])
+    # seeded names with a typo, so scoring sees partial matches too
+    po_names = [f"Cust name {c} #0".replace("name", "nmae") for c in item_codes]
+    counter = iter(range(10**9))
+
+    def requested_si():
+        return frappe.get_doc({"doctype": "Sales Invoice", "custom_requested_name": f"{PREFIX}QB-{n}-{next(counter)}"})
+
+    def fresh_item():
+        item.item_code = ""
+        return item
+
+    return {
+        "devp_custom.api.item_code.assign_item_code_before_insert": lambda: item_code.assign_item_code_before_insert(fresh_item()),
+        "devp_custom.api.item_code.auto_set_item_code_on_submit": lambda: item_code.auto_set_item_code_on_submit(
+            frappe.get_doc({"doctype": "Item", "item_code": data.items[0], "item_group": data.groups[0]})
+        ),
+        "devp_custom.api.item_code.clear_item_group_prefixes": lambda: item_code.clear_item_group_prefixes(
+            frappe._dict(name=data.groups[0])
+        ),
+        "devp_custom.overrides.sales_invoice_item.calculate_line_amounts": lambda: sales_invoice_item.calculate_line_amounts(si),
+        "devp_custom.api.batch.validate_work_order_batch_size": lambda: batch.validate_work_order_batch_size(wo),
+        "devp_custom.sales_invoice.autoname": lambda: sales_invoice.autoname(requested_si()),
+        "devp_custom.api.batch.validate_sales_invoice_batch_size": lambda: batch.validate_sales_invoice_batch_size(
+            si.update({"__batch_size_override": 1})
+        ),
+        "devp_custom.api.item_customer.apply_customer_item_names": lambda: item_customer.apply_customer_item_names(so),
+        "devp_custom.api.batch.validate_available_qty": lambda: batch.validate_available_qty(dn),
+        "devp_custom.api.batch.consume_available_qty": lambda: batch.consume_available_qty(dn.update({"allow_batch_exceed": 1})),
+        "devp_custom.api.batch.revert_available_qty": lambda: batch.revert_available_qty(dn),
+        "devp_custom.api.batch.clear_allow_override_after_submit": lambda: batch.clear_allow_override_after_submit(
+            frappe._dict(name=f"{PREFIX}QB-NONE", allow_batch_exceed=1)
+        ),
+        "devp_custom.sales_invoice.release_requested_name": lambda: sales_invoice.release_requested_name(
+            frappe._dict(name=f"{PREFIX}QB-NONE")
+        ),
+        "devp_custom.api.item_code.reserve_item_code": lambda: item_code.reserve_item_code(data.groups[0]),
+        "devp_custom.api.item_code.reserve_item_code_for_item": lambda: item_code.reserve_item_code_for_item(data.groups[0]),
+        "devp_custom.api.item_code.get_next_item_code_preview": lambda: item_code.get_next_item_code_preview(data.groups[0]),
+        "devp_custom.api.pricing.get_last_item_prices": lambda: pricing.get_last_item_prices(item_codes[0], data.customers[0]),
+        "devp_custom.api.batch.get_batch_size_violations": lambda: batch.get_batch_size_violations(
+            [dict(r, idx=i) for i, r in enumerate(_lines(data, n, batches=True), 1)]
+        ),
+        "devp_custom.api.item_customer.get_item_name_description_for_customer": lambda: item_customer.get_item_name_description_for_customer(
+            item_codes[0], data.customers[0]
+        ),
+        "devp_custom.api.item_customer.get_item_names_for_customer_batch": lambda: item_customer.get_item_names_for_customer_batch(
+            item_codes, data.customers[0]
+        ),
+        "devp_custom.api.batch.allocate_batches_fefo": lambda: batch.allocate_batches_fefo(
+            [{"idx": i, "item_code": c, "qty": 1} for i, c in enumerate(item_codes, 1)]
+        ),
+        "devp_custom.api.batch_alerts.set_availability_ratio": lambda: batch_alerts.set_availability_ratio(
+            frappe._dict(batch_size=100, available_batch_qty=15)
+        ),
+        "devp_custom.api.batch_alerts.get_batch_alerts": lambda: batch_alerts.get_batch_alerts("low", 1.01, limit=n),
+        "devp_custom.api.batch_alerts.get_batch_alert_summary": lambda: batch_alerts.get_batch_alert_summary(1.01),
+        "devp_custom.sales_invoice.validate_requested_names": lambda: sales_invoice.validate_requested_names(
+            [f"{PREFIX}QB-{i}" for i in range(n)]
+        ),
+        "devp_custom.api.item_lookup.update_item_info_index": lambda: item_lookup.update_item_info_index(seeded_item),
+        "devp_custom.api.item_lookup.remove_item_info_index": lambda: item_lookup.remove_item_info_index(seeded_item),
+        "devp_custom.api.item_lookup.reindex_renamed_item": lambda: item_lookup.reindex_renamed_item(
+            seeded_item, "after_rename", data.items[0], data.items[0]
+        ),
+        "devp_custom.api.item_lookup.update_mapping_index": lambda: item_lookup.update_mapping_index(mapping),
+        "devp_custom.api.item_lookup.remove_mapping_index": lambda: item_lookup.remove_mapping_index(mapping),
+        "devp_custom.customer_catalog.invalidate_for_mapping": lambda: customer_catalog.invalidate_for_mapping(mapping),
+        "devp_custom.customer_catalog.invalidate_all": lambda: customer_catalog.invalidate_all(seeded_item, "on_update"),
+        "devp_custom.api.mapping_history.record_mapping_version": lambda: mapping_history.record_mapping_version(mapping),
+        "devp_custom.api.mapping_history.close_mapping_version": lambda: mapping_history.close_mapping_version(mapping),
+        "devp_custom.api.mapping_history.get_customer_item_names_at": lambda: mapping_history.get_customer_item_names_at(
+            [{"item_code": c, "customer": data.customers[0], "date": "2025-01-31"} for c in item_codes]
+        ),
+        "devp_custom.api.item_lookup.lookup_item_codes": lambda: item_lookup.lookup_item_codes(po_names, data.customers[0]),
+        "devp_custom.outbox.get_batch_availability_changes": lambda: outbox.get_batch_availability_changes(0, n),
+        "devp_custom.po_ingestion.resolve_lines": lambda: po_ingestion.resolve_lines(
+            [frappe._dict(row_no=i, customer_item_name=name, po_item_code="", qty=1, rate=0, uom="")
+             for i, name in enumerate(po_names, 2)],
+            data.customers[0],
+        ),
+    }
+
+
+def _hook_paths():
+    """Every devp_custom doc_events handler and whitelisted method (imported modules)."""
+    paths = set()
+    for events in (frappe.get_hooks("doc_events", app_name="devp_custom") or {}).values():
+        for handlers in events.values():
+            paths.update(handlers if isinstance(handlers, list) else [handlers])
+
+    for module in (
+        "devp_custom.api.item_code", "devp_custom.api.pricing", "devp_custom.api.batch", "devp_custom.api.batch_alerts",
+        "devp_custom.api.item_customer", "devp_custom.api.item_lookup", "devp_custom.api.mapping_history",
+        "devp_custom.outbox", "devp_custom.sales_invoice", "devp_custom.bulk_stock",
+    ):
+        frappe.get_module(module)
+    for fn in frappe.whitelisted:
+        if fn.__module__.startswith("devp_custom."):
+            paths.add(f"{fn.__module__}.{fn.__name__}")
+    return paths
+
+
+def missing_budgets():
+    """Hooks and whitelisted methods with neither a budget nor an exemption."""
+    return sorted(_hook_paths() - set(BUDGETS) - EXEMPT)
+
+
+def measure(data, n):
+    """{path: SQL statements} of one warm call per case with n-line documents (not rolled back)."""
+    counts = {}
+    for path, call in _cases(data, n).items():
+        call()  # warm caches
+        with count_queries() as q:
+            call()
+        counts[path] = q.count
+    return counts
+
+
+def check(sizes=SIZES):
+    """Run every budget for every size; raise AssertionError listing all violations."""
+    ensure_test_site()
+    sizes = [int(s) for s in sizes]
+    data = _data(max(sizes))
+
+    failures, report = [], {}
+    failures.extend(f"{path}: no query budget declared" for path in missing_budgets())
+
+    try:
+        for n in sizes:
+            for path, count in measure(data, n).items():
+                report.setdefault(path, {})[n] = count
+                if count > BUDGETS[path]:
+                    failures.append(f"{path} ({n} lines): {count} queries, budget {BUDGETS[path]}")
+    finally:
+        frappe.db.rollback()
+
+    if failures:
+        raise AssertionError("Query budget exceeded:\n" + "\n".join(failures))
+    return report
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic data generator for devp_custom benchmarks.
+
+Seeds a local test site with item-group trees, items, customer groups, customers,
+Item Customer Mapping rows, batches and submitted SI/DN/SO history. Bulk rows are written
+with frappe.db.bulk_insert; tree doctypes go through the ORM so lft/rgt stay valid.
+Every seeded record is prefixed with BENCH- so teardown() can remove it again.
+
+    bench --site test.local execute devp_custom.perf.seed.seed --kwargs "{'volume': 'small'}"
+"""
+from __future__ import annotations
+
+import random
+
+import frappe
+from frappe.utils import add_days, now_datetime, nowdate
+
+PREFIX = "BENCH-"
+
+VOLUMES = {
+    "small": {
+        "item_group_fanout": 3, "item_group_depth": 3, "items": 500,
+        "customer_groups": 5, "customers": 200, "mappings_per_item": 3,
+        "batches_per_item": 3, "history_docs": 500, "lines_per_doc": 10,
+    },
+    "medium": {
+        "item_group_fanout": 4, "item_group_depth": 3, "items": 5000,
+        "customer_groups": 10, "customers": 2000, "mappings_per_item": 4,
+        "batches_per_item": 5, "history_docs": 5000, "lines_per_doc": 20,
+    },
+    "large": {
+        "item_group_fanout": 5, "item_group_depth": 4, "items": 50000,
+        "customer_groups": 20, "customers": 20000, "mappings_per_item": 5,
+        "batches_per_item": 5, "history_docs": 50000, "lines_per_doc": 25,
+    },
+}
+
+HISTORY_DOCTYPES = (
+    # parent doctype, child doctype, date field, name code
+    ("Sales Invoice", "Sales Invoice Item", "posting_date", "SI"),
+    ("Delivery Note", "Delivery Note Item", "posting_date", "DN"),
+    ("Sales Order", "Sales Order Item", "transaction_date", "SO"),
+)
+
+
+def ensure_test_site():
+    if not frappe.conf.get("allow_tests"):
+        frappe.throw("devp_custom.perf only runs on sites with allow_tests = true in site_config.json")
+
+
+def get_volumes(volume="small", **overrides):
+    volumes = dict(VOLUMES[volume] if isinstance(volume, str) else volume)
+    volumes.update({k: int(v) for k, v in overrides.items() if k in volumes})
+    return volumes
+
+
+def _bulk(doctype, rows, chunk_size=5000):
+    """bulk_insert rows (dicts with the same keys) adding the standard columns."""
+    if not rows:
+        return
+    now, user = now_datetime(), frappe.session.user
+    std = {"creation": now, "modified": now, "owner": user, "modified_by": user}
+    fields = list(rows[0].keys()) + [k for k in std if k not in rows[0]]
+    values = [[r.get(f, std.get(f)) for f in fields] for r in rows]
+    frappe.db.bulk_insert(doctype, fields, values, ignore_duplicates=True, chunk_size=chunk_size)
+
+
+def _seed_item_groups(fanout, depth):
+    level = [("All Item Groups", "")]
+    for d in range(depth):
+        next_level = []
+        for parent, path in level:
+            for i in range(fanout):
+                name = f"{PREFIX}IG{path}{d}{i}"
+                if not frappe.db.exists("Item Group", name):
+                    frappe.get_doc({
+                        "doctype": "Item Group",
+                        "item_group_name": name,
+                        "parent_item_group": parent,
+                        "is_group": 1 if d < depth - 1 else 0,
+                        # every other level uses an explicit prefix, the rest the abbreviation
+                        "item_code_prefix": f"BX{d}{i}" if d % 2 == 0 else "",
+                    }).insert(ignore_permissions=True)
+                next_level.append((name, f"{path}{d}{i}"))
+        level = next_level
+    return [name for name, _path in level]
+
+
+def _seed_customer_groups(count):
+    names = []
+    for i in range(count):
+        name = f"{PREFIX}CG{i:03d}"
+        if not frappe.db.exists("Customer Group", name):
+            frappe.get_doc({
+                "doctype": "Customer Group",
+                "customer_group_name": name,
+                "parent_customer_group": "All Customer Groups",
+                "is_group": 0,
+            }).insert(ignore_permissions=True)
+        names.append(name)
+    return names
+
+
+def seed(volume="small", seed_value=42, **overrides):
+    """Create the benchmark data set. Returns a summary of what was seeded."""
+    ensure_test_site()
+    v = get_volumes(volume, **overrides)
+    rng = random.Random(seed_value)
+
+    company = frappe.db.get_single_value("Global Defaults", "default_company") or frappe.db.get_value("Company", {}, "name")
+    currency = frappe.get_cached_value("Company", company, "default_currency") if company else "INR"
+    territory = frappe.db.get_value("Territory", {"is_group": 0}, "name") or "All Territories"
+
+    leaf_groups = _seed_item_groups(v["item_group_fanout"], v["item_group_depth"])
+    customer_groups = _seed_customer_groups(v["customer_groups"])
+
+    items = [f"{PREFIX}ITEM-{i:06d}" for i in range(v["items"])]
+    _bulk("Item", [{
+        "name": code, "item_code": code, "item_name": f"Bench item {code}",
+        "item_group": rng.choice(leaf_groups), "stock_uom": "Nos",
+        "is_stock_item": 1, "has_batch_no": 1, "is_sales_item": 1,
+    } for code in items])
+
+    customers = [f"{PREFIX}CUST-{i:05d}" for i in range(v["customers"])]
+    cust_group = {c: rng.choice(customer_groups) for c in customers}
+    _bulk("Customer", [{
+        "name": c, "customer_name": c, "customer_type": "Company",
+        "customer_group": cust_group[c], "territory": territory,
+    } for c in customers])
+
+    mappings = []
+    for item in items:
+        for m in range(v["mappings_per_item"]):
+            scope = m % 3
+            mappings.append({
+                "name": f"{PREFIX}MAP-{item}-{m}", "item": item, "is_active": 1,
+                "customer": rng.choice(customers) if scope == 0 else None,
+                "customer_group": rng.choice(customer_groups) if scope == 1 else None,
+                "customer_item_name": f"Cust name {item} #{m}",
+                "customer_description": f"Customer description for {item} #{m}",
+                "priority": rng.randint(1, 10),
+            })
+    _bulk("Item Customer Mapping", mappings)
+    # bulk rows skip doc_events, so index the customer item names explicitly
+    from devp_custom.api.item_lookup import rebuild_index
+    from devp_custom.api.mapping_history import backfill_versions
+
+    rebuild_index()
+    backfill_versions()
+
+    batches = []
+    for item in items:
+        for b in range(v["batches_per_item"]):
+            size = rng.choice([100, 250, 500, 1000])
+            mfg = add_days(nowdate(), -rng.randint(30, 400))
+            batches.append({
+                "name": f"{PREFIX}BATCH-{item}-{b}", "batch_id": f"{PREFIX}BATCH-{item}-{b}",
+                "item": item, "manufacturing_date": mfg, "expiry_date": add_days(mfg, rng.randint(200, 900)),
+                "batch_size": size, "available_batch_qty": size, "availability_ratio": 1,
+            })
+    _bulk("Batch", batches)
+
+    for parent_dt, child_dt, date_field, code in HISTORY_DOCTYPES:
+        parents, children = [], []
+        for d in range(v["history_docs"]):
+            name = f"{PREFIX}{code}-{d:07d}"
+            parents.append({
+                "name": name, "customer": rng.choice(customers), "company": company,
+                "currency": currency, date_field: add_days(nowdate(), -rng.randint(0, 720)),
+                "docstatus": 1,
+            })
+            for line in range(v["lines_per_doc"]):
+                qty, rate = rng.randint(1, 50), round(rng.uniform(10, 5000), 2)
+                children.append({
+                    "name": f"{name}-{line}", "parent": name, "parenttype": parent_dt,
+                    "parentfield": "items", "idx": line + 1, "item_code": rng.choice(items),
+                    "qty": qty, "rate": rate, "amount": qty * rate, "docstatus": 1,
+                })
+        _bulk(parent_dt, parents)
+        _bulk(child_dt, children)
+
+    frappe.db.commit()
+    return {
+        "volumes": v, "company": company, "item_groups": len(leaf_groups), "items": len(items),
+        "customers": len(customers), "mappings": len(mappings), "batches": len(batches),
+    }
+
+
+def teardown():
+    """Delete everything seed() created (BENCH- prefix)."""
+    ensure_test_site()
+    like = PREFIX + "%"
+    for parent_dt, child_dt, _date_field, _code in HISTORY_DOCTYPES:
+        frappe.db.sql(f"DELETE FROM `tab{child_dt}` WHERE parent LIKE %s", like)
+        frappe.db.sql(f"DELETE FROM `tab{parent_dt}` WHERE name LIKE %s", like)
+    frappe.db.sql("DELETE FROM `tabCustomer Item Name Gram` WHERE parent LIKE %s", "ICM-" + like)
+    frappe.db.sql("DELETE FROM `tabCustomer Item Name Index` WHERE name LIKE %s", "ICM-" + like)
+    frappe.db.sql("DELETE FROM `tabItem Customer Mapping Version` WHERE mapping LIKE %s", like)
+    for dt in ("Batch", "Item Customer Mapping", "Item", "Customer"):
+        frappe.db.sql(f"DELETE FROM `tab{dt}` WHERE name LIKE %s", like)
+    # item-code series created by reserve_item_code for the benchmark groups
+    from devp_custom.api.item_code import _compose_prefix_from_item_group
+
+    leaf_groups = frappe.get_all("Item Group", filters={"name": ["like", like], "is_group": 0}, pluck="name")
+    prefixes = {_compose_prefix_from_item_group(g) for g in leaf_groups}
+    if prefixes:
+        frappe.db.delete("Series", {"name": ["in", list(prefixes)]})
+
+    for dt in ("Item Group", "Customer Group"):
+        # deepest first so nested-set parents are removed last
+        for name in frappe.get_all(dt, filters={"name": ["like", like]}, order_by="lft desc", pluck="name"):
+            frappe.delete_doc(dt, name, force=True, ignore_permissions=True)
+    frappe.db.commit()
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Customer PO ingestion: a CSV / XLSX purchase order written in the customer's own item
+names becomes a draft Sales Order.
+
+    Customer PO Import (file + customer) -> Start Import -> run_import() on the long queue
+
+Lines are resolved in bulk, so the number of queries does not grow with the PO:
+    1. item codes written on the PO (or names that are our item codes): one query
+    2. customer item names -> item codes via the trigram index
+       (devp_custom.api.item_lookup.lookup_item_codes): two queries
+    3. last selling rate per resolved item (devp_custom.api.pricing.get_last_rates_for_items):
+       one query
+Resolved lines go to a draft Sales Order; its before_save hook (apply_customer_item_names)
+applies the customer item names and descriptions. Lines below the match threshold or
+without a match are kept on the import for review and left out of the order.
+"""
+from __future__ import annotations
+
+import frappe
+from frappe import _
+from frappe.utils import cstr, flt, now_datetime, nowdate
+
+from devp_custom.api.item_lookup import lookup_item_codes
+from devp_custom.api.pricing import get_last_rates_for_items
+
+IMPORT_DOCTYPE = "Customer PO Import"
+LINE_DOCTYPE = "Customer PO Import Line"
+
+# normalized header -> line field
+HEADER_ALIASES = {
+    "customer_item_name": ("customer item name", "item name", "item", "product", "description", "particulars"),
+    "item_code": ("item code", "our item code", "code", "sku"),
+    "qty": ("qty", "quantity", "order qty", "ordered qty"),
+    "rate": ("rate", "price", "unit price"),
+    "uom": ("uom", "unit"),
+}
+
+# lookup floor: weaker candidates are not worth showing for review
+MIN_CANDIDATE_SCORE = 0.3
+
+
+# ---------------------------------------------------------------------
+# File parsing
+# ---------------------------------------------------------------------
+def read_po_file(file_url):
+    """Rows (lists of cells) of an attached .csv / .xlsx file."""
+    from frappe.utils.csvutils import read_csv_content
+    from frappe.utils.xlsxutils import read_xlsx_file_from_attached_file
+
+    file_doc = frappe.get_doc("File", {"file_url": file_url})
+    extension = cstr(file_doc.file_name).rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        return read_csv_content(file_doc.get_content())
+    if extension == "xlsx":
+        return read_xlsx_file_from_attached_file(fcontent=file_doc.get_content())
+    frappe.throw(_("Customer PO must be a .csv or .xlsx file, got {0}").format(file_doc.file_name))
+
+
+def _header_map(header):
+    normalized = [" ".join(cstr(h).replace("_", " ").lower().split()) for h in header]
+    columns = {}
+    for field, aliases in HEADER_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized and normalized.index(alias) not in columns.values():
+                columns[field] = normalized.index(alias)
+                break
+    if "qty" not in columns or not ({"customer_item_name", "item_code"} & set(columns)):
+        frappe.throw(_("The PO file needs a quantity column and an item name or item code column"))
+    return columns
+
+
+def parse_po_rows(rows):
+    """Header row + data rows -> line dicts (row_no is the spreadsheet row)."""
+    rows = [r for r in rows or [] if any(cstr(c).strip() for c in r)]
+    if not rows:
+        frappe.throw(_("The PO file is empty"))
+
+    columns = _header_map(rows[0])
+    lines = []
+    for row_no, row in enumerate(rows[1:], 2):
+        def cell(field):
+            i = columns.get(field)
+            return cstr(row[i]).strip() if i is not None and i < len(row) else ""
+
+        lines.append(frappe._dict(
+            row_no=row_no,
+            customer_item_name=cell("customer_item_name"),
+            po_item_code=cell("item_code"),
+            qty=flt(cell("qty")),
+            rate=flt(cell("rate")),
+            uom=cell("uom"),
+        ))
+    return lines
+
+
+# ---------------------------------------------------------------------
+# Resolution
+# ---------------------------------------------------------------------
+def resolve_lines(lines, customer=None, threshold=0.6):
+    """
+    Set item_code, match_score, match_scope, status and the last-rate suggestion on every
+    line, with a fixed number of queries however many lines there are.
+    """
+    threshold = flt(threshold) or 0.6
+
+    # 1. explicit item codes, or names that already are item codes
+    keys = {l.po_item_code for l in lines if l.po_item_code} | {l.customer_item_name for l in lines if l.customer_item_name}
+    known = set(frappe.get_all("Item", filters={"name": ["in", list(keys)], "disabled": 0}, pluck="name")) if keys else set()
+
+    pending = []
+    for l in lines:
+        l.update(item_code=None, match_score=0, match_scope="", suggested_rate=0, price_source="")
+        if l.qty <= 0:
+            l.status = "Invalid Qty"
+        elif l.po_item_code in known or l.customer_item_name in known:
+            l.update(item_code=l.po_item_code if l.po_item_code in known else l.customer_item_name,
+                     match_score=1, match_scope="item code", status="Resolved")
+        elif l.customer_item_name:
+            pending.append(l)
+        else:
+            l.status = "Unresolved"
+
+    # 2. customer item names through the index, one call for the whole PO
+    if pending:
+        candidates = lookup_item_codes(
+            list(dict.fromkeys(l.customer_item_name for l in pending)), customer,
+            limit=1, min_score=MIN_CANDIDATE_SCORE,
+        )
+        for l in pending:
+            best = (candidates.get(l.customer_item_name) or [None])[0]
+            if not best:
+                l.status = "Unresolved"
+                continue
+            l.update(item_code=best["item_code"], match_score=best["score"], match_scope=best["scope"])
+            l.status = "Resolved" if best["score"] >= threshold else "Needs Review"
+
+    # 3. last selling rate suggestions for everything resolved
+    resolved = {l.item_code for l in lines if l.status == "Resolved"}
+    prices = get_last_rates_for_items(resolved, customer)
+    for l in lines:
+        price = prices.get(l.item_code) if l.status == "Resolved" else None
+        if price:
+            l.update(suggested_rate=price["rate"], price_source=price["document"])
+    return lines
+
+
+# ---------------------------------------------------------------------
+# Background job
+# ---------------------------------------------------------------------
+def _make_sales_order(po_import, lines):
+    so = frappe.new_doc("Sales Order")
+    so.update({
+        "customer": po_import.customer,
+        "company": po_import.company,
+        "transaction_date": nowdate(),
+        "delivery_date": po_import.delivery_date,
+        "po_no": po_import.po_no,
+        "po_date": po_import.po_date,
+    })
+    for l in lines:
+        if l.status != "Resolved":
+            continue
+        row = {"item_code": l.item_code, "qty": l.qty, "delivery_date": po_import.delivery_date}
+        if l.rate or l.suggested_rate:
+            row["rate"] = l.rate or l.suggested_rate
+        if l.uom:
+            row["uom"] = l.uom
+        so.append("items", row)
+
+    if not so.items:
+        return None
+    # before_save: apply_customer_item_names sets the customer's item names / descriptions
+    so.insert()
+    return so
+
+
+def _write_lines(po_import, lines):
+    """Replace the import's line table in one bulk insert."""
+    frappe.db.delete(LINE_DOCTYPE, {"parent": po_import.name, "parenttype": IMPORT_DOCTYPE})
+    now, user = now_datetime(), frappe.session.user
+    fields = [
+        "row_no", "customer_item_name", "po_item_code", "qty", "rate", "uom", "item_code",
+        "match_score", "match_scope", "status", "suggested_rate", "price_source",
+    ]
+    frappe.db.bulk_insert(
+        LINE_DOCTYPE,
+        ["name", "parent", "parenttype", "parentfield", "idx", "creation", "modified", "owner", "modified_by", *fields],
+        [
+            [frappe.generate_hash(length=10), po_import.name, IMPORT_DOCTYPE, "lines", i, now, now, user, user,
+             *(l.get(f) for f in fields)]
+            for i, l in enumerate(lines, 1)
+        ],
+    )
+
+
+def run_import(import_name):
+    """Parse, resolve and create the draft Sales Order for one Customer PO Import."""
+    po_import = frappe.get_doc(IMPORT_DOCTYPE, import_name)
+    po_import.db_set("status", "Processing", commit=True, notify=True)
+    try:
+        lines = resolve_lines(
+            parse_po_rows(read_po_file(po_import.import_file)), po_import.customer, po_import.match_threshold
+        )
+        _write_lines(po_import, lines)
+        so = _make_sales_order(po_import, lines)
+
+        resolved = sum(1 for l in lines if l.status == "Resolved")
+        po_import.db_set({
+            "status": "Completed" if resolved == len(lines) else ("Partially Completed" if so else "Needs Review"),
+            "sales_order": so.name if so else None,
+            "total_lines": len(lines),
+            "resolved_lines": resolved,
+            "error_log": "",
+        }, notify=True)
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        po_import.db_set({"status": "Failed", "error_log": frappe.get_traceback()}, commit=True, notify=True)
+        frappe.log_error(title=_("Customer PO Import {0} failed").format(import_name))
+
+
+def enqueue_import(import_name):
+    frappe.enqueue(
+        "devp_custom.po_ingestion.run_import",
+        queue="long",
+        timeout=3600,
+        job_id=f"customer_po_import::{import_name}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        import_name=import_name,
+    )
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Cache prewarming after deploys.
+
+A fresh deploy (bench migrate, worker restart, Redis flush) leaves devp_custom's caches
+cold, and the first users on Sales Invoice / Sales Order forms pay for filling them.
+prewarm_caches() fills them up front for the busiest customers and items of recently
+submitted Sales Invoices:
+
+    doctype meta and Devp Custom Settings
+    customers: cached Customer docs (customer group lookups), customer catalogs
+    items: cached Item docs, item-group code prefixes, mapping version intervals
+
+Steps run in that order and stop when the time budget is used up. It runs in the
+background after every migrate (Devp Custom Settings > Cache Prewarming) and on demand:
+
+    bench --site <site> devp-prewarm-caches [--time-budget 120] [--background]
+"""
+from __future__ import annotations
+
+from time import monotonic
+
+import frappe
+from frappe.utils import add_days, cint, nowdate
+
+from devp_custom.devp_custom.doctype.devp_custom_settings.devp_custom_settings import get_setting
+
+JOB_ID = "devp_custom_prewarm_caches"
+
+WARM_DOCTYPES = (
+    "Sales Invoice", "Sales Invoice Item", "Sales Order", "Sales Order Item",
+    "Delivery Note", "Delivery Note Item", "Quotation", "Quotation Item",
+    "Item", "Item Group", "Customer", "Batch", "Item Customer Mapping", "Devp Custom Settings",
+)
+
+
+def _top(column, table, limit, since):
+    """Most frequent values of `column` on submitted Sales Invoices since `since`."""
+    return [r[0] for r in frappe.db.sql(
+        f"""
+        SELECT {column}, COUNT(*) AS uses
+        FROM {table}
+        WHERE si.docstatus = 1 AND si.posting_date >= %s AND IFNULL({column}, '') != ''
+        GROUP BY {column}
+        ORDER BY uses DESC
+        LIMIT %s
+        """,
+        (since, cint(limit)),
+    )]
+
+
+def prewarm_caches(time_budget=None):
+    """Warm devp_custom caches until done or `time_budget` seconds are used; returns a summary."""
+    from devp_custom.api.item_code import _compose_prefix_from_item_group
+    from devp_custom.api.mapping_history import _load_intervals
+    from devp_custom.customer_catalog import get_catalog
+
+    budget = cint(time_budget or get_setting("prewarm_time_budget", 60)) or 60
+    start = monotonic()
+    deadline = start + budget
+    summary = {"meta": 0, "customers": 0, "catalogs": 0, "items": 0, "item_groups": 0, "interval_items": 0}
+
+    def out_of_time():
+        return monotonic() >= deadline
+
+    def run(step, values, warm):
+        for value in values:
+            if out_of_time():
+                return
+            warm(value)
+            summary[step] += 1
+
+    run("meta", WARM_DOCTYPES, frappe.get_meta)
+    for field in frappe.get_meta("Devp Custom Settings").get_valid_columns():
+        get_setting(field)
+
+    since = add_days(nowdate(), -cint(get_setting("prewarm_lookback_days", 30)))
+    customers = _top("si.customer", "`tabSales Invoice` si", get_setting("prewarm_customers", 200), since)
+    items = _top(
+        "sii.item_code",
+        "`tabSales Invoice Item` sii JOIN `tabSales Invoice` si ON si.name = sii.parent",
+        get_setting("prewarm_items", 1000),
+        since,
+    )
+
+    groups = {}
+    run("customers", customers, lambda c: groups.__setitem__(
+        c, frappe.get_cached_value("Customer", c, "customer_group")
+    ))
+    run("catalogs", customers, lambda c: get_catalog(c, groups.get(c)))
+
+    item_groups = set()
+    run("items", items, lambda i: item_groups.add(frappe.get_cached_value("Item", i, "item_group")))
+    run("item_groups", sorted(filter(None, item_groups)), _compose_prefix_from_item_group)
+    for i in range(0, len(items), 200):
+        if out_of_time():
+            break
+        chunk = items[i:i + 200]
+        _load_intervals(chunk)
+        summary["interval_items"] += len(chunk)
+
+    summary.update(seconds=round(monotonic() - start, 2), completed=not out_of_time())
+    frappe.logger("devp_custom.prewarm").info(f"cache prewarm: {summary}")
+    return summary
+
+
+def enqueue_prewarm(force=False, time_budget=None):
+    """after_migrate hook: queue prewarm_caches unless disabled in Devp Custom Settings."""
+    if not force and not cint(get_setting("prewarm_after_migrate", 1)):
+        return
+    try:
+        frappe.enqueue(
+            "devp_custom.prewarm.prewarm_caches",
+            queue="long",
+            job_id=JOB_ID,
+            deduplicate=True,
+            time_budget=time_budget,
+        )
+    except Exception:
+        # never fail a migrate because the queue is not reachable
+        frappe.logger("devp_custom.prewarm").warning("Could not queue cache prewarm", exc_info=True)
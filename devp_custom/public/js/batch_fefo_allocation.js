@@ -0,0 +1,99 @@
+// devp_custom/public/js/batch_fefo_allocation.js
+// "Allocate Batches (FEFO)" for Sales Invoice and Delivery Note.
+// Sends every item line to devp_custom.api.allocate_batches_fefo in one call and
+// splits the rows across batches in first-expiry-first-out order.
+
+(function () {
+
+    const SKIP_FIELDS = ['name', 'idx', 'docstatus', 'creation', 'modified', 'owner', 'modified_by',
+        '__islocal', '__unsaved', '__checked'];
+
+    function add_button(frm) {
+        if (frm.doc.docstatus !== 0) return;
+        if (frm.doctype === 'Sales Invoice' && !frm.doc.update_stock) return;
+        frm.add_custom_button(__('Allocate Batches (FEFO)'), () => allocate(frm), __('Tools'));
+    }
+
+    function allocate(frm) {
+        const rows = (frm.doc.items || []).filter(r => r.item_code && flt(r.qty) > 0);
+        if (!rows.length) return;
+
+        const lines = rows.map(r => ({
+            idx: r.idx,
+            item_code: r.item_code,
+            warehouse: r.warehouse || '',
+            qty: flt(r.stock_qty) || flt(r.qty) * (flt(r.conversion_factor) || 1)
+        }));
+
+        frappe.call({
+            method: 'devp_custom.api.allocate_batches_fefo',
+            args: { lines: JSON.stringify(lines), posting_date: frm.doc.posting_date },
+            freeze: true,
+            freeze_message: __('Allocating batches...')
+        }).then(r => {
+            const res = (r && r.message) || {};
+            apply_allocation(frm, rows, res.rows || [], res.shortfalls || []);
+            report_shortfalls(res.shortfalls || []);
+        });
+    }
+
+    function apply_allocation(frm, rows, allocations, shortfalls) {
+        const by_idx = {};
+        allocations.forEach(a => (by_idx[a.idx] = by_idx[a.idx] || []).push(a));
+        // the unallocated rest stays on a row without batch, so the ordered qty never shrinks
+        shortfalls.forEach(s => {
+            if (by_idx[s.idx]) by_idx[s.idx].push({ idx: s.idx, batch_no: '', qty: s.qty });
+        });
+        const has_dates = frappe.meta.has_field(frm.doctype + ' Item', 'batch_expiry_date');
+
+        // walk bottom-up so inserted rows do not shift the idx of rows still to process
+        rows.slice().reverse().forEach(row => {
+            const splits = by_idx[row.idx];
+            if (!splits || !splits.length) return;
+
+            const cf = flt(row.conversion_factor) || 1;
+            const template = {};
+            Object.keys(row).forEach(k => { if (!SKIP_FIELDS.includes(k)) template[k] = row[k]; });
+
+            splits.forEach((a, i) => {
+                const target = i === 0
+                    ? row
+                    : frappe.model.add_child(frm.doc, row.doctype, 'items', row.idx + i);
+                if (i > 0) Object.assign(target, template);
+                target.batch_no = a.batch_no || '';
+                target.qty = flt(a.qty) / cf;
+                target.stock_qty = flt(a.qty);
+                if (has_dates) {
+                    target.batch_expiry_date = a.expiry_date || null;
+                    target.batch_manufacturing_date = a.manufacturing_date || null;
+                }
+            });
+        });
+
+        frm.refresh_field('items');
+        if (frm.cscript && frm.cscript.calculate_taxes_and_totals) {
+            frm.cscript.calculate_taxes_and_totals();
+        }
+        frm.dirty();
+    }
+
+    function report_shortfalls(shortfalls) {
+        if (!shortfalls.length) {
+            frappe.show_alert({ message: __('Batches allocated.'), indicator: 'green' }, 4);
+            return;
+        }
+        const lines = shortfalls.map(s =>
+            `<li>${__('Row {0}', [s.idx])}: ${frappe.utils.escape_html(s.item_code)} — ${__('short by {0}', [s.qty])}</li>`
+        ).join('');
+        frappe.msgprint({
+            title: __('Insufficient Batch Availability'),
+            indicator: 'orange',
+            message: `<ul>${lines}</ul><p>${__('The unallocated quantity is kept on a row without a batch.')}</p>`
+        });
+    }
+
+    ['Sales Invoice', 'Delivery Note'].forEach(dt => {
+        frappe.ui.form.on(dt, { refresh: add_button });
+    });
+
+})();
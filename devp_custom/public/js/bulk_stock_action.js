@@ -0,0 +1,80 @@
+// devp_custom/public/js/bulk_stock_action.js
+// "Submit (Batch-aware)" / "Cancel (Batch-aware)" list actions for Delivery Note and
+// Sales Invoice. Queues devp_custom.bulk_stock.enqueue_bulk_action, which applies the
+// batch availability changes of the selected documents together, chunk by chunk.
+
+(function () {
+
+    const DOCTYPES = ['Delivery Note', 'Sales Invoice'];
+
+    function run(listview, action) {
+        const names = listview.get_checked_items(true);
+        if (!names.length) {
+            frappe.msgprint(__('Select at least one document'));
+            return;
+        }
+        const label = action === 'submit' ? __('Submit') : __('Cancel');
+        frappe.confirm(__('{0} {1} {2} in the background?', [label, names.length, __(listview.doctype)]), () => {
+            frappe.call({
+                method: 'devp_custom.bulk_stock.enqueue_bulk_action',
+                args: { doctype: listview.doctype, names: JSON.stringify(names), action: action },
+                freeze: true
+            }).then(r => {
+                const res = (r && r.message) || {};
+                listview.clear_checked_items();
+                frappe.show_alert({
+                    message: __('Queued {0} documents. You will be notified when done.', [res.total]),
+                    indicator: 'blue'
+                });
+            });
+        });
+    }
+
+    function show_result(data) {
+        const failed = data.failed || [];
+        const rows = failed.map(f =>
+            `<tr>
+                <td><a href="/app/${frappe.router.slug(data.doctype)}/${encodeURIComponent(f.name)}">${frappe.utils.escape_html(f.name)}</a></td>
+                <td>${frappe.utils.escape_html(f.error || '')}</td>
+            </tr>`
+        ).join('');
+
+        frappe.msgprint({
+            title: __('Bulk {0}: {1}', [__(data.action === 'submit' ? 'Submit' : 'Cancel'), __(data.doctype)]),
+            indicator: failed.length ? 'orange' : 'green',
+            message: `<p>${__('{0} of {1} documents done.', [(data.done || []).length, data.total])}</p>`
+                + (failed.length
+                    ? `<table class="table table-bordered table-sm">
+                        <thead><tr><th>${__('Document')}</th><th>${__('Error')}</th></tr></thead>
+                        <tbody>${rows}</tbody>
+                    </table>`
+                    : '')
+        });
+        if (window.cur_list && cur_list.doctype === data.doctype) {
+            cur_list.refresh();
+        }
+    }
+
+    if (!frappe.__devp_bulk_stock_listener) {
+        frappe.__devp_bulk_stock_listener = true;
+        frappe.realtime.on('devp_bulk_stock_action', show_result);
+    }
+
+    DOCTYPES.forEach(doctype => {
+        const settings = frappe.listview_settings[doctype] = frappe.listview_settings[doctype] || {};
+        if (settings.__devp_bulk_stock) return;
+        settings.__devp_bulk_stock = true;
+
+        // keep ERPNext's own onload
+        const onload = settings.onload;
+        settings.onload = function (listview) {
+            if (onload) onload.apply(this, arguments);
+            if (frappe.model.can_submit(doctype)) {
+                listview.page.add_actions_menu_item(__('Submit (Batch-aware)'), () => run(listview, 'submit'), false);
+            }
+            if (frappe.model.can_cancel(doctype)) {
+                listview.page.add_actions_menu_item(__('Cancel (Batch-aware)'), () => run(listview, 'cancel'), false);
+            }
+        };
+    });
+})();
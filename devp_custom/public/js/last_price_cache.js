@@ -0,0 +1,88 @@
+// devp_custom/public/js/last_price_cache.js
+// Shared browser cache for devp_custom.api.get_last_item_prices (last-price dialogs of
+// sales_invoice_item.js and quotation_item_last_prices.js).
+//
+// Entries are keyed by (item_code, customer, scope, limit), kept in LRU order and
+// bounded by MAX_ENTRIES and TTL_MS. A hit resolves at once with the cached rows and
+// revalidates in the background without freezing the form; on_refresh gets the new
+// rows when they differ. Only a miss calls the server with freeze.
+
+frappe.provide('devp_custom.last_prices');
+
+(function (lp) {
+    if (lp.fetch) return; // loaded by several doctype scripts
+
+    const MAX_ENTRIES = 200;
+    const TTL_MS = 10 * 60 * 1000;          // older entries are not shown at all
+    const REVALIDATE_AFTER_MS = 30 * 1000;  // younger entries are not refetched
+
+    const entries = new Map();   // key -> { data, at }; Map order is the LRU order
+    const inflight = new Map();  // key -> Promise of rows
+
+    function make_key(args) {
+        return JSON.stringify([args.item_code, args.customer || '', args.scope, args.limit]);
+    }
+
+    function lookup(key) {
+        const entry = entries.get(key);
+        if (!entry) return null;
+        entries.delete(key);
+        if (Date.now() - entry.at > TTL_MS) return null;
+        entries.set(key, entry);  // most recently used goes last
+        return entry;
+    }
+
+    function store(key, data) {
+        entries.delete(key);
+        entries.set(key, { data: data, at: Date.now() });
+        while (entries.size > MAX_ENTRIES) {
+            entries.delete(entries.keys().next().value);
+        }
+    }
+
+    function request(key, args, freeze) {
+        if (inflight.has(key)) return inflight.get(key);
+        // wrapped so .finally is available whatever frappe.call returns
+        const promise = Promise.resolve(frappe.call({
+            method: 'devp_custom.api.get_last_item_prices',
+            args: {
+                item_code: args.item_code,
+                customer: args.customer || '',
+                limit: args.limit,
+                include_other_customers: args.scope === 'all' ? 1 : 0
+            },
+            freeze: freeze,
+            freeze_message: freeze ? args.freeze_message : undefined
+        })).then(r => {
+            const data = (r && r.message) || [];
+            store(key, data);
+            return data;
+        }).finally(() => inflight.delete(key));
+        inflight.set(key, promise);
+        return promise;
+    }
+
+    // args: { item_code, customer, scope: 'customer' | 'all', limit, freeze_message }
+    // Returns a Promise of the rows; on_refresh(rows) follows a cache hit if the server
+    // returned something different.
+    lp.fetch = function (args, on_refresh) {
+        args = Object.assign({ scope: 'customer', limit: 5 }, args);
+        const key = make_key(args);
+        const entry = lookup(key);
+        if (!entry) return request(key, args, true);
+
+        if (Date.now() - entry.at > REVALIDATE_AFTER_MS) {
+            const shown = JSON.stringify(entry.data);
+            request(key, args, false)
+                .then(data => {
+                    if (on_refresh && JSON.stringify(data) !== shown) on_refresh(data);
+                })
+                .catch(err => console.warn('Last prices revalidation failed', err));
+        }
+        return Promise.resolve(entry.data);
+    };
+
+    lp.clear = function () {
+        entries.clear();
+    };
+})(devp_custom.last_prices);
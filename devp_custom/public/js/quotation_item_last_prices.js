@@ -2,6 +2,8 @@
 // Standalone: show last selling prices for Quotation Item rows.
 // Default: fetch last prices for current customer. Secondary button "Show other parties"
 // fetches history across other customers and replaces the table data.
+// Prices come through devp_custom.last_prices (last_price_cache.js): items already seen
+// open instantly and refresh in the background.
 
 frappe.ui.form.on('Quotation Item', {
     item_code: function(frm, cdt, cdn) {
@@ -10,45 +12,43 @@ frappe.ui.form.on('Quotation Item', {
 
         const customer = frm.doc.customer || "";
 
+        // background refreshes only touch the dialog while it shows the same scope
+        let dialog = null;
+        const refreshDialog = (scope) => (data) => {
+            if (dialog && dialog.display && dialog.devp_scope === scope && data.length) {
+                dialog.devp_set_rows(data);
+            }
+        };
+
         const fetchForCustomer = (limit=5) => {
-            return frappe.call({
-                method: 'devp_custom.api.get_last_item_prices',
-                args: {
-                    item_code: item.item_code,
-                    customer: customer,
-                    limit: limit,
-                    include_other_customers: false
-                },
-                freeze: true,
+            return devp_custom.last_prices.fetch({
+                item_code: item.item_code,
+                customer: customer,
+                scope: 'customer',
+                limit: limit,
                 freeze_message: 'Fetching last selling prices...'
-            });
+            }, refreshDialog('customer'));
         };
 
         const fetchOtherCustomers = (limit=50) => {
-            return frappe.call({
-                method: 'devp_custom.api.get_last_item_prices',
-                args: {
-                    item_code: item.item_code,
-                    customer: customer,
-                    limit: limit,
-                    include_other_customers: true
-                },
-                freeze: true,
+            return devp_custom.last_prices.fetch({
+                item_code: item.item_code,
+                customer: customer,
+                scope: 'all',
+                limit: limit,
                 freeze_message: 'Fetching last selling prices from other parties...'
-            });
+            }, refreshDialog('all'));
         };
 
         // Try customer-specific history first
-        fetchForCustomer().then(function(resp) {
-            const data = (resp && resp.message) ? resp.message : [];
+        fetchForCustomer().then(function(data) {
             if (data.length) {
-                openQuotationPriceDialog(frm, item, data, true, false, () => fetchOtherCustomers(50));
+                dialog = openQuotationPriceDialog(frm, item, data, true, false, () => fetchOtherCustomers(50));
             } else {
                 // fallback: if no customer-specific history, fetch other-party data immediately
-                fetchOtherCustomers(50).then(function(resp2) {
-                    const other = (resp2 && resp2.message) ? resp2.message : [];
+                fetchOtherCustomers(50).then(function(other) {
                     if (other.length) {
-                        openQuotationPriceDialog(frm, item, other, false, true, null);
+                        dialog = openQuotationPriceDialog(frm, item, other, false, true, null);
                     } else {
                         frappe.show_alert({
                             message: __('No previous selling price found for {0}.', [item.item_code]),
@@ -149,18 +149,15 @@ function openQuotationPriceDialog(frm, item, data, allow_other_button=false, is_
             const btn = dialog.wrapper && dialog.wrapper.find('.modal-footer .btn-secondary');
             if (btn && btn.length) btn.prop('disabled', true).text('Loading...');
 
-            fetchOtherCustomersFn().then(function(res) {
-                const other = (res && res.message) ? res.message : [];
+            fetchOtherCustomersFn().then(function(other) {
                 if (!other.length) {
                     frappe.msgprint({ title: 'No history', message: 'No records found from other parties.' });
                     if (btn && btn.length) btn.prop('disabled', false).text('Show other parties');
                     return;
                 }
                 try {
-                    const grid = dialog.fields_dict.prices.grid;
-                    grid.wrapper && grid.wrapper.scrollTop(0);
-                    grid.df.data = map_data_for_dialog(other);
-                    grid.refresh();
+                    dialog.devp_set_rows(other);
+                    dialog.devp_scope = 'all';
                     dialog.set_title(`${item.item_code} — Last Selling Prices (from other parties)`);
                     if (btn && btn.length) {
                         btn.prop('disabled', true).text('Shown');
@@ -179,6 +176,13 @@ function openQuotationPriceDialog(frm, item, data, allow_other_button=false, is_
     }
 
     const dialog = new frappe.ui.Dialog(dialog_args);
+    dialog.devp_scope = is_other_party ? 'all' : 'customer';
+    dialog.devp_set_rows = function(rows) {
+        const grid = dialog.fields_dict.prices.grid;
+        grid.wrapper && grid.wrapper.scrollTop(0);
+        grid.df.data = map_data_for_dialog(rows);
+        grid.refresh();
+    };
     dialog.show();
 
     // auto-select first row for convenience
@@ -195,6 +199,8 @@ function openQuotationPriceDialog(frm, item, data, allow_other_button=false, is_
         console.warn('Auto-select failed', e);
     }
 
+    return dialog;
+
     // normalize server data for dialog
     function map_data_for_dialog(raw) {
         return (raw || []).map(function(r) {
@@ -1,33 +1,83 @@
-// Auto-fill Batch Expiry & Manufacturing dates on Sales Invoice Item from selected Batch
+// Auto-fill Batch Expiry & Manufacturing dates on Sales Invoice Item from selected Batch.
+// Batch metadata is cached per browser session: the cache is warmed in one request for every
+// batch already on the form, and a single batch is only re-fetched when its entry is stale.
+
+frappe.provide('devp_custom.batch_meta');
+
+(function (cache) {
+  const TTL_MS = 10 * 60 * 1000;
+  const FIELDS = ['name', 'expiry_date', 'manufacturing_date', 'batch_size'];
+
+  cache.entries = cache.entries || {};
+
+  function is_fresh(batch_no) {
+    const e = cache.entries[batch_no];
+    return !!e && (Date.now() - e.fetched_at) < TTL_MS;
+  }
+
+  function store(rows) {
+    const now = Date.now();
+    (rows || []).forEach(r => { cache.entries[r.name] = { data: r, fetched_at: now }; });
+  }
+
+  // Fetch all stale/missing batches in one call; resolves to { batch_no: data }
+  cache.get_many = function (batch_nos) {
+    const names = Array.from(new Set((batch_nos || []).filter(Boolean)));
+    const stale = names.filter(b => !is_fresh(b));
+    const done = () => {
+      const out = {};
+      names.forEach(b => { if (cache.entries[b]) out[b] = cache.entries[b].data; });
+      return out;
+    };
+    if (!stale.length) return Promise.resolve(done());
+
+    return frappe.db.get_list('Batch', {
+      filters: [['name', 'in', stale]],
+      fields: FIELDS,
+      limit: stale.length
+    }).then(rows => { store(rows); return done(); });
+  };
+
+  cache.get = function (batch_no) {
+    return cache.get_many([batch_no]).then(map => map[batch_no] || {});
+  };
+})(devp_custom.batch_meta);
+
+function set_batch_dates(cdt, cdn, d) {
+  frappe.model.set_value(cdt, cdn, 'batch_expiry_date', (d && d.expiry_date) || null);
+  frappe.model.set_value(cdt, cdn, 'batch_manufacturing_date', (d && d.manufacturing_date) || null);
+}
 
 frappe.ui.form.on('Sales Invoice Item', {
   // Clear when item changes
   item_code(frm, cdt, cdn) {
-    frappe.model.set_value(cdt, cdn, 'batch_expiry_date', null);
-    frappe.model.set_value(cdt, cdn, 'batch_manufacturing_date', null);
+    set_batch_dates(cdt, cdn, null);
   },
 
-  // Fill when batch selected
+  // Fill when batch selected (served from cache when fresh)
   batch_no(frm, cdt, cdn) {
     const row = locals[cdt][cdn];
     if (!row.batch_no) {
-      frappe.model.set_value(cdt, cdn, 'batch_expiry_date', null);
-      frappe.model.set_value(cdt, cdn, 'batch_manufacturing_date', null);
+      set_batch_dates(cdt, cdn, null);
       return;
     }
-    frappe.db.get_value('Batch', row.batch_no, ['expiry_date', 'manufacturing_date'])
-      .then(r => {
-        const d = r.message || {};
-        frappe.model.set_value(cdt, cdn, 'batch_expiry_date', d.expiry_date || null);
-        frappe.model.set_value(cdt, cdn, 'batch_manufacturing_date', d.manufacturing_date || null);
-      });
+    devp_custom.batch_meta.get(row.batch_no).then(d => set_batch_dates(cdt, cdn, d));
   }
 });
 
-// (Optional) Also fetch via add_fetch so it fills on load/refresh too
 frappe.ui.form.on('Sales Invoice', {
-  setup(frm) {
-    frm.add_fetch('batch_no', 'expiry_date', 'batch_expiry_date');
-    frm.add_fetch('batch_no', 'manufacturing_date', 'batch_manufacturing_date');
+  // Warm the cache in bulk for all batches on the document and fill any missing dates
+  onload(frm) {
+    const rows = (frm.doc.items || []).filter(r => r.batch_no);
+    if (!rows.length) return;
+
+    devp_custom.batch_meta.get_many(rows.map(r => r.batch_no)).then(map => {
+      if (frm.doc.docstatus !== 0) return;
+      rows.forEach(r => {
+        if (r.batch_expiry_date || r.batch_manufacturing_date) return;
+        const d = map[r.batch_no];
+        if (d) set_batch_dates(r.doctype, r.name, d);
+      });
+    });
   }
 });
@@ -5,22 +5,21 @@ function mark_row(frm, row, has_error) {
     if (gr?.$row?.length) gr.$row.toggleClass('row-error', !!has_error);
 }
 
-function get_batch_size_sync(batch_no) {
-    if (!batch_no) return null;
-    let value = null;
+// One server round-trip for all rows: { mode: Block | Warn | Off, violations: [dialog-ready rows] }
+function get_batch_size_violations_sync(frm) {
+    const items = (frm.doc.items || [])
+        .filter(row => row.batch_no)
+        .map(row => ({ idx: row.idx, item_code: row.item_code || '', batch_no: row.batch_no, qty: flt(row.qty) || 0 }));
+    let value = { mode: 'Off', violations: [] };
+    if (!items.length) return value;
     frappe.call({
-        method: "frappe.client.get_value",
-        args: { doctype: "Batch", filters: { name: batch_no }, fieldname: "batch_size" },
+        method: "devp_custom.api.get_batch_size_violations",
+        args: { items: JSON.stringify(items) },
         async: false,
-        callback: r => value = (r?.message?.batch_size != null ? flt(r.message.batch_size) : null)
+        callback: r => value = (r && r.message) || value
     });
     return value;
 }
-function ensure_row_limit(row) {
-    let lim = (row.batch_size_limit != null && row.batch_size_limit !== "") ? flt(row.batch_size_limit) : null;
-    if (lim == null && row.batch_no) lim = get_batch_size_sync(row.batch_no);
-    return lim;
-}
 (function inject_custom_css_once() {
     const id = "batch-size-validation-style";
     if (document.getElementById(id)) return;
@@ -44,132 +43,132 @@ function ensure_row_limit(row) {
     document.head.appendChild(style);
 })();
 
-// --- main upgrade: always check on save, single-use client override ---
+// --- check on save per Batch Size Check: Block shows the dialog, Warn an alert, Off nothing ---
 frappe.ui.form.on('Sales Invoice', {
     validate: function(frm) {
-        // Use a client-only temporary override (not persisted)
+        // Use a client-only temporary override (not persisted), good for this one save
         const allow_override = frm._temp_allow_batch_exceed === true;
+        frm._temp_allow_batch_exceed = false;
+        if (allow_override) {
+            // sent with this save only; the server downgrades Block to Warn for it
+            frm.doc.__batch_size_override = 1;
+        } else {
+            delete frm.doc.__batch_size_override;
+        }
 
-        const violations = [];
-
-        (frm.doc.items || []).forEach(row => {
-            // clear any previous visual mark for this row
-            mark_row(frm, row, false);
-            if (!row.batch_no) return;
-
-            const qty = flt(row.qty) || 0;
-            const lim = ensure_row_limit(row);
+        (frm.doc.items || []).forEach(row => mark_row(frm, row, false));
 
-            if (lim == null) { // null/undefined = missing (0 is valid)
-                violations.push({ idx: row.idx, item_code: row.item_code || '', batch_no: row.batch_no, qty, limit: '—', reason: 'Batch size not available' });
-                mark_row(frm, row, true);
-                return;
-            }
-            if (qty > lim) {
-                violations.push({ idx: row.idx, item_code: row.item_code || '', batch_no: row.batch_no, qty, limit: lim, reason: 'Qty exceeds batch size' });
-                mark_row(frm, row, true);
-            }
+        const check = get_batch_size_violations_sync(frm);
+        const violations = check.violations || [];
+        violations.forEach(v => {
+            const row = (frm.doc.items || []).find(r => r.idx === v.idx);
+            if (row) mark_row(frm, row, true);
         });
+        if (!violations.length || allow_override) return;
 
-        // If violations exist AND no temporary override is set, show dialog and block save.
-        if (violations.length && !allow_override) {
-            const count = violations.length;
-            const rows_html = violations.map(v =>
-                `<tr>
-                    <td style="text-align:center">${frappe.utils.escape_html(String(v.idx))}</td>
-                    <td>${frappe.utils.escape_html(v.item_code)}</td>
-                    <td>${frappe.utils.escape_html(v.batch_no)}</td>
-                    <td style="text-align:right">${v.qty}</td>
-                    <td style="text-align:right">${v.limit}</td>
-                    <td>${frappe.utils.escape_html(v.reason)}</td>
-                </tr>`
-            ).join('');
-
-            const html =
-                `<div class="batch-alert">
-                    <div class="summary">
-                        <span>🚫 ${__("Batch Size Violations Detected")}</span>
-                        <span class="badge">${count} ${count === 1 ? __("issue") : __("issues")}</span>
-                    </div>
-                    <div style="margin-bottom:8px; color:#5f2120;">
-                        ${__("Please adjust quantities or change batches before saving. You can choose Save Anyway to persist for this attempt; the check will still run next time.")}
-                    </div>
-                    <div class="grid-overflow" style="max-height:280px; overflow:auto; border:1px solid var(--border-color); border-radius:10px; background:#fff;">
-                        <table class="table table-bordered table-sm" style="margin:0">
-                            <thead>
-                                <tr>
-                                    <th style="width:70px; text-align:center">#</th>
-                                    <th>${__("Item")}</th>
-                                    <th>${__("Batch")}</th>
-                                    <th style="text-align:right">${__("Qty")}</th>
-                                    <th style="text-align:right">${__("Limit")}</th>
-                                    <th>${__("Reason")}</th>
-                                </tr>
-                            </thead>
-                            <tbody>${rows_html}</tbody>
-                        </table>
-                    </div>
-                 </div>`;
+        if (check.mode !== 'Block') {
+            // Warn: the save goes through; the server repeats the details after saving
+            frappe.show_alert({
+                message: __('{0} row(s) exceed their batch size', [violations.length]),
+                indicator: 'orange'
+            });
+            return;
+        }
 
-            // scroll to first offending row
-            const first = violations[0];
-            const grid = frm.fields_dict.items.grid;
-            if (first && grid) {
-                const target = (frm.doc.items || []).find(r => r.idx === first.idx);
-                const gr = target ? grid.grid_rows_by_docname?.[target.name] : null;
-                if (gr?.$row?.length) {
-                    gr.$row[0].scrollIntoView({ behavior: 'smooth', block: 'center' });
-                    gr.$row.addClass('row-error-pulse');
-                    setTimeout(() => gr.$row.removeClass('row-error-pulse'), 1000);
-                }
+        // Block: show the dialog and stop this save
+        const count = violations.length;
+        const rows_html = violations.map(v =>
+            `<tr>
+                <td style="text-align:center">${frappe.utils.escape_html(String(v.idx))}</td>
+                <td>${frappe.utils.escape_html(v.item_code)}</td>
+                <td>${frappe.utils.escape_html(v.batch_no)}</td>
+                <td style="text-align:right">${v.qty}</td>
+                <td style="text-align:right">${v.limit}</td>
+                <td>${frappe.utils.escape_html(v.reason)}</td>
+            </tr>`
+        ).join('');
+
+        const html =
+            `<div class="batch-alert">
+                <div class="summary">
+                    <span>🚫 ${__("Batch Size Violations Detected")}</span>
+                    <span class="badge">${count} ${count === 1 ? __("issue") : __("issues")}</span>
+                </div>
+                <div style="margin-bottom:8px; color:#5f2120;">
+                    ${__("Please adjust quantities or change batches before saving. You can choose Save Anyway to persist for this attempt; the check will still run next time.")}
+                </div>
+                <div class="grid-overflow" style="max-height:280px; overflow:auto; border:1px solid var(--border-color); border-radius:10px; background:#fff;">
+                    <table class="table table-bordered table-sm" style="margin:0">
+                        <thead>
+                            <tr>
+                                <th style="width:70px; text-align:center">#</th>
+                                <th>${__("Item")}</th>
+                                <th>${__("Batch")}</th>
+                                <th style="text-align:right">${__("Qty")}</th>
+                                <th style="text-align:right">${__("Limit")}</th>
+                                <th>${__("Reason")}</th>
+                            </tr>
+                        </thead>
+                        <tbody>${rows_html}</tbody>
+                    </table>
+                </div>
+             </div>`;
+
+        // scroll to first offending row
+        const first = violations[0];
+        const grid = frm.fields_dict.items.grid;
+        if (first && grid) {
+            const target = (frm.doc.items || []).find(r => r.idx === first.idx);
+            const gr = target ? grid.grid_rows_by_docname?.[target.name] : null;
+            if (gr?.$row?.length) {
+                gr.$row[0].scrollIntoView({ behavior: 'smooth', block: 'center' });
+                gr.$row.addClass('row-error-pulse');
+                setTimeout(() => gr.$row.removeClass('row-error-pulse'), 1000);
             }
+        }
 
-            // Build dialog with Save Anyway (client-only temporary override)
-            const d = new frappe.ui.Dialog({
-                title: __('Batch Size Validation'),
-                indicator: 'red',
-                primary_action_label: __('Adjust Items'),
-                primary_action: () => d.hide()
+        // Build dialog with Save Anyway (client-only temporary override)
+        const d = new frappe.ui.Dialog({
+            title: __('Batch Size Validation'),
+            indicator: 'red',
+            primary_action_label: __('Adjust Items'),
+            primary_action: () => d.hide()
+        });
+        d.$body.html(html);
+
+        // Add "Save Anyway" (danger) which sets a client-only override and retries save
+        const $footer = d.$wrapper.find('.modal-footer');
+        const $saveAnyway = $(`<button class="btn btn-danger">${__('Save Anyway')}</button>`)
+            .on('click', async () => {
+                // set client temporary override and let the server-side check honour it;
+                // allow_batch_exceed is not touched: it also lifts the availability guard
+                frm._temp_allow_batch_exceed = true;
+                d.hide();
+
+                // Now attempt to save again — validate will see the temp flag and allow this save.
+                // After save completes, we clear the temp flag in frm.after_save below.
+                // use frm.save() so the normal lifecycle runs
+                frm.save();
             });
-            d.$body.html(html);
-
-            // Add "Save Anyway" (danger) which sets a client-only override and retries save
-            const $footer = d.$wrapper.find('.modal-footer');
-            const $saveAnyway = $(`<button class="btn btn-danger">${__('Save Anyway')}</button>`)
-                .on('click', async () => {
-                    // set client-only temporary override (non-persistent)
-                    frm._temp_allow_batch_exceed = true;
-                    d.hide();
+        $footer.prepend($saveAnyway);
 
-                    // Now attempt to save again — validate will see the temp flag and allow this save.
-                    // After save completes, we clear the temp flag in frm.after_save below.
-                    // use frm.save() so the normal lifecycle runs
-                    frm.save();
-                });
-            $footer.prepend($saveAnyway);
+        d.show();
 
-            d.show();
+        // Make it the red theme
+        setTimeout(() => {
+            const el = d.$wrapper.closest('.frappe-message-dialog')[0];
+            if (el) el.classList.add('error-dialog');
+        }, 10);
 
-            // Make it the red theme
-            setTimeout(() => {
-                const el = d.$wrapper.closest('.frappe-message-dialog')[0];
-                if (el) el.classList.add('error-dialog');
-            }, 10);
-
-            // Block the original save with frappe.validated = false and throw to stop further execution
-            frappe.validated = false;
-            throw new Error('Validation blocked by batch-size check');
-        }
+        // Block the original save with frappe.validated = false and throw to stop further execution
+        frappe.validated = false;
+        throw new Error('Validation blocked by batch-size check');
     },
 
     // Clear the temporary override after save so subsequent saves always re-check
     after_save: function(frm) {
-        if (frm._temp_allow_batch_exceed) {
-            // clear the client-only flag immediately in memory
-            frm._temp_allow_batch_exceed = false;
-
-            // Also ensure we don't persist any DB field accidentally:
-            // do NOT set a value on frm.doc.allow_batch_exceed here.
-        }
+        // validate already consumed the flag; drop the override key from the local doc too
+        frm._temp_allow_batch_exceed = false;
+        delete frm.doc.__batch_size_override;
     }
 });
@@ -1,22 +1,20 @@
 // devp_custom/public/js/sales_invoice_item.js
 // Unified last-selling-price popup for Sales Invoice Item, Sales Order Item, Delivery Note Item.
+// Prices come through devp_custom.last_prices (last_price_cache.js): items already seen
+// open instantly and refresh in the background.
 
 (function () {
 
-    function fetch_prices(item_code, customer, include_other) {
-        return frappe.call({
-            method: 'devp_custom.api.get_last_item_prices',
-            args: {
-                item_code: item_code,
-                customer: customer,
-                limit: 5,
-                include_other_customers: include_other ? 1 : 0
-            },
-            freeze: true,
+    function fetch_prices(item_code, customer, include_other, on_refresh) {
+        return devp_custom.last_prices.fetch({
+            item_code: item_code,
+            customer: customer,
+            scope: include_other ? 'all' : 'customer',
+            limit: 5,
             freeze_message: include_other
                 ? __('Fetching price history from all customers...')
                 : __('Fetching last selling prices...')
-        });
+        }, on_refresh);
     }
 
     function on_item_code(frm, cdt, cdn) {
@@ -25,21 +23,29 @@
 
         const customer = frm.doc.customer || '';
 
-        fetch_prices(item.item_code, customer, false)
-            .then(function (r) {
-                const data = (r && r.message) ? r.message : [];
+        // background refreshes only touch the dialog while it shows the same scope
+        let dialog = null;
+        const refresh_dialog = function (scope) {
+            return function (data) {
+                if (dialog && dialog.display && dialog.devp_scope === scope && data.length) {
+                    set_dialog_rows(dialog, data);
+                }
+            };
+        };
+
+        fetch_prices(item.item_code, customer, false, refresh_dialog('customer'))
+            .then(function (data) {
                 if (data.length) {
-                    show_last_price_dialog(item, data, false, function () {
-                        return fetch_prices(item.item_code, customer, true);
+                    dialog = show_last_price_dialog(item, data, false, function () {
+                        return fetch_prices(item.item_code, customer, true, refresh_dialog('all'));
                     });
                     return;
                 }
                 // No customer-specific history — fallback to all customers
-                fetch_prices(item.item_code, customer, true)
-                    .then(function (r2) {
-                        const other = (r2 && r2.message) ? r2.message : [];
+                fetch_prices(item.item_code, customer, true, refresh_dialog('all'))
+                    .then(function (other) {
                         if (other.length) {
-                            show_last_price_dialog(item, other, true, null);
+                            dialog = show_last_price_dialog(item, other, true, null);
                         } else {
                             frappe.show_alert({
                                 message: __('No previous selling price found for {0}.', [item.item_code]),
@@ -113,8 +119,7 @@
                 if (btn && btn.length) btn.prop('disabled', true).text(__('Loading...'));
 
                 fetch_other_fn()
-                    .then(function (res) {
-                        const other = (res && res.message) ? res.message : [];
+                    .then(function (other) {
                         if (!other.length) {
                             frappe.show_alert({
                                 message: __('No price records found from other customers.'),
@@ -124,9 +129,8 @@
                             return;
                         }
                         try {
-                            const grid = dialog.fields_dict.prices.grid;
-                            grid.df.data = map_rows(other);
-                            grid.refresh();
+                            set_dialog_rows(dialog, other);
+                            dialog.devp_scope = 'all';
                             dialog.set_title(item.item_code + ' — ' + __('Last Selling Prices') + ' (' + __('all customers') + ')');
                             if (btn && btn.length) btn.prop('disabled', true).text(__('Shown'));
                         } catch (e) {
@@ -142,6 +146,7 @@
         }
 
         const dialog = new frappe.ui.Dialog(dialog_args);
+        dialog.devp_scope = is_other_party ? 'all' : 'customer';
         dialog.show();
 
         // Auto-select first row for convenience
@@ -153,6 +158,13 @@
         } catch (e) {
             console.warn('Auto-select first row failed', e);
         }
+        return dialog;
+    }
+
+    function set_dialog_rows(dialog, data) {
+        const grid = dialog.fields_dict.prices.grid;
+        grid.df.data = map_rows(data);
+        grid.refresh();
     }
 
     function map_rows(raw) {
@@ -1,13 +1,24 @@
 # apps/devp_custom/devp_custom/sales_invoice.py
+import json
+
 import frappe
 from frappe import _
 from frappe.model.naming import make_autoname
-from frappe.utils import nowdate
+from frappe.utils import now_datetime, nowdate
+
+from devp_custom import invoice_number_pool
+from devp_custom.instrumentation import instrument
+
+RESERVATION_DOCTYPE = "Sales Invoice Name Reservation"
+INVALID_NAME_CHARS = ("\n", "\t")
 
+
+@instrument
 def autoname(doc, method=None):
     """
     Custom autoname for Sales Invoice:
-    - If user provided `custom_requested_name`, use it (after validation).
+    - If user provided `custom_requested_name`, claim it in the reservation table (same transaction).
+    - Else, with invoice number pools enabled, take the next number from the caller's pool.
     - Else fall back to naming-series style autoname.
     """
 
@@ -16,12 +27,13 @@ def autoname(doc, method=None):
     # If user supplied a requested name, try to use it.
     if requested:
         # Basic sanitization: you can adjust rules to your naming convention
-        if any(ch in requested for ch in ["\n", "\t"]):
+        if any(ch in requested for ch in INVALID_NAME_CHARS):
             frappe.throw(_("Requested invoice name contains invalid whitespace characters."))
 
-        # Check DB: if any Sales Invoice row exists with this name (including cancelled ones),
-        # block reuse and instruct the user to delete the old row first.
-        if frappe.db.exists("Sales Invoice", requested):
+        # Claim the name before any validation work runs. A concurrent claim of the same
+        # number waits on the primary key and then fails here instead of at final insert.
+        # Existing Sales Invoice rows (including cancelled ones) also block reuse.
+        if not _claim_requested_name(requested):
             frappe.throw(_("Invoice number {0} already exists. Please delete the old Sales Invoice row first to reuse this number.").format(requested))
 
         # Name is free — set it
@@ -32,6 +44,14 @@ def autoname(doc, method=None):
     # Example: SINV-YY.-.####  (you can use your existing naming_series logic)
     # If you want to use the existing naming_series set on the doc, use make_autoname(doc.naming_series + ".####")
     naming = doc.get("naming_series") or "SINV-.YY.-"
+
+    # Optional pool mode: take the next number from this user's / POS profile's block.
+    if invoice_number_pool.is_enabled():
+        pooled = invoice_number_pool.next_name(doc, naming)
+        if pooled:
+            doc.name = pooled
+            return
+
     # If naming_series already contains wildcard (.#### etc), you can pass it directly to make_autoname
     try:
         # If naming contains pattern markers used by make_autoname, pass directly
@@ -40,3 +60,88 @@ def autoname(doc, method=None):
         # fallback — simple date-based pattern if make_autoname fails
         y = nowdate().replace("-", "")[:6]
         doc.name = make_autoname(f"SINV-{y}-.####")
+
+
+def _claim_requested_name(requested):
+    """
+    Insert the reservation row unless a Sales Invoice already has this name.
+    Returns False when the name is taken (existing invoice or another reservation).
+    The row is part of the current transaction, so a failed insert releases it.
+    """
+    now = now_datetime()
+    try:
+        frappe.db.sql(
+            f"""
+            INSERT INTO `tab{RESERVATION_DOCTYPE}`
+                (name, reserved_by, owner, modified_by, creation, modified, docstatus, idx)
+            SELECT %(name)s, %(user)s, %(user)s, %(user)s, %(now)s, %(now)s, 0, 0
+            FROM DUAL
+            WHERE NOT EXISTS (SELECT 1 FROM `tabSales Invoice` WHERE name = %(name)s)
+            """,
+            {"name": requested, "user": frappe.session.user, "now": now},
+        )
+    except Exception as e:
+        if frappe.db.is_duplicate_entry(e):
+            return False
+        raise
+    return bool(frappe.db._cursor.rowcount)
+
+
+@instrument
+def release_requested_name(doc, method=None):
+    """Hook: on_trash of Sales Invoice. Deleting the invoice frees its number again."""
+    frappe.db.delete(RESERVATION_DOCTYPE, {"name": doc.name})
+
+
+@frappe.whitelist()
+@instrument
+def validate_requested_names(names):
+    """
+    Bulk pre-validation for imports: checks every requested invoice number of a file
+    in one query, before any Sales Invoice is built.
+
+    names: JSON list or newline/comma separated text.
+    Returns { ok, invalid, duplicates, taken }:
+      invalid    - names containing whitespace control characters
+      duplicates - names requested more than once within the file
+      taken      - names already used by a Sales Invoice or an active reservation
+    """
+    if isinstance(names, str):
+        try:
+            names = json.loads(names)
+        except ValueError:
+            names = names.replace(",", "\n").splitlines()
+
+    seen, duplicates, invalid, clean = set(), [], [], []
+    for raw in names or []:
+        if not raw or not str(raw).strip():
+            continue
+        if any(ch in str(raw).strip() for ch in INVALID_NAME_CHARS):
+            invalid.append(raw)
+            continue
+        name = str(raw).strip()
+        if name in seen:
+            if name not in duplicates:
+                duplicates.append(name)
+            continue
+        seen.add(name)
+        clean.append(name)
+
+    taken = []
+    if clean:
+        placeholders = ", ".join(["%s"] * len(clean))
+        taken = [r[0] for r in frappe.db.sql(
+            f"""
+            SELECT name FROM `tabSales Invoice` WHERE name IN ({placeholders})
+            UNION
+            SELECT name FROM `tab{RESERVATION_DOCTYPE}` WHERE name IN ({placeholders})
+            """,
+            tuple(clean) * 2,
+        )]
+
+    return {
+        "ok": not (invalid or duplicates or taken),
+        "invalid": invalid,
+        "duplicates": duplicates,
+        "taken": sorted(taken),
+    }
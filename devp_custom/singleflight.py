@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Single-flight coalescing of identical concurrent read requests.
+
+    @singleflight("price_history")
+    def _load(item_code, customer, limit, include_other):
+        ...
+
+For a given name + arguments only one worker runs the function at a time (Redis lock).
+The others wait up to `wait` seconds for the shared result, which is kept for `ttl`
+seconds. A waiter that times out computes the result itself. Redis errors fall back
+to a plain call. Callers must check permissions before calling: results are shared
+across users.
+
+Outcomes are counted per name in Redis (leader / coalesced / timeout / error):
+devp_custom.singleflight.get_singleflight_stats.
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import uuid
+from time import monotonic, sleep
+
+import frappe
+from frappe import _
+
+KEY_PREFIX = "devp_sf:"
+STATS_KEY = "devp_singleflight_stats"
+POLL_INTERVAL = 0.02
+
+
+def _flight_key(name, args, kwargs):
+    payload = json.dumps([args, kwargs], sort_keys=True, default=str)
+    return f"{KEY_PREFIX}{name}:{hashlib.sha1(payload.encode()).hexdigest()}"
+
+
+def _count(cache, name, outcome):
+    try:
+        # raw pipeline: RedisWrapper's hash helpers pickle values
+        pipe = cache.pipeline()
+        pipe.hincrby(cache.make_key(STATS_KEY), f"{name}:{outcome}", 1)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def _holds_lock(cache, lock_key, token):
+    return frappe.safe_decode(cache.get(cache.make_key(lock_key)) or b"") == token
+
+
+def _wait_for_result(cache, result_key, lock_key, token, wait, lock_timeout):
+    """
+    Returns the shared (value,) tuple, or None when this call took the lock (leader)
+    or gave up waiting (the caller tells the two apart with _holds_lock).
+    """
+    cached = cache.get_value(result_key, expires=True)
+    if cached is not None:
+        return cached
+    if cache.set(cache.make_key(lock_key), token, nx=True, ex=lock_timeout):
+        return None
+
+    deadline = monotonic() + wait
+    while monotonic() < deadline:
+        sleep(POLL_INTERVAL)
+        cached = cache.get_value(result_key, expires=True)
+        if cached is not None:
+            return cached
+    return None
+
+
+def singleflight(name, ttl=2, wait=3.0, lock_timeout=10):
+    """Decorator: coalesce concurrent calls with equal arguments under `name`."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = _flight_key(name, args, kwargs)
+            result_key, lock_key = key + ":result", key + ":lock"
+            token = uuid.uuid4().hex
+            try:
+                cache = frappe.cache()
+                cached = _wait_for_result(cache, result_key, lock_key, token, wait, lock_timeout)
+            except Exception:
+                _count(frappe.cache(), name, "error")
+                return fn(*args, **kwargs)
+
+            if cached is not None:
+                _count(cache, name, "coalesced")
+                return cached[0]
+            if not _holds_lock(cache, lock_key, token):
+                _count(cache, name, "timeout")
+                return fn(*args, **kwargs)
+
+            try:
+                value = fn(*args, **kwargs)
+                # wrapped in a tuple so a None / empty result is still a hit
+                cache.set_value(result_key, (value,), expires_in_sec=ttl)
+                _count(cache, name, "leader")
+                return value
+            finally:
+                try:
+                    if _holds_lock(cache, lock_key, token):
+                        cache.delete(cache.make_key(lock_key))
+                except Exception:
+                    pass
+
+        return wrapper
+
+    return decorator
+
+
+@frappe.whitelist()
+def get_singleflight_stats():
+    """{ name: { leader, coalesced, timeout, error } } since the last reset."""
+    frappe.only_for("System Manager")
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.hgetall(cache.make_key(STATS_KEY))
+    stats = {}
+    for field, value in (pipe.execute()[0] or {}).items():
+        name, outcome = frappe.safe_decode(field).rsplit(":", 1)
+        stats.setdefault(name, {})[outcome] = int(value)
+    return stats
+
+
+@frappe.whitelist(methods=["POST"])
+def reset_singleflight_stats():
+    frappe.only_for("System Manager")
+    cache = frappe.cache()
+    cache.delete(cache.make_key(STATS_KEY))
+    frappe.msgprint(_("Single-flight counters cleared."), alert=True)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""/customer_catalog: our items under the logged-in customer's own names (cached per customer)."""
+from __future__ import annotations
+
+import frappe
+from frappe import _
+
+from devp_custom.customer_catalog import get_page
+
+no_cache = 1
+
+
+def _get_customer():
+    requested = frappe.form_dict.get("customer")
+    if requested and frappe.has_permission("Customer", "read", requested):
+        # desk users (sales team) can preview any customer's catalog
+        return requested, [requested]
+
+    from erpnext.controllers.website_list_for_contact import get_customers_suppliers
+
+    customers, _suppliers = get_customers_suppliers("Sales Order", frappe.session.user)
+    if not customers:
+        frappe.throw(_("Your login is not linked to a customer"), frappe.PermissionError)
+    return (requested if requested in customers else customers[0]), customers
+
+
+def get_context(context):
+    if frappe.session.user == "Guest":
+        frappe.throw(_("Log in to view your catalog"), frappe.PermissionError)
+
+    customer, customers = _get_customer()
+    customer_group = frappe.get_cached_value("Customer", customer, "customer_group")
+    search = (frappe.form_dict.get("q") or "").strip()
+    rows, next_after, total = get_page(customer, customer_group, search, frappe.form_dict.get("after"))
+
+    context.update({
+        "title": _("Catalog"),
+        "show_sidebar": True,
+        "customer": customer,
+        "customers": customers,
+        "search": search,
+        "rows": rows,
+        "next_after": next_after,
+        "paged": bool(frappe.form_dict.get("after")),
+        "total": total,
+    })
+    return context
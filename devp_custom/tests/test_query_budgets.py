@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Query-count budgets (devp_custom.perf.query_budgets) for 10- and 500-line documents."""
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from devp_custom.perf import query_budgets
+from devp_custom.perf.seed import PREFIX, seed
+
+
+class TestQueryBudgets(FrappeTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if frappe.db.count("Item", {"name": ["like", PREFIX + "%"]}) < max(query_budgets.SIZES):
+            seed("small")
+            frappe.db.commit()
+        cls.data = query_budgets._data(max(query_budgets.SIZES))
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def assert_within_budgets(self, n):
+        for path, count in query_budgets.measure(self.data, n).items():
+            with self.subTest(path=path):
+                self.assertLessEqual(
+                    count, query_budgets.BUDGETS[path], f"{path}: {count} queries with {n}-line documents"
+                )
+
+    def test_every_hook_has_a_budget(self):
+        self.assertEqual(query_budgets.missing_budgets(), [])
+
+    def test_budgets_10_lines(self):
+        self.assert_within_budgets(10)
+
+    def test_budgets_500_lines(self):
+        self.assert_within_budgets(500)